@@ -0,0 +1,255 @@
+"""
+Offline throughput benchmark for the call_sync_and_audit DAG.
+
+Runs the DAG's task callables end to end, in DAG order, against the local
+fakes in ``fakes.py``: generated Five9 rows, a NAS HTTP server, a stub
+Gemini model and an in-memory Supabase. Shards run on a thread pool sized
+like the ``call_sync_shards`` pool. Each size runs in a fresh subprocess so
+peak RSS is per size.
+
+Usage (needs the Airflow requirements installed, no credentials):
+
+    python airflow/benchmarks/call_sync_bench.py
+    python airflow/benchmarks/call_sync_bench.py --sizes 100 1000 --gemini-latency-ms 1500
+    python airflow/benchmarks/call_sync_bench.py --var SYNC_BATCH_SIZE=100 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+BENCH_DIR = Path(__file__).resolve().parent
+DAGS_DIR = BENCH_DIR.parent / "dags"
+sys.path[:0] = [str(DAGS_DIR), str(BENCH_DIR)]
+
+# Defaults sized to measure the pipeline rather than the production quotas
+BENCH_VARIABLES = {
+    "GEMINI_RPM": "100000",
+    "GEMINI_TPM": "1000000000",
+    "NAS_DEADLINE_SECONDS": "3600",
+}
+
+
+def percentile_ms(values: list[float], pct: float) -> float:
+    from call_sync.stats import percentile
+
+    return round(percentile(values, pct) * 1000, 1)
+
+
+def load_tasks(variables: dict[str, str], fakes: dict[str, Any]) -> dict[str, Any]:
+    """Import the DAG with its external clients swapped for fakes; return task callables by id."""
+    import call_sync_dag
+
+    class FakeVariable:
+        @staticmethod
+        def get(name, default_var=None, deserialize_json=False):
+            return variables.get(name, default_var if default_var is not None else "bench")
+
+    call_sync_dag.Variable = FakeVariable
+    call_sync_dag.create_client = lambda url, key: fakes["supabase"]
+    call_sync_dag.pymssql = fakes["mssql"]
+    call_sync_dag.genai = fakes["genai"]
+
+    dag = call_sync_dag.call_sync_dag()
+    return {task.task_id.split(".")[-1]: task.python_callable for task in dag.tasks}
+
+
+def run_once(args: argparse.Namespace, calls: int) -> dict[str, Any]:
+    """Run the pipeline once for ``calls`` Five9 rows and return the measurements."""
+    from call_sync import metrics as metrics_module
+    from fakes import FakeGenAI, FakeMssql, FakeSupabase, NasServer, generate_five9_rows
+
+    work_dir = Path(tempfile.mkdtemp(prefix="call_sync_bench_"))
+    variables = {
+        **BENCH_VARIABLES,
+        "SYNC_STAGING_DIR": str(work_dir / "staging"),
+        "BLOB_STORE_DIR": str(work_dir / "blobs"),
+        "AUDIT_CACHE_DIR": str(work_dir / "audit_cache"),
+        "AGENT_INDEX_DIR": str(work_dir / "agent_index"),
+        "NAS_MIRROR_DIR": str(work_dir / "nas_mirror"),
+        **dict(v.split("=", 1) for v in args.var),
+    }
+
+    # Collect each task's TaskMetrics summary instead of pushing to XCom
+    summaries: list[dict[str, Any]] = []
+    publish = metrics_module.TaskMetrics.publish
+
+    def collect(self):
+        summary = self.summary()
+        summaries.append(summary)
+        return summary
+
+    metrics_module.TaskMetrics.publish = collect
+
+    stage_times: dict[str, list[float]] = {}
+
+    def timed(name: str, fn, *fn_args, **fn_kwargs):
+        started = time.monotonic()
+        try:
+            return fn(*fn_args, **fn_kwargs)
+        finally:
+            stage_times.setdefault(name, []).append(time.monotonic() - started)
+
+    try:
+        with NasServer(args.nas_latency_ms / 1000, args.missing_ratio, max(1, int(calls * args.unique_ratio))) as nas:
+            supabase = FakeSupabase(args.supabase_latency_ms / 1000)
+            supabase.tables["audit_templates"] = [{
+                "is_default": True,
+                "criteria": [{"id": "BENCH", "name": "Benchmark", "description": "Synthetic criterion"}],
+            }]
+            genai = FakeGenAI(args.gemini_latency_ms / 1000, args.gemini_failure_rate, args.gemini_malformed_rate)
+            fakes = {
+                "supabase": supabase,
+                "mssql": FakeMssql(
+                    generate_five9_rows(calls, args.agents),
+                    args.mssql_page_latency_ms / 1000,
+                ),
+                "genai": genai,
+            }
+            tasks = load_tasks({"NAS_BASE_URL": nas.url, **variables}, fakes)
+            run_id = f"bench__{calls}"
+
+            started = time.monotonic()
+            config = timed("get_config", tasks["get_config"])
+            window = timed("resolve_sync_window", tasks["resolve_sync_window"], config)
+            manifest = timed("fetch_calls_from_five9", tasks["fetch_calls_from_five9"], config, window, run_id=run_id)
+            timed("repoll_pending_transcripts", tasks["repoll_pending_transcripts"], config, run_id=run_id)
+            shards = timed("filter_existing_calls", tasks["filter_existing_calls"], manifest, config)
+            agent_mapping = timed("get_agent_mapping", tasks["get_agent_mapping"], shards, config)
+            criteria = timed("load_audit_template", tasks["load_audit_template"], config)
+            rule_set = timed("load_prescore_rules", tasks["load_prescore_rules"], criteria, config)
+
+            def process_shard(shard: dict[str, Any]) -> dict[str, int]:
+                fetched = timed("fetch_transcripts", tasks["fetch_transcripts"], shard, config)
+                inserted = timed(
+                    "insert_calls_to_supabase", tasks["insert_calls_to_supabase"],
+                    fetched, agent_mapping, config, run_id=run_id,
+                )
+                scored = timed(
+                    "score_calls_with_gemini", tasks["score_calls_with_gemini"],
+                    inserted, criteria, rule_set, config, run_id=run_id,
+                )
+                return timed("save_report_cards", tasks["save_report_cards"], scored, config, run_id=run_id)
+
+            with ThreadPoolExecutor(max_workers=config["sync"]["shard_concurrency"]) as executor:
+                results = list(executor.map(process_shard, shards))
+
+            timed("commit_watermark", tasks["commit_watermark"], manifest, window, config)
+            timed("cleanup_staging", tasks["cleanup_staging"], config, run_id=run_id)
+            elapsed = time.monotonic() - started
+    finally:
+        metrics_module.TaskMetrics.publish = publish
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    merged = metrics_module.merge_summaries(summaries)
+    return {
+        "calls": calls,
+        "shards": len(shards),
+        "saved": sum(r["saved"] for r in results),
+        "elapsed_s": round(elapsed, 3),
+        "calls_per_s": round(calls / elapsed, 2) if elapsed else 0.0,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "gemini_requests": genai.requests,
+        "supabase_requests": supabase.requests,
+        "stages": {
+            name: {
+                "runs": len(times),
+                "total_s": round(sum(times), 3),
+                "p50_ms": percentile_ms(times, 50),
+                "p95_ms": percentile_ms(times, 95),
+            }
+            for name, times in stage_times.items()
+        },
+        "task_metrics": merged["tasks"],
+    }
+
+
+def print_report(results: list[dict[str, Any]]) -> None:
+    print()
+    print(f"{'calls':>7} {'shards':>6} {'saved':>6} {'elapsed_s':>10} {'calls/s':>8} {'peak_rss_mb':>11} {'gemini':>7} {'supabase':>8}")
+    for r in results:
+        print(
+            f"{r['calls']:>7} {r['shards']:>6} {r['saved']:>6} {r['elapsed_s']:>10} {r['calls_per_s']:>8} "
+            f"{r['peak_rss_mb']:>11} {r['gemini_requests']:>7} {r['supabase_requests']:>8}"
+        )
+
+    for r in results:
+        print(f"\nPer-stage latency, {r['calls']} calls:")
+        print(f"  {'stage':<26} {'runs':>5} {'total_s':>9} {'p50_ms':>9} {'p95_ms':>9}")
+        for name, stage in r["stages"].items():
+            print(f"  {name:<26} {stage['runs']:>5} {stage['total_s']:>9} {stage['p50_ms']:>9} {stage['p95_ms']:>9}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--calls", type=int, help="Run a single size in this process (used by the size runner)")
+    parser.add_argument("--agents", type=int, default=50, help="Distinct agent emails")
+    parser.add_argument("--unique-ratio", type=float, default=0.9, help="Distinct transcripts / calls")
+    parser.add_argument("--missing-ratio", type=float, default=0.05, help="Transcripts that 404 on the NAS")
+    parser.add_argument("--mssql-page-latency-ms", type=float, default=100)
+    parser.add_argument("--nas-latency-ms", type=float, default=50)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800)
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.02)
+    parser.add_argument("--gemini-malformed-rate", type=float, default=0.0,
+                        help="Responses truncated inside the criteria")
+    parser.add_argument("--supabase-latency-ms", type=float, default=20)
+    parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE",
+                        help="Override an Airflow Variable read by get_config")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.calls:
+        print(json.dumps(run_once(args, args.calls)))
+        return
+
+    # One subprocess per size so peak RSS isn't carried over between sizes
+    passthrough = [a for a in argv if a != "--json"]
+    if "--sizes" in passthrough:
+        start = passthrough.index("--sizes")
+        end = start + 1
+        while end < len(passthrough) and not passthrough[end].startswith("--"):
+            end += 1
+        del passthrough[start:end]
+
+    results = []
+    for size in args.sizes:
+        print(f"Running {size} calls...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, __file__, "--calls", str(size), *passthrough],
+            capture_output=True,
+            text=True,
+            env={**os.environ, "AIRFLOW__LOGGING__LOGGING_LEVEL": "WARNING"},
+        )
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr)
+            raise SystemExit(f"Benchmark for {size} calls failed")
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+"""
+Local stand-ins for the services the call sync DAG talks to.
+
+- ``FakeMssql``: generated ``fivenine.call_recording_logs`` rows served
+  through a pymssql-style ``connect().cursor().fetchmany()``
+- ``NasServer``: threaded HTTP server with synthetic transcripts/summaries
+- ``FakeGenAI``: ``google.generativeai`` stand-in with latency and failures
+- ``FakeSupabase``: in-memory PostgREST subset covering the queries the DAG
+  and ``call_sync`` helpers make, with per-request latency
+
+Each fake sleeps for its configured latency so concurrency in the DAG code
+is exercised the same way as against the real services.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any
+
+WORDS = (
+    "account balance payment loan credit line approved schedule confirm "
+    "verify address email phone today tomorrow week month amount interest "
+    "rate fee due date bank routing number thank you understand help "
+    "question call back manager policy disclosure recorded quality training "
+    "agree offer option plan minimum total remaining late charge waive"
+).split()
+
+
+@lru_cache(maxsize=20_000)
+def _transcript(seed: int) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for turn in range(rng.randint(30, 60)):
+        speaker = "Agent" if turn % 2 == 0 else "Customer"
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20)))
+        lines.append(f"[00:{turn // 60:02d}:{turn % 60:02d}] {speaker}: {words}.")
+    return "\n".join(lines)
+
+
+def transcript_for(index: int, unique: int) -> str:
+    """Deterministic synthetic transcript; ``index % unique`` picks the content."""
+    return _transcript(index % unique)
+
+
+# =============================================================================
+# FIVE9 (SQL SERVER)
+# =============================================================================
+
+def generate_five9_rows(count: int, agents: int) -> list[dict[str, Any]]:
+    """Rows shaped like the DAG's Five9 query output."""
+    base = datetime(2026, 1, 1, 8, 0, 0)
+    rows = []
+    for i in range(count):
+        agent = i % agents
+        email = f"agent{agent}@tlcops.com"
+        rows.append({
+            "recording_id": str(1_000_000 + i),
+            "upload_timestamp": base + timedelta(seconds=i),
+            "file_name": f"{i}_recording.wav",
+            "call_timestamp": base + timedelta(seconds=i),
+            "length_seconds": 60 + i % 600,
+            "call_type": "Outbound" if i % 3 else "Inbound",
+            "number1": f"555{i:07d}",
+            "email": None,
+            "first_name": "Pat",
+            "last_name": f"Customer{i}",
+            "inf_cust_id": str(i),
+            "disposition": "Payment Arranged",
+            "campaign": "Collections",
+            "agent_name": f"Agent {agent}",
+            "agent_email": email,
+            "agent_group": "Bench",
+            "deleted": 0,
+            "status": "complete",
+            "call_id": f"bench-{i}",
+            "server_name": "F9",
+            "file_path": "recordings/",
+        })
+    return rows
+
+
+class FakeCursor:
+    def __init__(self, rows: list[dict[str, Any]], page_latency: float):
+        self.rows = rows
+        self.page_latency = page_latency
+        self.position = 0
+        self.query = ""
+        self.selected = rows
+
+    def execute(self, query: str, params: Any = None) -> None:
+        self.query = query
+        self.position = 0
+        self.selected = self.rows
+        # Backfill partitions: apply the [start, end) upload_timestamp range
+        if isinstance(params, dict) and "start" in params and "end" in params:
+            self.selected = [
+                row for row in self.rows
+                if params["start"] <= row["upload_timestamp"] < params["end"]
+            ]
+        time.sleep(self.page_latency)
+
+    def fetchone(self) -> dict[str, Any] | None:
+        # Only the is_scorable column check uses fetchone; report it as present
+        return {"length": 1} if "COL_LENGTH" in self.query else None
+
+    def fetchmany(self, size: int) -> list[dict[str, Any]]:
+        page = self.selected[self.position : self.position + size]
+        self.position += len(page)
+        if page:
+            time.sleep(self.page_latency)
+        return [dict(row) for row in page]
+
+
+class FakeMssql:
+    """Module-like stand-in for ``pymssql``."""
+
+    def __init__(self, rows: list[dict[str, Any]], page_latency: float):
+        self.rows = rows
+        self.page_latency = page_latency
+
+    def connect(self, **kwargs):
+        rows, latency = self.rows, self.page_latency
+        return SimpleNamespace(
+            cursor=lambda as_dict=True: FakeCursor(rows, latency),
+            close=lambda: None,
+        )
+
+
+# =============================================================================
+# NAS
+# =============================================================================
+
+NAS_PATH_RE = re.compile(r"/(transcripts|summaries)/bench-(\d+)_")
+
+
+class NasServer:
+    """
+    Serves the transcript and summary files ``call_sync.five9.nas_links``
+    builds for the generated rows (``.../transcripts/bench-<i>_...``) with a
+    fixed latency. ``missing_ratio`` of transcripts 404; ``unique`` controls how
+    many distinct transcript bodies exist (lower means more cache hits).
+    Responses carry an ETag and honour If-None-Match with a 304.
+    """
+
+    def __init__(self, latency: float, missing_ratio: float, unique: int):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.latency)
+                with server.lock:
+                    server.requests += 1
+                match = NAS_PATH_RE.search(self.path)
+                kind, index = (match.group(1), int(match.group(2))) if match else ("", -1)
+                missing = random.Random(index).random() < server.missing_ratio
+                if index < 0 or missing or kind not in ("transcripts", "summaries"):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if kind == "transcripts":
+                    body = transcript_for(index, server.unique)
+                else:
+                    body = f"Customer discussed account {index % server.unique} and agreed to a payment plan."
+                data = body.encode()
+                etag = f'"{zlib.crc32(data):08x}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.latency = latency
+        self.missing_ratio = missing_ratio
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.unique = unique
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> NasServer:
+        # Generate bodies up front so the fake's own CPU isn't timed as NAS work
+        for seed in range(min(self.unique, _transcript.cache_info().maxsize)):
+            _transcript(seed)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# =============================================================================
+# GEMINI
+# =============================================================================
+
+class StubGeminiError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"{code} stub failure")
+        self.code = code
+
+
+class FakeGenAI:
+    """Module-like stand-in for ``google.generativeai``."""
+
+    def __init__(self, latency: float, failure_rate: float, malformed_rate: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        # Responses cut off inside the criteria, as at max_output_tokens
+        self.malformed_rate = malformed_rate
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        genai = self
+
+        class GenerationConfig:
+            def __init__(self, **kwargs):
+                self.__dict__.update(kwargs)
+
+        class GenerativeModel:
+            def __init__(self, model_name: str, system_instruction: str | None = None, **kwargs):
+                self.model_name = model_name
+                self.system_instruction = system_instruction
+
+            def generate_content(self, prompt, generation_config=None, request_options=None):
+                return genai._respond(prompt)
+
+        self.GenerationConfig = GenerationConfig
+        self.GenerativeModel = GenerativeModel
+
+    def configure(self, **kwargs) -> None:
+        pass
+
+    def _respond(self, prompt: str):
+        with self._lock:
+            self.requests += 1
+            roll = self._rng.random()
+            jitter = self._rng.uniform(0.5, 1.5)
+            malformed = bool(self.malformed_rate) and self._rng.random() < self.malformed_rate
+        time.sleep(self.latency * jitter)
+        if roll < self.failure_rate:
+            raise StubGeminiError(503)
+
+        result = {
+            "overall_score": 80,
+            "communication_score": 82,
+            "compliance_score": 90,
+            "accuracy_score": 78,
+            "tone_score": 85,
+            "empathy_score": 75,
+            "resolution_score": 70,
+            "summary": "Stub audit.",
+            "strengths": ["Clear"],
+            "areas_for_improvement": ["Pacing"],
+            "recommendations": ["Confirm next steps"],
+            "criteria": [{"id": "BENCH", "result": "PASS", "score": 90, "explanation": "", "recommendation": ""}],
+        }
+        # Batch prompts get one array element per "=== CALL <id> ===" header
+        call_ids = re.findall(r"^=== CALL (.+?) ===$", prompt, flags=re.MULTILINE)
+        # Follow-ups list the missing criteria and scores, one "- " line each
+        rescore = prompt.startswith("Return ONLY a JSON object with:")
+        if rescore:
+            body: Any = {
+                field: result[field]
+                for field in re.findall(r'^- "(\w+_score)": 0-100$', prompt, flags=re.MULTILINE)
+            }
+            wanted = re.search(r'^- "criteria": one element for each of (.+), in the criteria', prompt, flags=re.MULTILINE)
+            if wanted:
+                body["criteria"] = [{**result["criteria"][0], "id": c.strip()} for c in wanted.group(1).split(",")]
+        elif call_ids:
+            body = [{"call_id": call_id, **result} for call_id in call_ids]
+        else:
+            body = result
+        text = json.dumps(body)
+        finish_reason = "STOP"
+        if malformed and not rescore:
+            text = text[: int(len(text) * 0.9)]
+            finish_reason = "MAX_TOKENS"
+        return SimpleNamespace(
+            text=text,
+            candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name=finish_reason))],
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(prompt) // 4,
+                candidates_token_count=300 * max(1, len(call_ids)),
+            ),
+        )
+
+
+# =============================================================================
+# SUPABASE
+# =============================================================================
+
+# Column defaults the DAG relies on when it reads rows back
+TABLE_DEFAULTS = {
+    "audit_cache": {"hit_count": 1},
+    "call_sync_items": {"attempts": 0, "priority": 0, "payload": {}},
+}
+
+
+def _sort_key(value: Any) -> tuple[int, float, str]:
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    return (1, 0, str(value or ""))
+
+
+class FakeQuery:
+    def __init__(self, db: FakeSupabase, table: str):
+        self.db = db
+        self.table = table
+        self.filters: list = []
+        self.order_by: list[tuple[str, bool]] = []
+        self.bounds: tuple[int, int] | None = None
+        self.single_row = False
+        self.operation = "select"
+        self.payload: Any = None
+        self.on_conflict: str | None = None
+        self.ignore_duplicates = False
+        self.returning = "representation"
+
+    def select(self, *columns, **kwargs) -> FakeQuery:
+        return self
+
+    def eq(self, column, value) -> FakeQuery:
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def gt(self, column, value) -> FakeQuery:
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) > value)
+        return self
+
+    def neq(self, column, value) -> FakeQuery:
+        self.filters.append(lambda r: r.get(column) != value)
+        return self
+
+    def gte(self, column, value) -> FakeQuery:
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) >= value)
+        return self
+
+    def lt(self, column, value) -> FakeQuery:
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) < value)
+        return self
+
+    def in_(self, column, values) -> FakeQuery:
+        wanted = set(values)
+        self.filters.append(lambda r: r.get(column) in wanted)
+        return self
+
+    def ov(self, column, values) -> FakeQuery:
+        wanted = set(values)
+        self.filters.append(lambda r: bool(wanted.intersection(r.get(column) or [])))
+        return self
+
+    def order(self, column, desc: bool = False) -> FakeQuery:
+        self.order_by.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int) -> FakeQuery:
+        self.bounds = (start, end)
+        return self
+
+    def limit(self, count: int) -> FakeQuery:
+        self.bounds = (0, count - 1)
+        return self
+
+    def single(self) -> FakeQuery:
+        self.single_row = True
+        return self
+
+    def upsert(
+        self, rows, on_conflict: str = "id", ignore_duplicates: bool = False, returning: str = "representation", **kwargs
+    ) -> FakeQuery:
+        self.operation, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        self.ignore_duplicates, self.returning = ignore_duplicates, returning
+        return self
+
+    def insert(self, rows, returning: str = "representation", **kwargs) -> FakeQuery:
+        self.operation, self.payload, self.returning = "insert", rows, returning
+        return self
+
+    def execute(self):
+        return self.db._execute(self)
+
+
+class FakeSupabase:
+    """In-memory tables behind the supabase-py query builder surface the DAG uses."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.tables: dict[str, list[dict[str, Any]]] = {}
+        # (table, conflict column) -> value -> row, so upserts stay O(1) per row
+        self._indexes: dict[tuple[str, str], dict[Any, dict[str, Any]]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.postgrest = SimpleNamespace(session=SimpleNamespace(event_hooks={}))
+        self.auth = SimpleNamespace(admin=SimpleNamespace(create_user=self._create_user))
+        self.functions = SimpleNamespace(invoke=self._invoke_function)
+        self.invocations: list[tuple[str, dict[str, Any]]] = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def _invoke_function(self, function: str, invoke_options: dict[str, Any]) -> None:
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            self.invocations.append((function, invoke_options["body"]))
+
+    def rpc(self, function: str, params: dict[str, Any]):
+        db = self
+        return SimpleNamespace(execute=lambda: db._rpc(function, params))
+
+    def _round_trip(self, data: Any):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+        response = SimpleNamespace(
+            status_code=200,
+            headers={"content-length": str(len(json.dumps(data, default=str)))},
+        )
+        for hook in self.postgrest.session.event_hooks.get("response", []):
+            hook(response)
+        return SimpleNamespace(data=data)
+
+    def _create_user(self, attributes: dict[str, Any]):
+        time.sleep(self.latency)
+        return SimpleNamespace(user=SimpleNamespace(id=str(uuid.uuid4())))
+
+    def _execute(self, query: FakeQuery):
+        with self._lock:
+            rows = self.tables.setdefault(query.table, [])
+            if query.operation == "select":
+                data = [dict(r) for r in rows if all(f(r) for f in query.filters)]
+                # Stable sorts, last column first
+                for column, desc in reversed(query.order_by):
+                    data.sort(key=lambda r: _sort_key(r.get(column)), reverse=desc)
+                if query.bounds:
+                    data = data[query.bounds[0] : query.bounds[1] + 1]
+                if query.single_row:
+                    data = data[0] if data else None
+            else:
+                payload = query.payload if isinstance(query.payload, list) else [query.payload]
+                data = [self._write(query.table, rows, dict(row), query) for row in payload]
+                if query.returning == "minimal":
+                    data = []
+        return self._round_trip(data)
+
+    def _index(self, table: str, column: str) -> dict[Any, dict[str, Any]]:
+        index = self._indexes.get((table, column))
+        if index is None:
+            index = {r.get(column): r for r in self.tables.get(table, [])}
+            self._indexes[(table, column)] = index
+        return index
+
+    def _write(
+        self, table: str, rows: list[dict[str, Any]], row: dict[str, Any], query: FakeQuery
+    ) -> dict[str, Any]:
+        row.setdefault("updated_at", datetime.now().isoformat())
+        if query.operation == "upsert":
+            existing = self._index(table, query.on_conflict).get(row.get(query.on_conflict))
+            if existing is not None:
+                if not query.ignore_duplicates:
+                    existing.update(row)
+                return dict(existing)
+        row = {**TABLE_DEFAULTS.get(table, {}), **row}
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        rows.append(row)
+        for (indexed_table, column), index in self._indexes.items():
+            if indexed_table == table:
+                index[row.get(column)] = row
+        return dict(row)
+
+    def _rpc(self, function: str, params: dict[str, Any]):
+        with self._lock:
+            if function == "save_report_cards_batch":
+                calls = {c["id"]: c for c in self.tables.setdefault("calls", [])}
+                items = self._index("call_sync_items", "call_id")
+                data = []
+                for card in params["cards"]:
+                    call = calls.get(card["call_id"])
+                    if call is None:
+                        continue
+                    if call.get("status") != "audited":
+                        card = {**card, "id": str(uuid.uuid4())}
+                        self.tables.setdefault("report_cards", []).append(card)
+                        call["status"] = "audited"
+                        data.append({"report_card_id": card["id"], "audited_call_id": card["call_id"]})
+                    if call["call_id"] in items:
+                        items[call["call_id"]]["state"] = "saved"
+            elif function == "increment_audit_cache_hits":
+                hits = {h["transcript_hash"]: h["hits"] for h in params["hits"]}
+                for row in self.tables.setdefault("audit_cache", []):
+                    if row["transcript_hash"] in hits:
+                        row["hit_count"] = row.get("hit_count", 0) + hits[row["transcript_hash"]]
+                data = []
+            # Event queue RPCs without leases: claimed events never expire here
+            elif function == "call_sync_event_backlog":
+                queued = [e for e in self.tables.setdefault("call_sync_events", []) if e["status"] == "queued"]
+                data = [{
+                    "ready": len(queued),
+                    "oldest_received_at": min((e["received_at"] for e in queued), default=None),
+                }]
+            elif function == "claim_call_sync_events":
+                queued = [e for e in self.tables.setdefault("call_sync_events", []) if e["status"] == "queued"]
+                data = []
+                for event in sorted(queued, key=lambda e: e["received_at"])[: params["max_events"]]:
+                    event.update(status="claimed", attempts=event.get("attempts", 0) + 1, dag_run_id=params["run_id"])
+                    data.append(dict(event))
+            elif function == "ack_call_sync_events":
+                items = self._index("call_sync_items", "call_id")
+                calls = self._index("calls", "call_id")
+                data = 0
+                for event in self.tables.setdefault("call_sync_events", []):
+                    if event["status"] != "claimed" or event.get("dag_run_id") != params["run_id"]:
+                        continue
+                    call_id = event["call_id"]
+                    if call_id in params["skipped"] or call_id in items or call_id in calls:
+                        event["status"] = "done"
+                        data += 1
+            elif function == "record_gemini_spend":
+                days = self._index("gemini_daily_spend", "day")
+                row = days.get(params["spend_day"])
+                if row is None:
+                    row = days[params["spend_day"]] = {"day": params["spend_day"]}
+                    self.tables.setdefault("gemini_daily_spend", []).append(row)
+                for column in ("prompt_tokens", "output_tokens", "cost_usd", "calls"):
+                    row[column] = row.get(column, 0) + params[column]
+                data = None
+            elif function == "scoring_priority_context":
+                # No report card or coaching history in the fake
+                data = []
+            else:
+                raise NotImplementedError(f"FakeSupabase has no RPC {function}")
+        return self._round_trip(data)
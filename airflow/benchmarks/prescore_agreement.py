@@ -0,0 +1,179 @@
+"""
+Agreement benchmark for the rule pre-scorer against historical Gemini audits.
+
+Runs ``call_sync.prescorer`` over transcripts that Gemini has already scored
+and compares each confident rule decision with Gemini's result for the same
+criterion. For every confidence threshold it reports how much of the
+criteria and how many whole calls the rules would take off Gemini, and how
+often they agree with it; use it to pick PRESCORE_MIN_CONFIDENCE before
+switching PRESCORE_MODE to ``on``.
+
+Historical audits come from Supabase (``report_cards.criteria_results`` with
+the call's transcript, plus the script templates and keyword libraries the
+DAG would load), or from a JSONL export with one
+``{"transcript": ..., "criteria_results": [...]}`` object per line.
+
+Usage:
+
+    SUPABASE_URL=... SUPABASE_SERVICE_KEY=... python airflow/benchmarks/prescore_agreement.py --supabase --limit 5000
+    python airflow/benchmarks/prescore_agreement.py --input audits.jsonl --thresholds 0.85 0.9 0.95 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+BENCH_DIR = Path(__file__).resolve().parent
+DAGS_DIR = BENCH_DIR.parent / "dags"
+sys.path[:0] = [str(DAGS_DIR), str(BENCH_DIR)]
+
+PAGE_SIZE = 500
+
+
+def load_supabase(limit: int) -> tuple[list[dict[str, Any]], dict[str, list[dict[str, Any]]]]:
+    """Gemini-scored report cards with their transcripts, and the rule sources."""
+    from call_sync.prescorer import load_rule_sources
+    from supabase import create_client
+
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_KEY"])
+    rows: list[dict[str, Any]] = []
+    while len(rows) < limit:
+        result = (
+            supabase.table("report_cards")
+            .select("criteria_results, calls(transcript)")
+            .eq("ai_provider", "gemini")
+            .order("created_at", desc=True)
+            .range(len(rows), len(rows) + min(PAGE_SIZE, limit - len(rows)) - 1)
+            .execute()
+        )
+        rows.extend(
+            {"transcript": (r.get("calls") or {}).get("transcript"), "criteria_results": r["criteria_results"]}
+            for r in result.data
+        )
+        if len(result.data) < PAGE_SIZE:
+            break
+    return rows, load_rule_sources(supabase)
+
+
+def load_jsonl(path: str, limit: int) -> list[dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for _, line in zip(range(limit), f) if line.strip()]
+
+
+def evaluate(
+    audits: list[dict[str, Any]],
+    sources: dict[str, list[dict[str, Any]]],
+    thresholds: list[float],
+) -> dict[str, Any]:
+    """Coverage and agreement of the rule decisions at each threshold."""
+    from call_sync.prescorer import PreScorer, build_rules
+
+    audits = [a for a in audits if a.get("transcript") and a.get("criteria_results")]
+    criteria_ids = sorted({c["id"] for a in audits for c in a["criteria_results"] if c.get("id")})
+    rule_set = build_rules([{"id": criterion_id} for criterion_id in criteria_ids], sources)
+    prescorer = PreScorer(rule_set, min_confidence=0.0)
+
+    # Decide once at confidence 0, then filter per threshold
+    started = time.monotonic()
+    decisions = [prescorer.confident(prescorer.decide(a["transcript"])) for a in audits]
+    elapsed = time.monotonic() - started
+
+    gemini = [
+        {c["id"]: str(c.get("result", "")).upper() for c in a["criteria_results"] if c.get("id")}
+        for a in audits
+    ]
+    total_criteria = sum(len(g) for g in gemini)
+
+    runs = []
+    for threshold in thresholds:
+        decided = agreed = calls_decided = 0
+        per_criterion: dict[str, Counter[str]] = {k: Counter() for k in rule_set["rules"]}
+        for call_decisions, call_gemini in zip(decisions, gemini):
+            confident = {k: d for k, d in call_decisions.items() if d["confidence"] >= threshold and k in call_gemini}
+            if call_gemini and set(confident) >= set(call_gemini):
+                calls_decided += 1
+            for criterion_id, decision in confident.items():
+                match = decision["result"] == call_gemini[criterion_id]
+                decided += 1
+                agreed += match
+                per_criterion[criterion_id]["decided"] += 1
+                per_criterion[criterion_id]["agreed"] += match
+                per_criterion[criterion_id][f"{decision['result']}->{call_gemini[criterion_id]}"] += 1
+        runs.append({
+            "threshold": threshold,
+            "criteria_decided": decided,
+            "criteria_coverage": round(decided / total_criteria, 4) if total_criteria else 0.0,
+            "agreement": round(agreed / decided, 4) if decided else None,
+            "calls_without_gemini": calls_decided,
+            "gemini_requests_saved": round(calls_decided / len(audits), 4) if audits else 0.0,
+            "per_criterion": {k: dict(v) for k, v in per_criterion.items()},
+        })
+
+    return {
+        "calls": len(audits),
+        "criteria": total_criteria,
+        "rules_for": sorted(rule_set["rules"]),
+        "rules_fingerprint": rule_set["fingerprint"],
+        "prescore_ms_per_call": round(elapsed * 1000 / len(audits), 3) if audits else 0.0,
+        "thresholds": runs,
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\n{report['calls']} calls, {report['criteria']} Gemini criteria results; "
+        f"rules for {', '.join(report['rules_for']) or 'no criteria'} "
+        f"({report['prescore_ms_per_call']} ms/call)"
+    )
+    print(f"\n{'threshold':>9} {'decided':>8} {'coverage':>9} {'agreement':>9} {'calls_saved':>11} {'requests_saved':>14}")
+    for run in report["thresholds"]:
+        agreement = f"{run['agreement']:.2%}" if run["agreement"] is not None else "-"
+        print(
+            f"{run['threshold']:>9} {run['criteria_decided']:>8} {run['criteria_coverage']:>9.2%} {agreement:>9} "
+            f"{run['calls_without_gemini']:>11} {run['gemini_requests_saved']:>14.2%}"
+        )
+
+    for run in report["thresholds"]:
+        print(f"\nPer criterion at {run['threshold']} (rules->gemini):")
+        for criterion_id, counts in run["per_criterion"].items():
+            outcomes = ", ".join(f"{k} {v}" for k, v in sorted(counts.items()) if "->" in k)
+            print(f"  {criterion_id:<12} decided {counts.get('decided', 0):>6}, agreed {counts.get('agreed', 0):>6}  {outcomes}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--supabase", action="store_true", help="Read audits from SUPABASE_URL/SUPABASE_SERVICE_KEY")
+    source.add_argument("--input", help="JSONL export of transcripts with their criteria_results")
+    parser.add_argument("--limit", type=int, default=2000, help="Most recent audits to compare")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.9, 0.95])
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.supabase:
+        audits, sources = load_supabase(args.limit)
+    else:
+        audits, sources = load_jsonl(args.input, args.limit), {}
+
+    report = evaluate(audits, sources, args.thresholds)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
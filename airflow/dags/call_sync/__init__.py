@@ -0,0 +1,6 @@
+"""
+Helpers for the call_sync_and_audit DAG.
+
+Kept out of the DAG file so the scheduler only parses the DAG definition,
+while the tasks import what they need from here at run time.
+"""
@@ -0,0 +1,215 @@
+"""
+Agent email -> profile resolution and provisioning.
+
+Resolved emails live in a SQLite index on the worker that is refreshed
+incrementally from ``profiles.updated_at``, with a periodic full reload to
+drop deleted profiles. Emails the index doesn't know are looked up in
+chunks, and whatever is still missing is provisioned with a bounded number
+of concurrent ``auth.admin.create_user`` calls followed by one batched
+profile upsert.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from call_sync.writers import LOOKUP_CHUNK_SIZE, chunked, upsert_in_batches
+
+logger = logging.getLogger(__name__)
+
+# PostgREST's default max-rows; refresh pages can't be larger
+REFRESH_PAGE_SIZE = 1000
+
+TEAM_DOMAINS = {
+    "boostcreditline": "Boost",
+    "bisongreen": "Bison",
+    "tlc": "TLC",
+    "yattaops": "Yatta",
+}
+
+
+def group_agents(calls: list[dict[str, Any]]) -> dict[str, str]:
+    """Map each lowercased agent email to the first non-empty agent name, in one pass."""
+    agents: dict[str, str] = {}
+    for call in calls:
+        email = (call.get("agent_email") or "").lower()
+        if not email:
+            continue
+        if not agents.get(email):
+            agents[email] = call.get("agent_name") or ""
+    return agents
+
+
+def parse_agent_name(email: str, agent_name: str) -> tuple[str, str]:
+    """First and last name from the Five9 agent name, else from the email."""
+    if agent_name:
+        parts = agent_name.split(" ", 1)
+        return parts[0], parts[1] if len(parts) > 1 else ""
+
+    username = email.split("@")[0]
+    name_parts = username.replace(".", " ").replace("_", " ").split()
+    first_name = name_parts[0].title() if name_parts else ""
+    last_name = name_parts[1].title() if len(name_parts) > 1 else ""
+    return first_name, last_name
+
+
+def team_for_email(email: str) -> str | None:
+    """Team from the email domain."""
+    domain = email.split("@")[1] if "@" in email else ""
+    for fragment, team in TEAM_DOMAINS.items():
+        if fragment in domain:
+            return team
+    return None
+
+
+class AgentIndex:
+    """Worker-local SQLite copy of ``profiles`` email -> id."""
+
+    def __init__(self, index_dir: str, full_refresh_hours: int):
+        Path(index_dir).mkdir(parents=True, exist_ok=True)
+        self.full_refresh_seconds = full_refresh_hours * 3600
+        self.conn = sqlite3.connect(Path(index_dir) / "agent_index.sqlite3", timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS agents (email TEXT PRIMARY KEY, user_id TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def _meta(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def refresh(self, supabase) -> int:
+        """
+        Pull profiles changed since the last refresh, or reload everything
+        once FULL_REFRESH_HOURS have passed. Returns the rows read.
+        """
+        last_full = float(self._meta("last_full_refresh") or 0)
+        full = time.time() - last_full >= self.full_refresh_seconds
+        since = None if full else self._meta("updated_at")
+
+        rows: list[dict[str, Any]] = []
+        offset = 0
+        while True:
+            query = supabase.table("profiles").select("id, email, updated_at")
+            if since:
+                query = query.gt("updated_at", since)
+            page = (
+                query.order("updated_at")
+                .range(offset, offset + REFRESH_PAGE_SIZE - 1)
+                .execute()
+                .data
+            )
+            rows.extend(page)
+            if len(page) < REFRESH_PAGE_SIZE:
+                break
+            offset += REFRESH_PAGE_SIZE
+
+        if full:
+            self.conn.execute("DELETE FROM agents")
+            self._set_meta("last_full_refresh", str(time.time()))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO agents VALUES (?, ?)",
+            [(r["email"].lower(), r["id"]) for r in rows if r.get("email")],
+        )
+        if rows:
+            self._set_meta("updated_at", max(r["updated_at"] for r in rows))
+        self.conn.commit()
+
+        logger.info(f"Agent index {'full' if full else 'incremental'} refresh: {len(rows)} profiles")
+        return len(rows)
+
+    def get_many(self, emails: list[str]) -> dict[str, str]:
+        found: dict[str, str] = {}
+        for batch in chunked(emails, 500):
+            placeholders = ",".join("?" * len(batch))
+            found.update(
+                self.conn.execute(
+                    f"SELECT email, user_id FROM agents WHERE email IN ({placeholders})",
+                    batch,
+                ).fetchall()
+            )
+        return found
+
+    def put_many(self, mapping: dict[str, str]) -> None:
+        if mapping:
+            self.conn.executemany("INSERT OR REPLACE INTO agents VALUES (?, ?)", mapping.items())
+            self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def lookup_profiles(supabase, emails: list[str]) -> dict[str, str]:
+    """Resolve emails against ``profiles`` in URL-safe chunks."""
+    mapping: dict[str, str] = {}
+    for batch in chunked(emails, LOOKUP_CHUNK_SIZE):
+        result = supabase.table("profiles").select("id, email").in_("email", batch).execute()
+        mapping.update((r["email"].lower(), r["id"]) for r in result.data)
+    return mapping
+
+
+def provision_agents(
+    supabase,
+    agents: dict[str, str],
+    max_concurrency: int,
+    batch_size: int,
+) -> dict[str, str]:
+    """
+    Create auth users for new agents concurrently, then upsert their profiles
+    in batches. Returns email -> user_id for the agents that were created.
+    """
+    if not agents:
+        return {}
+
+    def create(email: str) -> dict[str, Any] | None:
+        first_name, last_name = parse_agent_name(email, agents[email])
+        try:
+            auth_result = supabase.auth.admin.create_user({
+                "email": email,
+                "password": f"Temp{datetime.now().timestamp()}!",
+                "email_confirm": True,
+                "user_metadata": {
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "created_by_airflow": True,
+                },
+            })
+        except Exception as e:
+            logger.error(f"Failed to create agent {email}: {e}")
+            return None
+
+        return {
+            "id": auth_result.user.id,
+            "email": email,
+            "first_name": first_name,
+            "last_name": last_name,
+            "role": "agent",
+            "team": team_for_email(email),
+            "hourly_rate": 15.00,
+        }
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="provision") as executor:
+        profiles = [p for p in executor.map(create, list(agents)) if p]
+
+    _, failed = upsert_in_batches(supabase, "profiles", profiles, "id", batch_size)
+    failed_ids = {p["id"] for p in failed}
+
+    created: dict[str, str] = {}
+    for profile in profiles:
+        if profile["id"] in failed_ids:
+            continue
+        created[profile["email"]] = profile["id"]
+        logger.info(f"Created agent: {profile['first_name']} {profile['last_name']} ({profile['email']})")
+    return created
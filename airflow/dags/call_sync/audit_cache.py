@@ -0,0 +1,237 @@
+"""
+Two-tier audit cache in front of Supabase ``audit_cache``.
+
+Lookups go to a local SQLite file on the worker first (size-capped LRU with a
+TTL), then to Supabase in one bulk ``in_`` query per chunk for the misses.
+New results and hit-count increments are buffered and written back in
+batches when the run flushes.
+
+Keys combine the transcript's blob store hash with the Gemini model and a
+fingerprint of the audit criteria, so changing GEMINI_MODEL or the template
+misses instead of serving stale audits. In Supabase the key is stored in the
+``transcript_hash`` column, which kept its name from when the key was the
+transcript hash alone; the transcript hash itself is in ``content_hash``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from call_sync.writers import LOOKUP_CHUNK_SIZE, chunked, rpc_in_batches, upsert_in_batches
+
+logger = logging.getLogger(__name__)
+
+
+def criteria_fingerprint(criteria: list[dict[str, Any]]) -> str:
+    """Stable hash of the audit criteria the prompt is built from."""
+    return hashlib.sha256(json.dumps(criteria, sort_keys=True).encode()).hexdigest()
+
+
+def audit_cache_key(content_hash: str, model: str, criteria_hash: str) -> str:
+    """Cache key for one transcript audited by one model against one template."""
+    return hashlib.sha256(f"{model}:{criteria_hash}:{content_hash}".encode()).hexdigest()
+
+
+class LocalAuditCache:
+    """SQLite-backed LRU cache of audit results on the worker's disk."""
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl_seconds: int):
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.conn = sqlite3.connect(Path(cache_dir) / "audit_cache.sqlite3", timeout=30)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audit_cache (
+                cache_key TEXT PRIMARY KEY,
+                audit_result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS audit_cache_accessed_at ON audit_cache(accessed_at)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, dict[str, Any]]:
+        """Return unexpired entries for ``keys`` and mark them recently used."""
+        found: dict[str, dict[str, Any]] = {}
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+
+        for batch in chunked(keys, 500):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT cache_key, audit_result FROM audit_cache "
+                f"WHERE cache_key IN ({placeholders}) AND created_at >= ?",
+                [*batch, cutoff],
+            ).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+
+        if found:
+            self.conn.executemany(
+                "UPDATE audit_cache SET accessed_at = ? WHERE cache_key = ?",
+                [(now, key) for key in found],
+            )
+            self.conn.commit()
+        return found
+
+    def put_many(self, entries: dict[str, dict[str, Any]]) -> None:
+        """Store entries, then evict expired and least recently used ones."""
+        if not entries:
+            return
+
+        now = time.time()
+        rows = []
+        for key, audit_result in entries.items():
+            value = json.dumps(audit_result, separators=(",", ":"))
+            rows.append((key, value, len(value), now, now))
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO audit_cache VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.conn.commit()
+        self._evict()
+
+    def _evict(self) -> None:
+        self.conn.execute(
+            "DELETE FROM audit_cache WHERE created_at < ?",
+            (time.time() - self.ttl_seconds,),
+        )
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM audit_cache").fetchone()[0]
+        if total > self.max_bytes:
+            # Walk from least recently used, dropping until back under the cap
+            excess = total - self.max_bytes
+            doomed = []
+            for key, size in self.conn.execute(
+                "SELECT cache_key, size FROM audit_cache ORDER BY accessed_at"
+            ):
+                doomed.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            self.conn.executemany("DELETE FROM audit_cache WHERE cache_key = ?", doomed)
+            logger.info(f"Evicted {len(doomed)} local audit cache entries")
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class AuditCache:
+    """Local tier plus Supabase tier, with buffered write-back."""
+
+    def __init__(
+        self,
+        supabase,
+        local: LocalAuditCache | None,
+        model: str,
+        criteria_hash: str,
+    ):
+        self.supabase = supabase
+        self.local = local
+        self.model = model
+        self.criteria_hash = criteria_hash
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self._hits: Counter[str] = Counter()
+        self._new: dict[str, dict[str, Any]] = {}
+
+    def key_for(self, content_hash: str) -> str:
+        """Cache key for a transcript's blob store hash under this model and template."""
+        return audit_cache_key(content_hash, self.model, self.criteria_hash)
+
+    def lookup(self, keys: list[str]) -> dict[str, dict[str, Any]]:
+        """
+        Resolve many keys at once: local tier first, then one bulk Supabase
+        query per chunk for the rest. Remote hits are promoted locally.
+        """
+        unique = list(dict.fromkeys(keys))
+        found = self.local.get_many(unique) if self.local else {}
+        self.local_hits += len(found)
+
+        missing = [k for k in unique if k not in found]
+        remote: dict[str, dict[str, Any]] = {}
+        for batch in chunked(missing, LOOKUP_CHUNK_SIZE):
+            result = (
+                self.supabase.table("audit_cache")
+                .select("transcript_hash, audit_result")
+                .in_("transcript_hash", batch)
+                .execute()
+            )
+            remote.update((r["transcript_hash"], r["audit_result"]) for r in result.data)
+
+        self.remote_hits += len(remote)
+        self.misses += len(missing) - len(remote)
+        if self.local and remote:
+            self.local.put_many(remote)
+
+        found.update(remote)
+        for key in keys:
+            if key in found:
+                self._hits[key] += 1
+        return found
+
+    def record_hits(self, key: str, count: int = 1) -> None:
+        """Count reuses that didn't go through ``lookup``, e.g. duplicates within a run."""
+        if count > 0:
+            self._hits[key] += count
+
+    def add(self, key: str, content_hash: str, audit_result: dict[str, Any]) -> None:
+        """Buffer a freshly scored result for write-back."""
+        self._new[key] = {
+            "transcript_hash": key,
+            "content_hash": content_hash,
+            "criteria_hash": self.criteria_hash,
+            "audit_result": audit_result,
+            # Rule-only audits come from the pre-scorer, not Gemini
+            "ai_provider": audit_result.get("ai_provider") or "gemini",
+            "ai_model": audit_result.get("ai_model") or self.model,
+            # No hit_count: the column default sets it on insert, and a run
+            # racing another on the same key must not reset its count
+        }
+
+    def flush(self, batch_size: int) -> None:
+        """Write new entries and hit-count increments back to Supabase."""
+        if self._new:
+            rows = list(self._new.values())
+            if self.local:
+                self.local.put_many({r["transcript_hash"]: r["audit_result"] for r in rows})
+            upsert_in_batches(self.supabase, "audit_cache", rows, "transcript_hash", batch_size)
+            self._new.clear()
+
+        if self._hits:
+            hits = [{"transcript_hash": key, "hits": count} for key, count in self._hits.items()]
+            rpc_in_batches(
+                self.supabase,
+                "increment_audit_cache_hits",
+                "hits",
+                hits,
+                batch_size,
+                key="transcript_hash",
+            )
+            self._hits.clear()
+
+    def hit_ratio(self) -> float:
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return (self.local_hits + self.remote_hits) / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio(), 3),
+        }
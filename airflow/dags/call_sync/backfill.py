@@ -0,0 +1,181 @@
+"""
+Time-partitioned backfills of the call sync pipeline.
+
+Reprocessing a week of calls by raising SYNC_LOOKBACK_HOURS pushes the whole
+week through one run, which can't finish inside the task timeout. The
+``call_sync_backfill`` DAG instead splits a requested date range into hourly
+or daily partitions, fetches each one with a bounded ``upload_timestamp``
+range query and runs the usual per-call stages over them in parallel.
+
+Progress is kept per partition in ``call_sync_backfill_partitions``, so
+triggering the same range again only picks up partitions that aren't
+``done`` yet. Backfills run in their own pool with a reduced share of the
+Gemini and NAS limits, so the live 15-minute syncs keep priority.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from call_sync.writers import LOOKUP_CHUNK_SIZE, chunked, upsert_in_batches
+
+logger = logging.getLogger(__name__)
+
+LEDGER_TABLE = "call_sync_backfill_partitions"
+PARTITION_SIZES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def parse_bound(value: str) -> datetime:
+    """
+    A range bound as a naive Five9 timestamp. Five9 stores upload_timestamp
+    in server local time, so any timezone on the input is dropped, not
+    converted.
+    """
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def split_range(start: datetime, end: datetime, partition: str) -> list[dict[str, Any]]:
+    """
+    Partition windows covering ``[start, end)``, aligned to whole hours or
+    days so re-triggering an overlapping range finds the same partitions.
+    """
+    if partition not in PARTITION_SIZES:
+        raise ValueError(f"Unknown backfill partition {partition!r}; use one of {sorted(PARTITION_SIZES)}")
+    if end <= start:
+        raise ValueError(f"Backfill range is empty: {start.isoformat()} >= {end.isoformat()}")
+
+    step = PARTITION_SIZES[partition]
+    current = start.replace(minute=0, second=0, microsecond=0)
+    if partition == "day":
+        current = current.replace(hour=0)
+
+    windows = []
+    while current < end:
+        upper = current + step
+        windows.append({
+            "mode": "range",
+            "start": current.isoformat(),
+            "end": upper.isoformat(),
+            "partition": f"{current:%Y%m%dT%H%M}-{partition}",
+        })
+        current = upper
+    return windows
+
+
+def load_ledger(supabase, keys: list[str]) -> dict[str, dict[str, Any]]:
+    """Ledger rows for the given partition keys."""
+    rows: dict[str, dict[str, Any]] = {}
+    for batch in chunked(keys, LOOKUP_CHUNK_SIZE):
+        result = (
+            supabase.table(LEDGER_TABLE)
+            .select("partition_key, status, attempts")
+            .in_("partition_key", batch)
+            .execute()
+        )
+        rows.update((row["partition_key"], row) for row in result.data)
+    return rows
+
+
+def plan_partitions(
+    supabase,
+    windows: list[dict[str, Any]],
+    limit: int,
+    run_id: str | None,
+    force: bool = False,
+) -> list[dict[str, Any]]:
+    """
+    Up to ``limit`` partitions that still need work, oldest first, marked
+    ``running`` for this run. ``done`` partitions are skipped unless ``force``.
+    """
+    ledger = load_ledger(supabase, [w["partition"] for w in windows])
+    pending = [
+        w for w in windows
+        if force or (ledger.get(w["partition"]) or {}).get("status") != "done"
+    ][:limit]
+
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {
+            "partition_key": w["partition"],
+            "partition_start": w["start"],
+            "partition_end": w["end"],
+            "status": "running",
+            "attempts": ((ledger.get(w["partition"]) or {}).get("attempts") or 0) + 1,
+            "dag_run_id": run_id,
+            "updated_at": now,
+        }
+        for w in pending
+    ]
+    if rows:
+        upsert_in_batches(supabase, LEDGER_TABLE, rows, "partition_key", LOOKUP_CHUNK_SIZE)
+
+    done = sum(1 for w in windows if (ledger.get(w["partition"]) or {}).get("status") == "done")
+    logger.info(
+        f"Backfill range has {len(windows)} partitions: {done} already done, "
+        f"{len(pending)} planned for this run"
+    )
+    return pending
+
+
+def partition_outcomes(
+    partitions: list[dict[str, Any]],
+    shards: list[dict[str, Any]],
+    filtered: set[int],
+    saved: dict[int, dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """
+    Ledger rows for a finished run. A partition is ``done`` when its fetch and
+    filter succeeded and every one of its shards was saved.
+
+    ``filtered`` holds the map indexes (one per partition) whose filter task
+    succeeded; ``saved`` maps shard map indexes to their save results.
+    """
+    by_partition: dict[str, list[int]] = {}
+    for index, shard in enumerate(shards):
+        by_partition.setdefault(shard.get("partition"), []).append(index)
+
+    now = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for index, window in enumerate(partitions):
+        shard_indexes = by_partition.get(window["partition"], [])
+        done = index in filtered and all(i in saved for i in shard_indexes)
+        rows.append({
+            "partition_key": window["partition"],
+            "partition_start": window["start"],
+            "partition_end": window["end"],
+            "status": "done" if done else "failed",
+            "calls": sum(shards[i]["rows"] for i in shard_indexes),
+            "saved": sum(saved[i].get("saved", 0) for i in shard_indexes if i in saved),
+            "updated_at": now,
+        })
+    return rows
+
+
+def record_partitions(supabase, rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+    _, failed = upsert_in_batches(supabase, LEDGER_TABLE, rows, "partition_key", LOOKUP_CHUNK_SIZE)
+    if failed:
+        logger.warning(f"Failed to record {len(failed)} backfill partitions; they will be rerun")
+
+
+def apply_backfill_limits(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Scale a run's config down for backfill traffic: BACKFILL_GEMINI_SHARE of
+    the Gemini and NAS limits and of a per-run scoring budget, split across
+    BACKFILL_CONCURRENCY shards, and no pickup of unfinished items from the
+    live runs.
+    """
+    share = config["backfill"]["gemini_share"]
+    gemini = config["gemini"]
+    gemini["requests_per_minute"] = max(1, int(gemini["requests_per_minute"] * share))
+    gemini["tokens_per_minute"] = max(1, int(gemini["tokens_per_minute"] * share))
+    gemini["max_concurrency"] = max(1, int(gemini["max_concurrency"] * share))
+    config["nas"]["max_concurrency"] = max(1, int(config["nas"]["max_concurrency"] * share))
+    if config["budget"]["run_tokens"]:
+        config["budget"]["run_tokens"] = max(1, int(config["budget"]["run_tokens"] * share))
+    config["sync"]["shard_concurrency"] = config["backfill"]["concurrency"]
+    config["sync"]["resume_limit"] = 0
+    return config
@@ -0,0 +1,113 @@
+"""
+Content-addressed store for transcript and summary bodies.
+
+Bodies are written once under BLOB_STORE_DIR keyed by the SHA-256 of their
+text, optionally zstd-compressed, and tasks pass only the hash through XCom.
+Identical transcripts share one file, and the hash doubles as the content
+part of the audit cache key.
+
+Compression needs the optional ``zstandard`` package; without it bodies are
+stored as plain UTF-8. Either format is readable regardless of the setting.
+With more than one worker, BLOB_STORE_DIR must be on a shared filesystem.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of a body's UTF-8 text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    """Write-once, hash-addressed text bodies on local or shared disk."""
+
+    def __init__(self, root: str, compress: bool = True):
+        self.root = Path(root)
+        self.compress = compress and zstandard is not None
+        if compress and zstandard is None:
+            logger.warning("zstandard not installed, storing blobs uncompressed")
+
+    def _path(self, digest: str, suffix: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{suffix}"
+
+    def put(self, text: str | None) -> str | None:
+        """Store a body if it isn't already present and return its hash."""
+        if text is None:
+            return None
+
+        digest = content_hash(text)
+        for existing in (self._path(digest, ".zst"), self._path(digest, ".txt")):
+            if existing.exists():
+                # Refresh mtime so prune() keeps blobs that are still in use
+                os.utime(existing)
+                return digest
+
+        data = text.encode("utf-8")
+        if self.compress:
+            path = self._path(digest, ".zst")
+            data = zstandard.ZstdCompressor(level=6).compress(data)
+        else:
+            path = self._path(digest, ".txt")
+
+        # Write-then-rename so concurrent writers never expose a partial blob
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return digest
+
+    def exists(self, digest: str | None) -> bool:
+        return bool(digest) and any(
+            self._path(digest, suffix).exists() for suffix in (".zst", ".txt")
+        )
+
+    def get(self, digest: str | None) -> str | None:
+        """Load a body by hash; None for a missing hash or blob."""
+        if not digest:
+            return None
+
+        compressed = self._path(digest, ".zst")
+        plain = self._path(digest, ".txt")
+        if compressed.exists():
+            if zstandard is None:
+                raise RuntimeError(f"Blob {digest} is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(compressed.read_bytes()).decode("utf-8")
+        if plain.exists():
+            return plain.read_text(encoding="utf-8")
+
+        logger.warning(f"Blob {digest} not found in {self.root}")
+        return None
+
+    def prune(self, max_age_hours: int) -> int:
+        """Delete blobs not written or reused in the last ``max_age_hours``."""
+        if not self.root.exists():
+            return 0
+        cutoff = time.time() - max_age_hours * 3600
+        removed = 0
+        for path in self.root.glob("*/*/*"):
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} stale blobs from {self.root}")
+        return removed
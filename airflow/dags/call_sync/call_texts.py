@@ -0,0 +1,97 @@
+"""
+Transcript and summary bodies in Supabase, outside the ``calls`` rows.
+
+``calls`` used to carry the full ``transcript_text``, so list views,
+``filter_existing_calls`` lookups and every status update read or rewrote
+rows bloated by multi-kilobyte text. Bodies now live in ``call_texts``, keyed
+by the same SHA-256 content hash as the blob store (identical transcripts are
+stored once) and lz4-compressed by Postgres. ``calls`` keeps only
+``transcript_hash``, ``transcript_length``, ``has_transcript`` and
+``summary_hash``; readers that need the text select the ``transcript`` or
+``summary`` computed fields, or load bodies by hash with ``load_texts``.
+
+A trigger on ``calls`` moves text that older clients still write to
+``transcript_text`` / ``summary_text`` into ``call_texts`` as it arrives, and
+``move_call_texts`` drains the rows written before the migration, a batch at
+a time (the ``call_texts_backfill`` DAG).
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Iterable
+
+from call_sync.writers import LOOKUP_CHUNK_SIZE, chunked, write_in_batches
+
+logger = logging.getLogger(__name__)
+
+TABLE = "call_texts"
+
+
+def text_columns(
+    transcript_hash: str | None,
+    transcript: str | None,
+    summary_hash: str | None,
+    stored: dict[str, str],
+) -> dict[str, Any]:
+    """
+    The ``calls`` columns that stand in for a call's transcript and summary;
+    hashes only count once their body is in ``stored``.
+    """
+    return {
+        "transcript_hash": transcript_hash if transcript else None,
+        "transcript_length": len(transcript) if transcript else None,
+        "has_transcript": bool(transcript),
+        "summary_hash": summary_hash if summary_hash in stored else None,
+    }
+
+
+def store_texts(supabase, bodies: dict[str, str], batch_size: int) -> set[str]:
+    """
+    Write ``{content_hash: body}`` to ``call_texts``, skipping bodies already
+    stored. Returns the hashes that could not be written.
+    """
+    rows = [{"content_hash": digest, "body": body, "length": len(body)} for digest, body in bodies.items()]
+    _, failed = write_in_batches(
+        rows,
+        batch_size,
+        lambda batch: supabase.table(TABLE)
+        .upsert(batch, on_conflict="content_hash", ignore_duplicates=True, returning="minimal")
+        .execute()
+        .data,
+        label=TABLE,
+        key="content_hash",
+    )
+    return {row["content_hash"] for row in failed}
+
+
+def load_texts(supabase, hashes: Iterable[str | None]) -> dict[str, str]:
+    """Bodies by content hash; hashes with no stored body are left out."""
+    wanted = sorted({digest for digest in hashes if digest})
+    bodies = {}
+    for batch in chunked(wanted, LOOKUP_CHUNK_SIZE):
+        result = (
+            supabase.table(TABLE)
+            .select("content_hash, body")
+            .in_("content_hash", batch)
+            .execute()
+        )
+        bodies.update((row["content_hash"], row["body"]) for row in result.data)
+    return bodies
+
+
+def move_call_texts(supabase, batch_size: int, max_batches: int | None = None) -> dict[str, int]:
+    """
+    Move ``transcript_text`` / ``summary_text`` still in ``calls`` rows to
+    ``call_texts``, ``batch_size`` rows per request so each update stays short,
+    until none are left or ``max_batches`` have run.
+    """
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = supabase.rpc("move_call_texts", {"batch_size": batch_size}).execute().data or 0
+        batches += 1
+        moved += count
+        logger.info(f"Moved texts of {count} calls ({moved} so far)")
+        if count < batch_size:
+            break
+    return {"batches": batches, "moved": moved}
@@ -0,0 +1,242 @@
+"""
+Per-call progress checkpoints for the call sync DAG.
+
+Every call the DAG picks up gets a row in ``call_sync_items`` that moves
+forward through ``fetched -> inserted -> scored -> saved`` as each stage
+finishes with it. The row carries the call as it travels between tasks
+(Five9 fields, NAS links, blob hashes and, once inserted, the ``calls`` id),
+so any later run can resume the call from where it stopped:
+
+- ``filter_existing_calls`` skips calls that are ``saved`` and resumes the
+  rest instead of dropping them because they already exist in ``calls``
+- unfinished items from earlier runs (including calls stuck in
+  ``pending``/``transcribed``, backfilled by the migration) are added to the
+  work set, up to SYNC_RESUME_MAX_ATTEMPTS times
+- pending calls whose transcript shows up on the NAS later are requeued by
+  ``repoll_pending_transcripts`` with their attempts reset
+- calls that don't fit the scoring budget are deferred (new ones as
+  ``fetched``) with their priority (see ``call_sync/scheduling.py``); the resume scan takes the
+  highest priority first
+- Gemini results are written to the audit cache and checkpointed in chunks,
+  so a retried scoring task gets the finished part back as cache hits
+
+``save_report_cards_batch`` marks items ``saved`` in the same transaction
+that writes their report cards.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from call_sync.writers import LOOKUP_CHUNK_SIZE, chunked, upsert_in_batches
+
+logger = logging.getLogger(__name__)
+
+ITEMS_TABLE = "call_sync_items"
+STATES = ("fetched", "inserted", "scored", "saved")
+STATE_KEY = "sync_state"
+PRIORITY_KEY = "sync_priority"
+DEFERRALS_KEY = "sync_deferrals"
+
+REQUEUED_AT = "1970-01-01T00:00:00+00:00"
+
+# Working fields that are rebuilt by each stage rather than checkpointed
+TRANSIENT_FIELDS = {STATE_KEY, "sync_attempts", "transcript_text", "summary_text"}
+
+
+def state_rank(state: str | None) -> int:
+    """Position of a state in the pipeline; -1 for unknown or new calls."""
+    return STATES.index(state) if state in STATES else -1
+
+
+def item_key(call: dict[str, Any]) -> str | None:
+    key = call.get("call_id") or call.get("recording_id")
+    return str(key) if key else None
+
+
+def load_states(supabase, call_ids: list[str]) -> dict[str, dict[str, Any]]:
+    """Checkpoint rows for the given call ids, in URL-safe chunks."""
+    items: dict[str, dict[str, Any]] = {}
+    for batch in chunked(call_ids, LOOKUP_CHUNK_SIZE):
+        result = (
+            supabase.table(ITEMS_TABLE)
+            .select("call_id, state, attempts, payload, dag_run_id, updated_at")
+            .in_("call_id", batch)
+            .execute()
+        )
+        items.update((row["call_id"], row) for row in result.data)
+    return items
+
+
+def in_flight(item: dict[str, Any], run_id: str | None, stale_minutes: int) -> bool:
+    """
+    True if another run touched the item in the last ``stale_minutes`` and is
+    probably still working on it, e.g. a webhook micro-batch or a backfill.
+    """
+    if not item.get("updated_at") or item.get("dag_run_id") == run_id:
+        return False
+    updated_at = datetime.fromisoformat(item["updated_at"].replace("Z", "+00:00"))
+    return datetime.now(timezone.utc) - updated_at < timedelta(minutes=stale_minutes)
+
+
+def resume_call(row: dict[str, Any], item: dict[str, Any]) -> dict[str, Any]:
+    """Fresh Five9 row (if any) overlaid with what the checkpoint already knows."""
+    return {
+        **row,
+        **(item.get("payload") or {}),
+        STATE_KEY: item["state"],
+        "sync_attempts": item.get("attempts") or 0,
+    }
+
+
+def load_resumable(
+    supabase,
+    exclude: set[str],
+    limit: int,
+    max_attempts: int,
+    stale_minutes: int,
+) -> list[dict[str, Any]]:
+    """
+    Unfinished items from earlier runs, highest priority and then oldest
+    first. Items touched in the last ``stale_minutes`` are left alone in case
+    another run owns them.
+    """
+    if limit <= 0:
+        return []
+    cutoff = (datetime.now(timezone.utc) - timedelta(minutes=stale_minutes)).isoformat()
+    result = (
+        supabase.table(ITEMS_TABLE)
+        .select("call_id, state, attempts, payload")
+        .neq("state", "saved")
+        .lt("attempts", max_attempts)
+        .lt("updated_at", cutoff)
+        .order("priority", desc=True)
+        .order("updated_at")
+        .limit(limit)
+        .execute()
+    )
+    return [resume_call({}, item) for item in result.data if item["call_id"] not in exclude]
+
+
+def checkpoint(
+    supabase,
+    calls: list[dict[str, Any]],
+    state: str,
+    run_id: str | None,
+    batch_size: int,
+) -> int:
+    """
+    Move calls forward to ``state`` and store their payload. Calls already at
+    or past ``state`` are left as they are. Returns the rows written; a failed
+    checkpoint only costs repeated (cached) work later, so it is just logged.
+    """
+    rank = state_rank(state)
+    rows = []
+    for call in calls:
+        key = item_key(call)
+        if not key or state_rank(call.get(STATE_KEY)) >= rank:
+            continue
+        payload = {k: v for k, v in call.items() if k not in TRANSIENT_FIELDS}
+        rows.append({
+            "call_id": key,
+            "state": state,
+            "priority": call.get(PRIORITY_KEY) or 0,
+            "dag_run_id": run_id,
+            # Staged rows are already JSON-safe; anything else is stringified
+            "payload": json.loads(json.dumps(payload, default=str)),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+        call[STATE_KEY] = state
+
+    if not rows:
+        return 0
+    _, failed = upsert_in_batches(supabase, ITEMS_TABLE, rows, "call_id", batch_size)
+    if failed:
+        logger.warning(f"Failed to checkpoint {len(failed)} of {len(rows)} calls as {state}")
+    return len(rows) - len(failed)
+
+
+def requeue(
+    supabase,
+    calls: list[dict[str, Any]],
+    items: dict[str, dict[str, Any]],
+    run_id: str | None,
+    batch_size: int,
+) -> int:
+    """
+    Put calls whose transcript arrived late back at the front of the resume
+    scan with their attempts reset, merging the new fields into the stored
+    payload. Calls that are already saved are left alone.
+    """
+    rows = []
+    for call in calls:
+        key = item_key(call)
+        item = items.get(key) or {}
+        if not key or item.get("state") == "saved":
+            continue
+        payload = {**(item.get("payload") or {}), **{k: v for k, v in call.items() if k not in TRANSIENT_FIELDS}}
+        rows.append({
+            "call_id": key,
+            "state": item["state"] if state_rank(item.get("state")) > state_rank("inserted") else "inserted",
+            "payload": json.loads(json.dumps(payload, default=str)),
+            "priority": payload.get(PRIORITY_KEY) or 0,
+            "attempts": 0,
+            "dag_run_id": run_id,
+            # Oldest possible, so load_resumable picks these up on the next scan
+            "updated_at": REQUEUED_AT,
+        })
+    if rows:
+        upsert_in_batches(supabase, ITEMS_TABLE, rows, "call_id", batch_size)
+    return len(rows)
+
+
+def defer(supabase, calls: list[dict[str, Any]], run_id: str | None, batch_size: int) -> int:
+    """
+    Leave calls that didn't fit this run's scoring budget for a later run,
+    with their deferral counted and their priority stored. New calls are
+    checkpointed as ``fetched`` so the resume scan finds them; resumed calls
+    keep their state and attempts.
+    """
+    rows = []
+    for call in calls:
+        key = item_key(call)
+        if not key:
+            continue
+        call[DEFERRALS_KEY] = (call.get(DEFERRALS_KEY) or 0) + 1
+        call[STATE_KEY] = call.get(STATE_KEY) or "fetched"
+        payload = {k: v for k, v in call.items() if k not in TRANSIENT_FIELDS}
+        rows.append({
+            "call_id": key,
+            "state": call[STATE_KEY],
+            "priority": call.get(PRIORITY_KEY) or 0,
+            "dag_run_id": run_id,
+            "payload": json.loads(json.dumps(payload, default=str)),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    if not rows:
+        return 0
+    _, failed = upsert_in_batches(supabase, ITEMS_TABLE, rows, "call_id", batch_size)
+    if failed:
+        logger.warning(f"Failed to defer {len(failed)} of {len(rows)} calls")
+    return len(rows) - len(failed)
+
+
+def claim(supabase, calls: list[dict[str, Any]], run_id: str | None, batch_size: int) -> None:
+    """Count an attempt against every resumed call picked up by this run."""
+    rows = [
+        {
+            "call_id": item_key(call),
+            "state": call[STATE_KEY],
+            "attempts": call.get("sync_attempts", 0) + 1,
+            "dag_run_id": run_id,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for call in calls
+        if call.get(STATE_KEY) and item_key(call)
+    ]
+    if rows:
+        upsert_in_batches(supabase, ITEMS_TABLE, rows, "call_id", batch_size)
@@ -0,0 +1,193 @@
+"""
+Token-aware transcript compaction for Gemini prompts.
+
+Cutting transcripts at a fixed character count drops the end of long calls,
+which is where resolution, payment terms and compliance disclosures are, and
+still spends tokens on timestamps and "uh-huh" turns in short ones. Instead
+transcripts are parsed into speaker turns, timestamps and extra whitespace
+are stripped, backchannel turns are dropped (merging the turns around them),
+and what is left is fitted to a token budget: the opening and closing of the
+call are always kept and the middle is sampled evenly, with a marker for
+every gap.
+"""
+
+from __future__ import annotations
+
+import re
+
+from call_sync.near_dup import TIMESTAMP_RE
+from call_sync.scoring import CHARS_PER_TOKEN, estimate_tokens
+
+SPEAKER_LABEL_RE = re.compile(
+    r"^\s*(agent|customer|caller|rep|representative|speaker\s*\d*|channel\s*\d+)\s*[:\-]\s*",
+    re.IGNORECASE,
+)
+WHITESPACE_RE = re.compile(r"\s+")
+BACKCHANNEL_WORD_RE = re.compile(r"[^a-z\- ]+")
+
+# Whole-turn acknowledgements that carry nothing for the audit. "Yes"/"no"
+# are deliberately not here: they answer verification and consent questions.
+BACKCHANNELS = {
+    "uh-huh", "uh huh", "mm-hmm", "mm hmm", "mhm", "hmm", "mm", "um", "uh",
+    "ok", "okay", "alright", "all right", "yeah", "yep", "right", "sure",
+    "got it", "i see", "oh", "oh okay", "okay okay",
+}
+
+# Share of the budget kept verbatim from the start and end of the call
+HEAD_SHARE = 0.3
+TAIL_SHARE = 0.4
+
+
+def parse_turns(transcript: str) -> list[tuple[str, str]]:
+    """
+    Split a NAS transcript into ``(speaker, text)`` turns.
+
+    Lines without a speaker label continue the previous turn. Transcripts
+    without any labels come back as one unlabelled turn per line.
+    """
+    turns: list[tuple[str, str]] = []
+    for line in transcript.splitlines():
+        line = WHITESPACE_RE.sub(" ", TIMESTAMP_RE.sub(" ", line)).strip()
+        if not line:
+            continue
+        label = SPEAKER_LABEL_RE.match(line)
+        if label:
+            turns.append((label.group(1).title(), line[label.end():].strip()))
+        elif turns and turns[-1][0]:
+            turns[-1] = (turns[-1][0], f"{turns[-1][1]} {line}")
+        else:
+            turns.append(("", line))
+    return turns
+
+
+def is_backchannel(text: str) -> bool:
+    words = WHITESPACE_RE.sub(" ", BACKCHANNEL_WORD_RE.sub(" ", text.lower())).strip()
+    return not words or words in BACKCHANNELS
+
+
+def collapse_backchannels(turns: list[tuple[str, str]]) -> tuple[list[tuple[str, str]], int]:
+    """Drop backchannel turns and merge consecutive turns by the same speaker."""
+    collapsed: list[tuple[str, str]] = []
+    dropped = 0
+    for speaker, text in turns:
+        if speaker and is_backchannel(text):
+            dropped += 1
+            continue
+        if collapsed and speaker and collapsed[-1][0] == speaker:
+            collapsed[-1] = (speaker, f"{collapsed[-1][1]} {text}")
+        else:
+            collapsed.append((speaker, text))
+    return collapsed, dropped
+
+
+def render_turn(turn: tuple[str, str]) -> str:
+    speaker, text = turn
+    return f"{speaker}: {text}" if speaker else text
+
+
+def _clip(line: str, max_tokens: int) -> str:
+    """Cut the middle out of one oversized turn, keeping both of its ends."""
+    keep = max(1, max_tokens * CHARS_PER_TOKEN // 2)
+    if len(line) <= 2 * keep:
+        return line
+    return f"{line[:keep]} ... {line[-keep:]}"
+
+
+def _omitted(count: int) -> str:
+    return f"[... {count} turn{'s' if count != 1 else ''} omitted ...]"
+
+
+def fit_to_budget(lines: list[str], max_tokens: int) -> tuple[list[str], int]:
+    """
+    Fit rendered turns to ``max_tokens``: whole turns from the start and end
+    of the call first, then an even sample of the middle with what is left.
+    Returns the kept lines (with gap markers) and the number of turns omitted.
+    """
+    if sum(estimate_tokens(line) + 1 for line in lines) <= max_tokens:
+        return lines, 0
+
+    if len(lines) == 1:
+        return [_clip(lines[0], max_tokens - 2)], 0
+
+    # No single turn may crowd out the rest of the call
+    lines = [_clip(line, max(1, max_tokens // 4)) for line in lines]
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    marker_cost = estimate_tokens(_omitted(len(lines))) + 1
+    # Room for the gap marker after the head; each sampled turn adds another
+    budget = max_tokens - marker_cost
+
+    head_end = 0
+    used = 0
+    while head_end < len(lines) and used + costs[head_end] <= budget * HEAD_SHARE:
+        used += costs[head_end]
+        head_end += 1
+
+    tail_start = len(lines)
+    while tail_start > head_end and used + costs[tail_start - 1] <= budget * (HEAD_SHARE + TAIL_SHARE):
+        tail_start -= 1
+        used += costs[tail_start]
+
+    # Evenly spaced middle turns, in order, while they fit
+    middle = range(head_end, tail_start)
+    sampled: list[int] = []
+    remaining = budget - used
+    if middle and remaining > 0:
+        average = sum(costs[i] for i in middle) / len(middle) + marker_cost
+        target = max(1, min(len(middle), int(remaining // average)))
+        for n in range(target):
+            i = middle[int(n * len(middle) / target)]
+            if costs[i] + marker_cost <= remaining:
+                sampled.append(i)
+                remaining -= costs[i] + marker_cost
+
+    kept = [*range(head_end), *sampled, *range(tail_start, len(lines))]
+    fitted: list[str] = []
+    previous = -1
+    for i in [*kept, len(lines)]:
+        if i - previous > 1:
+            fitted.append(_omitted(i - previous - 1))
+        if i < len(lines):
+            fitted.append(lines[i])
+        previous = i
+    return fitted, len(lines) - len(kept)
+
+
+def compact_transcript(transcript: str, max_tokens: int) -> tuple[str, dict[str, int]]:
+    """
+    Compacted transcript for the audit prompt, plus ``original_tokens``,
+    ``tokens``, ``turns``, ``backchannels`` and ``omitted_turns`` counts.
+    """
+    turns, backchannels = collapse_backchannels(parse_turns(transcript))
+    fitted, omitted = fit_to_budget([render_turn(turn) for turn in turns], max_tokens)
+    text = "\n".join(fitted)
+    return text, {
+        "original_tokens": estimate_tokens(transcript),
+        "tokens": estimate_tokens(text),
+        "turns": len(turns),
+        "backchannels": backchannels,
+        "omitted_turns": omitted,
+    }
+
+
+def fit_transcripts(
+    transcripts: dict[str, str],
+    max_tokens: int,
+    compact: bool = True,
+) -> tuple[dict[str, str], dict[str, int]]:
+    """
+    Every transcript fitted to ``max_tokens`` (compacted, or cut when
+    compaction is off), plus ``tokens_in``, ``tokens_out``, ``backchannels``
+    and ``omitted_turns`` totals.
+    """
+    fitted: dict[str, str] = {}
+    totals = dict.fromkeys(("tokens_in", "tokens_out", "backchannels", "omitted_turns"), 0)
+    for key, transcript in transcripts.items():
+        if compact:
+            fitted[key], compaction = compact_transcript(transcript, max_tokens)
+            totals["backchannels"] += compaction["backchannels"]
+            totals["omitted_turns"] += compaction["omitted_turns"]
+        else:
+            fitted[key] = transcript[: max_tokens * CHARS_PER_TOKEN]
+        totals["tokens_in"] += estimate_tokens(transcript)
+        totals["tokens_out"] += estimate_tokens(fitted[key])
+    return fitted, totals
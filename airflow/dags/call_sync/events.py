@@ -0,0 +1,144 @@
+"""
+Webhook event queue for near-real-time scoring.
+
+The ``five9-webhook`` edge function writes every recording event to
+``call_sync_events``. The ``call_sync_events`` DAG waits on that queue with a
+deferrable trigger (see ``call_sync/triggers.py``) and, once EVENTS_BATCH_SIZE
+events are waiting or the oldest has waited EVENTS_MAX_WAIT_SECONDS, claims
+them and runs the usual per-call stages over them as one micro-batch.
+
+Claims are leases: events claimed by a run that never acknowledges them are
+claimable again after EVENTS_LEASE_SECONDS, up to EVENTS_MAX_ATTEMPTS times.
+Once a call has a checkpoint, its event is acknowledged and any remaining
+work belongs to the resume path in ``call_sync/checkpoints.py``.
+
+The webhook used to invoke the ``transcribe-call`` and ``analyze-conversation``
+edge functions itself; they need the ``calls`` row id, which only exists once
+the DAG has inserted the call, so the DAG invokes them instead: transcription
+for events that carry a recording but no transcript, conversation analysis
+once a call's report card is saved. A call handed to ``transcribe-call`` is
+audited by the edge functions, so its checkpoint goes straight to ``saved``
+and the resume scan never scores it a second time.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from call_sync.blobs import BlobStore
+
+logger = logging.getLogger(__name__)
+
+EVENTS_TABLE = "call_sync_events"
+
+
+def queue_backlog(supabase, lease_seconds: int, max_attempts: int) -> dict[str, Any]:
+    """Claimable event count and the oldest claimable event's arrival time."""
+    result = supabase.rpc(
+        "call_sync_event_backlog",
+        {"lease_seconds": lease_seconds, "max_attempts": max_attempts},
+    ).execute()
+    row = result.data[0] if result.data else {}
+    return {"ready": row.get("ready") or 0, "oldest_received_at": row.get("oldest_received_at")}
+
+
+def batch_ready(
+    backlog: dict[str, Any],
+    batch_size: int,
+    max_wait_seconds: float,
+    now: datetime | None = None,
+) -> bool:
+    """True once a full batch is waiting, or any event has waited long enough."""
+    if backlog["ready"] >= batch_size:
+        return True
+    if not backlog["ready"] or not backlog["oldest_received_at"]:
+        return False
+    now = now or datetime.now(timezone.utc)
+    oldest = datetime.fromisoformat(backlog["oldest_received_at"].replace("Z", "+00:00"))
+    return (now - oldest).total_seconds() >= max_wait_seconds
+
+
+def claim_events(
+    supabase,
+    max_events: int,
+    run_id: str | None,
+    lease_seconds: int,
+    max_attempts: int,
+) -> list[dict[str, Any]]:
+    """Lease up to ``max_events`` events for this run, oldest first."""
+    result = supabase.rpc(
+        "claim_call_sync_events",
+        {
+            "max_events": max_events,
+            "run_id": run_id,
+            "lease_seconds": lease_seconds,
+            "max_attempts": max_attempts,
+        },
+    ).execute()
+    return result.data or []
+
+
+def ack_events(supabase, run_id: str | None, skipped: list[str] | None = None) -> int:
+    """
+    Mark this run's events done where the call now has a checkpoint or a
+    calls row, plus the ``skipped`` call ids that will never be synced.
+    """
+    result = supabase.rpc("ack_call_sync_events", {"run_id": run_id, "skipped": skipped or []}).execute()
+    return result.data if isinstance(result.data, int) else 0
+
+
+def event_row(event: dict[str, Any], store: BlobStore) -> dict[str, Any]:
+    """
+    A queued webhook event as a staged row shaped like a Five9 query row.
+
+    The webhook already carries the recording and transcript URLs, so they
+    are kept as links instead of being rebuilt from the NAS layout. An inline
+    transcript goes straight to the blob store and is never fetched.
+    """
+    payload = event.get("payload") or {}
+    row = {
+        "recording_id": payload.get("recordingId"),
+        "call_id": event["call_id"],
+        "upload_timestamp": event.get("received_at"),
+        "call_timestamp": payload.get("callStartTime"),
+        "length_seconds": payload.get("callDuration"),
+        "call_type": payload.get("callType"),
+        "number1": payload.get("customerPhone") or payload.get("ani"),
+        "first_name": payload.get("customerName"),
+        "last_name": None,
+        "disposition": payload.get("disposition") or payload.get("wrapUpCode"),
+        "campaign": payload.get("campaignName"),
+        "agent_name": payload.get("agentUsername"),
+        "agent_email": payload.get("agentEmail") or payload.get("agentUsername"),
+        "recording_link": payload.get("recordingUrl") or "",
+        "transcript_link": payload.get("transcriptUrl") or "",
+        "summary_link": "",
+        "event_received_at": event.get("received_at"),
+        # Nothing to fetch from the NAS: the recording has to be transcribed
+        "transcribe_recording": bool(
+            payload.get("recordingUrl") and not payload.get("transcriptUrl") and not payload.get("transcriptText")
+        ),
+    }
+    if payload.get("transcriptText"):
+        row["transcript_hash"] = store.put(payload["transcriptText"])
+    return row
+
+
+def invoke_edge_function(supabase, function: str, bodies: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Invoke a Supabase edge function once per body, logging failures like the
+    webhook did rather than failing the task. Returns the bodies whose
+    invocation succeeded.
+    """
+    invoked = []
+    for body in bodies:
+        try:
+            supabase.functions.invoke(function, invoke_options={"body": body})
+            invoked.append(body)
+        except Exception as e:
+            logger.warning(f"Failed to invoke {function} for call {body.get('callId')}: {e}")
+    if bodies:
+        logger.info(f"Invoked {function} for {len(invoked)}/{len(bodies)} calls")
+    return invoked
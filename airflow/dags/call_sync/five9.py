@@ -0,0 +1,140 @@
+"""
+Five9 extraction query.
+
+The voicemail/hangup filter used to be five ``LOWER(ISNULL(disposition,
+'')) NOT LIKE '%...%'`` predicates, which can't use an index, so every run
+scanned ``call_recording_logs``. ``sql/five9_call_sync_index.sql`` adds a
+persisted ``is_scorable`` column with the same classification and an index
+on ``(deleted, is_scorable, upload_timestamp, recording_id)``, so the query
+becomes a seek on the sync window. Until that script is applied the query
+falls back to the LIKE predicates.
+
+Recording, transcript and summary links are no longer built in SQL either;
+``nas_links`` formats them in Python for the calls that are actually new.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CALL_TABLE = "fivenine.call_recording_logs"
+SCORABLE_COLUMN = "is_scorable"
+
+# Must match the CASE expression in sql/five9_call_sync_index.sql
+UNSCORABLE_DISPOSITIONS = ("voicemail", "vm", "no answer", "busy", "disconnected")
+
+# Anything shorter is treated as a hangup
+MIN_CALL_SECONDS = 30
+
+COLUMNS = (
+    "recording_id",
+    "upload_timestamp",
+    "file_name",
+    "call_timestamp",
+    "length_seconds",
+    "call_type",
+    "number1",
+    "email",
+    "first_name",
+    "last_name",
+    "inf_cust_id",
+    "disposition",
+    "campaign",
+    "agent_name",
+    "agent_email",
+    "agent_group",
+    "deleted",
+    "status",
+    "call_id",
+    "server_name",
+    "file_path",
+)
+
+# Five9 recordings backed up from the F9 server live under this NAS share
+F9_SERVER = "F9"
+F9_SHARE = "/Five9VmBackup/"
+RECORDINGS_RE = re.compile("recordings", re.IGNORECASE)
+
+
+def has_scorable_column(cursor) -> bool:
+    """True once the ``is_scorable`` column from the index script exists."""
+    cursor.execute(f"SELECT COL_LENGTH('{CALL_TABLE}', '{SCORABLE_COLUMN}') AS length")
+    row = cursor.fetchone()
+    return bool(row and row["length"])
+
+
+def disposition_predicate(pushdown: bool) -> str:
+    if pushdown:
+        return f"{SCORABLE_COLUMN} = 1"
+    # %% because pymssql formats the query with pyformat parameters
+    return "\n            AND ".join(
+        f"LOWER(ISNULL(disposition, '')) NOT LIKE '%%{pattern}%%'"
+        for pattern in UNSCORABLE_DISPOSITIONS
+    )
+
+
+def build_query(window_sql: str, pushdown: bool) -> str:
+    """
+    Scorable calls in the sync window, newest first.
+
+    With ``pushdown`` every predicate except the agent email check is covered
+    by the sync index.
+    """
+    columns = ",\n            ".join(COLUMNS)
+    return f"""
+        SELECT
+            {columns}
+        FROM {CALL_TABLE}
+        WHERE
+            {window_sql}
+            AND deleted = 0
+            -- Filter out voicemails based on disposition
+            AND {disposition_predicate(pushdown)}
+            -- Filter out very short calls (likely hangups)
+            AND length_seconds >= {MIN_CALL_SECONDS}
+            AND agent_email IS NOT NULL
+            AND agent_email != ''
+        ORDER BY upload_timestamp DESC
+        """
+
+
+def is_scorable(row: dict[str, Any]) -> bool:
+    """
+    The query's disposition, length and agent filter for rows that didn't
+    come through it, e.g. webhook events.
+    """
+    disposition = (row.get("disposition") or "").lower()
+    if any(pattern in disposition for pattern in UNSCORABLE_DISPOSITIONS):
+        return False
+    return (row.get("length_seconds") or 0) >= MIN_CALL_SECONDS and bool(row.get("agent_email"))
+
+
+def nas_links(call: dict[str, Any], base_url: str) -> dict[str, str]:
+    """
+    Recording, transcript and summary URLs for a Five9 row.
+
+    Same rules the query used to apply with CONCAT/REPLACE: transcripts and
+    summaries exist only for F9 recordings, next to the recording with
+    ``recordings`` swapped in the path, named after the call id (or the
+    file name prefix when there is none) and the agent email.
+    """
+    file_path = call.get("file_path") or ""
+    file_name = call.get("file_name") or ""
+    if call.get("server_name") != F9_SERVER:
+        return {
+            "recording_link": f"{base_url}{file_path}{file_name}",
+            "transcript_link": "",
+            "summary_link": "",
+        }
+
+    share = f"{base_url}{F9_SHARE}"
+    stem = f"{call.get('call_id') or file_name.split('_')[0]}_{call.get('agent_email') or ''}"
+    return {
+        "recording_link": f"{share}{file_path}{file_name}",
+        "transcript_link": f"{share}{RECORDINGS_RE.sub('transcripts', file_path)}{stem}_transcript.txt",
+        "summary_link": f"{share}{RECORDINGS_RE.sub('summaries', file_path)}{stem}_summary.txt",
+    }
@@ -0,0 +1,186 @@
+"""
+Stage instrumentation for the call sync DAG.
+
+Each task creates a ``TaskMetrics``, times its stages, counts items and
+round trips, and records latency samples. Everything is sent to Airflow's
+StatsD client as it happens (``call_sync.<task>.<name>``), so Prometheus can
+scrape it through statsd-exporter once ``[metrics] statsd_on`` is set. At the
+end of the task the summary is pushed to XCom under ``metrics``, where
+``record_run`` rolls the whole run up into ``call_sync_runs``.
+
+Per-call outcomes go to ``call_sync_logs`` in batches.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from airflow.operators.python import get_current_context
+from airflow.stats import Stats
+
+from call_sync.stats import percentile
+from call_sync.writers import write_in_batches
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "call_sync"
+XCOM_KEY = "metrics"
+
+
+class TaskMetrics:
+    """Timings, counters and latency samples for one task instance."""
+
+    def __init__(self, task: str):
+        self.task = task
+        self.timings: Counter[str] = Counter()
+        self.counters: Counter[str] = Counter()
+        self.samples: dict[str, list[float]] = {}
+        self.gauges: dict[str, float] = {}
+        self._started = time.monotonic()
+
+    def _name(self, name: str) -> str:
+        return f"{METRIC_PREFIX}.{self.task}.{name}"
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block; repeated stages with the same name accumulate."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self.timings[name] += elapsed_ms
+            Stats.timing(self._name(f"{name}.duration"), elapsed_ms)
+
+    def incr(self, name: str, count: int | float = 1) -> None:
+        if count:
+            self.counters[name] += count
+            Stats.incr(self._name(name), count)
+
+    def observe(self, name: str, value_ms: float) -> None:
+        """Record one latency sample in milliseconds."""
+        self.samples.setdefault(name, []).append(value_ms)
+        Stats.timing(self._name(name), value_ms)
+
+    def gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+        Stats.gauge(self._name(name), value)
+
+    def instrument_supabase(self, supabase) -> None:
+        """Count PostgREST round trips and response bytes on a Supabase client."""
+
+        def on_response(response) -> None:
+            self.incr("supabase.requests")
+            self.incr("supabase.bytes", int(response.headers.get("content-length") or 0))
+            if response.status_code >= 400:
+                self.incr("supabase.errors")
+
+        session = supabase.postgrest.session
+        session.event_hooks = {
+            **session.event_hooks,
+            "response": [*session.event_hooks.get("response", []), on_response],
+        }
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "task": self.task,
+            "wall_ms": round((time.monotonic() - self._started) * 1000, 1),
+            "timings_ms": {k: round(v, 1) for k, v in self.timings.items()},
+            "counters": dict(self.counters),
+            "gauges": self.gauges,
+            "histograms": {
+                name: {
+                    "count": len(values),
+                    "p50": round(percentile(values, 50), 1),
+                    "p95": round(percentile(values, 95), 1),
+                    "p99": round(percentile(values, 99), 1),
+                    "max": round(max(values), 1),
+                }
+                for name, values in self.samples.items()
+                if values
+            },
+        }
+
+    def publish(self) -> dict[str, Any]:
+        """Emit the task wall time, log the summary and push it to XCom."""
+        summary = self.summary()
+        Stats.timing(self._name("wall"), summary["wall_ms"])
+        logger.info(f"{self.task} metrics: {summary}")
+        try:
+            get_current_context()["ti"].xcom_push(key=XCOM_KEY, value=summary)
+        except Exception as e:
+            # Outside a running task (e.g. local scripts) there's nothing to push to
+            logger.debug(f"Skipping metrics XCom push: {e}")
+        return summary
+
+
+def merge_summaries(summaries: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Roll task summaries up into one run summary.
+
+    Timings and counters are summed per task name, so mapped shards add up;
+    histogram percentiles are kept per task instance since they can't be
+    combined exactly.
+    """
+    by_task: dict[str, dict[str, Any]] = {}
+    for summary in summaries:
+        merged = by_task.setdefault(
+            summary["task"],
+            {"instances": 0, "wall_ms": 0.0, "timings_ms": Counter(), "counters": Counter(), "histograms": {}},
+        )
+        merged["instances"] += 1
+        merged["wall_ms"] += summary["wall_ms"]
+        merged["timings_ms"].update(summary["timings_ms"])
+        merged["counters"].update(summary["counters"])
+        for name, histogram in summary["histograms"].items():
+            # Worst instance is what matters for capacity planning
+            current = merged["histograms"].get(name)
+            if current is None or histogram["p95"] > current["p95"]:
+                merged["histograms"][name] = histogram
+
+    totals: Counter[str] = Counter()
+    for merged in by_task.values():
+        totals.update(merged["counters"])
+        merged["wall_ms"] = round(merged["wall_ms"], 1)
+        merged["timings_ms"] = {k: round(v, 1) for k, v in merged["timings_ms"].items()}
+        merged["counters"] = dict(merged["counters"])
+
+    return {"tasks": by_task, "totals": dict(totals)}
+
+
+def log_call_outcomes(
+    supabase,
+    outcomes: list[dict[str, Any]],
+    run_id: str | None,
+    batch_size: int,
+) -> None:
+    """
+    Insert ``call_sync_logs`` rows for ``{"call_id", "status", "error_message",
+    "failure_reason"}`` outcomes. Logging failures never fail the task.
+    """
+    rows = [
+        {
+            "call_id": str(outcome["call_id"]),
+            "status": outcome["status"],
+            "error_message": outcome.get("error_message"),
+            "failure_reason": outcome.get("failure_reason"),
+            "dag_run_id": run_id,
+        }
+        for outcome in outcomes
+        if outcome.get("call_id")
+    ]
+    if not rows:
+        return
+
+    write_in_batches(
+        rows,
+        batch_size,
+        lambda batch: supabase.table("call_sync_logs").insert(batch, returning="minimal").execute().data,
+        label="call_sync_logs",
+        key="call_id",
+    )
@@ -0,0 +1,205 @@
+"""
+Concurrent transcript and summary fetcher for the NAS.
+
+All requests share one keep-alive ``requests.Session`` whose connection pool
+is capped per host, so a thread pool can fan out without opening a fresh
+TCP/TLS connection per file or flooding the NAS. Transient errors are retried
+with exponential backoff, and the whole fetch is bounded by a deadline that
+leaves headroom under the task's execution_timeout.
+
+With a ``NasMirror`` the fetcher serves known files from the mirror, sends
+conditional requests for stale ones and skips files recently found missing.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from call_sync.nas_mirror import FETCH, SERVE, NasMirror
+from call_sync.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+# Anything shorter is an error page or an empty placeholder, not a transcript
+MIN_TEXT_LENGTH = 10
+
+
+def build_session(
+    max_connections_per_host: int,
+    retries: int,
+    backoff_factor: float,
+) -> requests.Session:
+    """Create a pooled session that retries transient NAS failures."""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=max_connections_per_host,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class NasFetcher:
+    """Fetch transcript and summary text for many calls with bounded concurrency."""
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        max_connections_per_host: int = 8,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        request_timeout: float = 30,
+        deadline_seconds: float = 480,
+    ):
+        self.max_workers = max_workers
+        self.request_timeout = request_timeout
+        self.deadline_seconds = deadline_seconds
+        self.session = build_session(max_connections_per_host, retries, backoff_factor)
+        self.latencies: list[float] = []
+        self.bytes_fetched = 0
+        self.failures = 0
+        self.timed_out = 0
+        self.mirror_hits = 0
+        self.not_modified = 0
+        self.negative_skips = 0
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def _get_text(
+        self, url: str, deadline: float, headers: dict[str, str] | None = None
+    ) -> tuple[int, str | None, dict[str, str | None]]:
+        """
+        GET one file. Returns the status, the text (None unless it is a real
+        transcript or summary) and the response's cache validators.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("NAS fetch deadline exceeded")
+
+        started = time.monotonic()
+        try:
+            resp = self.session.get(url, timeout=min(self.request_timeout, remaining), headers=headers)
+        finally:
+            with self._lock:
+                self.latencies.append(time.monotonic() - started)
+
+        validators = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+        if resp.status_code == 304:
+            with self._lock:
+                self.not_modified += 1
+            return 304, None, validators
+        if resp.ok and len(resp.text) >= MIN_TEXT_LENGTH:
+            with self._lock:
+                self.bytes_fetched += len(resp.content)
+            return resp.status_code, resp.text, validators
+        return resp.status_code, None, validators
+
+    def fetch_all(
+        self, calls: list[dict[str, Any]], mirror: NasMirror | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Return the calls with ``transcript_text`` and ``summary_text`` attached.
+
+        Transcript and summary for a call are separate jobs so they download in
+        parallel. Anything not finished by the deadline is left as None.
+        """
+        started = time.monotonic()
+        deadline = started + self.deadline_seconds
+        texts: dict[tuple[int, str], str | None] = {}
+        jobs = [
+            (index, kind, call.get(url_key) or "")
+            for index, call in enumerate(calls)
+            for kind, url_key in (("transcript", "transcript_link"), ("summary", "summary_link"))
+        ]
+        entries = mirror.lookup([url for _, _, url in jobs if url]) if mirror else {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="nas")
+        try:
+            futures = {}
+            for index, kind, url in jobs:
+                if not url:
+                    continue
+                headers = None
+                if mirror:
+                    action, value = mirror.plan(entries.get(url))
+                    if action != FETCH:
+                        if action == SERVE:
+                            self.mirror_hits += 1
+                        else:
+                            self.negative_skips += 1
+                        texts[(index, kind)] = value
+                        continue
+                    headers = value
+                futures[executor.submit(self._get_text, url, deadline, headers)] = (index, kind, url)
+
+            pending = set(futures)
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, kind, url = futures[future]
+                    try:
+                        status, text, validators = future.result()
+                        if mirror:
+                            text = mirror.record(url, entries.get(url), status, text, validators)
+                        texts[(index, kind)] = text
+                    except Exception as e:
+                        self.failures += 1
+                        logger.warning(f"Failed to fetch {kind} for {calls[index].get('call_id')}: {e}")
+
+            if pending:
+                self.timed_out = len(pending)
+                logger.warning(f"NAS deadline reached with {len(pending)} fetches outstanding")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        self.elapsed = time.monotonic() - started
+        return [
+            {
+                **call,
+                "transcript_text": texts.get((index, "transcript")),
+                "summary_text": texts.get((index, "summary")),
+            }
+            for index, call in enumerate(calls)
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        """Per-run throughput and latency percentiles."""
+        elapsed = self.elapsed
+        return {
+            "requests": len(self.latencies),
+            "failures": self.failures,
+            "timed_out": self.timed_out,
+            "mirror_hits": self.mirror_hits,
+            "not_modified": self.not_modified,
+            "negative_skips": self.negative_skips,
+            "bytes": self.bytes_fetched,
+            "elapsed_s": round(elapsed, 3),
+            "requests_per_s": round(len(self.latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency_p50_ms": round(percentile(self.latencies, 50) * 1000, 1),
+            "latency_p95_ms": round(percentile(self.latencies, 95) * 1000, 1),
+            "latency_p99_ms": round(percentile(self.latencies, 99) * 1000, 1),
+        }
@@ -0,0 +1,155 @@
+"""
+Worker-local mirror of NAS transcript and summary files, keyed by URL.
+
+Transcripts are often not on the NAS yet when a call first shows up, and
+every resume of a pending call used to hit the NAS again for the same 404.
+The mirror remembers what each URL returned:
+
+- found files point at their body in the blob store, with the ETag and
+  Last-Modified the NAS sent; they are served without a request for
+  NAS_MIRROR_REVALIDATE_HOURS and revalidated with a conditional GET after
+- missing files are negative-cached and only rechecked after
+  NAS_MISSING_RECHECK_MINUTES, doubling on every miss up to
+  NAS_MISSING_RECHECK_MAX_HOURS
+
+The index is a SQLite file under NAS_MIRROR_DIR, read and written only from
+the thread that drives ``NasFetcher.fetch_all``. Bodies live in the shared
+blob store, so a pruned blob just means the next lookup downloads it again.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+from call_sync.blobs import BlobStore
+from call_sync.writers import chunked
+
+logger = logging.getLogger(__name__)
+
+# Entries untouched this long are dropped when the mirror is opened
+ENTRY_TTL_SECONDS = 14 * 24 * 3600
+
+# What plan() tells the fetcher to do with a URL
+SERVE = "serve"
+SKIP = "skip"
+FETCH = "fetch"
+
+
+class NasMirror:
+    """URL -> (blob hash, validators) index with negative caching of missing files."""
+
+    def __init__(
+        self,
+        mirror_dir: str,
+        store: BlobStore,
+        revalidate_hours: float = 24,
+        recheck_minutes: float = 15,
+        max_recheck_hours: float = 12,
+    ):
+        Path(mirror_dir).mkdir(parents=True, exist_ok=True)
+        self.store = store
+        self.revalidate_seconds = revalidate_hours * 3600
+        self.recheck_seconds = recheck_minutes * 60
+        self.max_recheck_seconds = max_recheck_hours * 3600
+        self.conn = sqlite3.connect(Path(mirror_dir) / "nas_mirror.sqlite3", timeout=30)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS nas_mirror (
+                url TEXT PRIMARY KEY,
+                digest TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                misses INTEGER NOT NULL DEFAULT 0,
+                checked_at REAL NOT NULL,
+                next_check_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("DELETE FROM nas_mirror WHERE checked_at < ?", (time.time() - ENTRY_TTL_SECONDS,))
+        self.conn.commit()
+
+    def lookup(self, urls: list[str]) -> dict[str, dict[str, Any]]:
+        """Mirror entries for ``urls``; URLs never seen are absent."""
+        entries: dict[str, dict[str, Any]] = {}
+        columns = ("url", "digest", "etag", "last_modified", "misses", "checked_at", "next_check_at")
+        for batch in chunked(list(set(urls)), 500):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT {', '.join(columns)} FROM nas_mirror WHERE url IN ({placeholders})",
+                batch,
+            ).fetchall()
+            entries.update((row[0], dict(zip(columns, row))) for row in rows)
+        return entries
+
+    def plan(self, entry: dict[str, Any] | None, now: float | None = None) -> tuple[str, Any]:
+        """
+        What to do for one URL: ``(SERVE, text)`` from the mirror, ``(SKIP,
+        None)`` for a miss that isn't due for a recheck, or ``(FETCH,
+        headers)`` with conditional headers when the mirror has validators.
+        """
+        now = now or time.time()
+        if entry is None:
+            return FETCH, {}
+
+        if not entry["digest"]:
+            return (SKIP, None) if now < entry["next_check_at"] else (FETCH, {})
+
+        if not self.store.exists(entry["digest"]):
+            return FETCH, {}
+        if now - entry["checked_at"] < self.revalidate_seconds:
+            return SERVE, self.store.get(entry["digest"])
+
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return FETCH, headers
+
+    def record(
+        self,
+        url: str,
+        entry: dict[str, Any] | None,
+        status: int,
+        text: str | None,
+        validators: dict[str, str | None],
+    ) -> str | None:
+        """
+        Update the mirror with a NAS response and return the body to use:
+        the new text, the mirrored text on 304, or None for a missing file.
+        Server errors are left out of the negative cache.
+        """
+        now = time.time()
+        if status == 304 and entry and entry["digest"]:
+            self.conn.execute(
+                "UPDATE nas_mirror SET checked_at = ?, next_check_at = ? WHERE url = ?",
+                (now, now, url),
+            )
+            return self.store.get(entry["digest"])
+
+        if text is not None:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO nas_mirror VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (url, self.store.put(text), validators.get("etag"), validators.get("last_modified"), now, now),
+            )
+            return text
+
+        if status >= 500:
+            return None
+
+        misses = (entry["misses"] if entry and not entry["digest"] else 0) + 1
+        delay = min(self.recheck_seconds * 2 ** (misses - 1), self.max_recheck_seconds)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO nas_mirror VALUES (?, NULL, NULL, NULL, ?, ?, ?)",
+            (url, misses, now, now + delay),
+        )
+        return None
+
+    def close(self) -> None:
+        """Commit everything recorded during the fetch and close the index."""
+        self.conn.commit()
+        self.conn.close()
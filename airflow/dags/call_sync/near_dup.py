@@ -0,0 +1,228 @@
+"""
+Near-duplicate transcript detection for the audit cache.
+
+Exact cache keys miss transcripts that differ only in timestamps, speaker
+labels, filler words or names, which is most of our scripted outbound
+collection calls. Here transcripts are normalized, shingled into word
+5-grams and summarized with a MinHash signature. LSH band keys are stored
+next to ``audit_cache`` in ``audit_cache_minhash`` so candidates can be found
+with one array-overlap query, then confirmed against the full signature.
+
+NEAR_DUP_MODE controls what happens with a match:
+- ``off`` (default): skip the stage entirely; sketching every pending
+  transcript is pure-Python CPU work, so it only runs when asked for
+- ``shadow``: only count and log the Gemini calls reuse would save
+- ``reuse``: serve the matched cached audit instead of calling Gemini
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import random
+import re
+from typing import Any
+
+from call_sync.writers import chunked, upsert_in_batches
+
+logger = logging.getLogger(__name__)
+
+INDEX_TABLE = "audit_cache_minhash"
+
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+NUM_BANDS = 16  # 8 rows per band: candidates start around 0.7 Jaccard
+
+# Too few shingles and unrelated short calls start to look alike
+MIN_SHINGLES = 20
+
+# Transcripts per candidate query; each contributes NUM_BANDS values to the URL
+QUERY_CHUNK_SIZE = 10
+
+TIMESTAMP_RE = re.compile(r"\[?\(?\b\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?\b\)?\]?")
+SPEAKER_RE = re.compile(
+    r"^\s*(?:agent|customer|caller|rep|representative|speaker\s*\d*|channel\s*\d+)\s*[:\-]",
+    re.IGNORECASE | re.MULTILINE,
+)
+FILLER_RE = re.compile(r"\b(?:um+|uh+|erm+|hmm+|mm+|ah+|uh-huh|you know|i mean|like)\b")
+NUMBER_RE = re.compile(r"\d+")
+NON_WORD_RE = re.compile(r"[^a-z#' ]+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_transcript(transcript: str, names: list[str] | None = None) -> str:
+    """
+    Reduce a transcript to the words that matter for the audit.
+
+    Strips timestamps, speaker labels and filler words, masks digits and the
+    given names (agent/customer), and collapses whitespace.
+    """
+    text = TIMESTAMP_RE.sub(" ", transcript)
+    text = SPEAKER_RE.sub(" ", text)
+    text = text.lower()
+    for name in names or []:
+        for part in name.lower().split():
+            if len(part) > 1:
+                text = re.sub(rf"\b{re.escape(part)}\b", " name ", text)
+    text = FILLER_RE.sub(" ", text)
+    text = NUMBER_RE.sub("#", text)
+    text = NON_WORD_RE.sub(" ", text)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def shingles(normalized: str) -> set[int]:
+    """Hashed word n-grams of a normalized transcript."""
+    words = normalized.split()
+    if len(words) < SHINGLE_SIZE:
+        return {_hash64(normalized)} if normalized else set()
+    return {
+        _hash64(" ".join(words[i : i + SHINGLE_SIZE]))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+class MinHasher:
+    """MinHash signatures from universal hashes ``(a*x + b) mod p``."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = [rng.randrange(1, MERSENNE_PRIME) for _ in range(num_perm)]
+        self.b = [rng.randrange(0, MERSENNE_PRIME) for _ in range(num_perm)]
+
+    def signature(self, items: set[int]) -> list[int]:
+        return [
+            min((a * x + b) % MERSENNE_PRIME for x in items)
+            for a, b in zip(self.a, self.b)
+        ]
+
+
+def band_keys(signature: list[int], num_bands: int = NUM_BANDS) -> list[str]:
+    """LSH band keys; two signatures sharing any key are candidates."""
+    rows = len(signature) // num_bands
+    return [
+        f"{band}:{hashlib.blake2b(repr(signature[band * rows : (band + 1) * rows]).encode(), digest_size=8).hexdigest()}"
+        for band in range(num_bands)
+    ]
+
+
+def estimated_similarity(a: list[int], b: list[int]) -> float:
+    """Estimated Jaccard similarity from two MinHash signatures."""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class NearDuplicateDetector:
+    """Find already-audited transcripts that are near-identical to new ones."""
+
+    def __init__(self, supabase, model: str, criteria_hash: str, threshold: float):
+        self.supabase = supabase
+        self.model = model
+        self.criteria_hash = criteria_hash
+        self.threshold = threshold
+        self.hasher = MinHasher()
+        self.checked = 0
+        self.matched_cached = 0
+        self.matched_in_run = 0
+        self.samples: list[dict[str, Any]] = []
+
+    def sketch(self, transcript: str, names: list[str] | None = None) -> dict[str, Any] | None:
+        """Signature and band keys for a transcript, or None if it is too short."""
+        items = shingles(normalize_transcript(transcript, names))
+        if len(items) < MIN_SHINGLES:
+            return None
+        signature = self.hasher.signature(items)
+        return {"signature": signature, "bands": band_keys(signature), "shingle_count": len(items)}
+
+    def _candidates(self, sketches: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+        rows: dict[str, dict[str, Any]] = {}
+        for batch in chunked(list(sketches.values()), QUERY_CHUNK_SIZE):
+            bands = sorted({band for sketch in batch for band in sketch["bands"]})
+            result = (
+                self.supabase.table(INDEX_TABLE)
+                .select("transcript_hash, signature")
+                .eq("ai_model", self.model)
+                .eq("criteria_hash", self.criteria_hash)
+                .ov("bands", bands)
+                .execute()
+            )
+            rows.update((r["transcript_hash"], r) for r in result.data)
+        return list(rows.values())
+
+    def find_matches(self, sketches: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        """
+        Match each new transcript (keyed by cache key) against the index and
+        against earlier transcripts in the same run.
+
+        Returns ``{cache_key: {"match": other_key, "similarity": s, "in_run": bool}}``
+        for matches at or above the threshold.
+        """
+        if not sketches:
+            return {}
+
+        by_band: dict[str, list[tuple[str, list[int], bool]]] = {}
+        for row in self._candidates(sketches):
+            for band in band_keys(row["signature"]):
+                by_band.setdefault(band, []).append((row["transcript_hash"], row["signature"], False))
+
+        matches: dict[str, dict[str, Any]] = {}
+        for key, sketch in sketches.items():
+            self.checked += 1
+            best: dict[str, Any] | None = None
+            seen: set[str] = set()
+            for band in sketch["bands"]:
+                for other_key, other_signature, in_run in by_band.get(band, []):
+                    if other_key in seen or other_key == key:
+                        continue
+                    seen.add(other_key)
+                    similarity = estimated_similarity(sketch["signature"], other_signature)
+                    if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                        best = {"match": other_key, "similarity": similarity, "in_run": in_run}
+
+            if best:
+                matches[key] = best
+                if best["in_run"]:
+                    self.matched_in_run += 1
+                else:
+                    self.matched_cached += 1
+                if len(self.samples) < 10:
+                    self.samples.append({"key": key, **best})
+            else:
+                # Unmatched transcripts become candidates for later ones in this run
+                for band in sketch["bands"]:
+                    by_band.setdefault(band, []).append((key, sketch["signature"], True))
+
+        return matches
+
+    def index(self, sketches: dict[str, dict[str, Any]], batch_size: int) -> None:
+        """Add signatures for newly cached audits to the index."""
+        rows = [
+            {
+                "transcript_hash": key,
+                "ai_model": self.model,
+                "criteria_hash": self.criteria_hash,
+                "bands": sketch["bands"],
+                "signature": sketch["signature"],
+                "shingle_count": sketch["shingle_count"],
+            }
+            for key, sketch in sketches.items()
+        ]
+        if rows:
+            upsert_in_batches(self.supabase, INDEX_TABLE, rows, "transcript_hash", batch_size)
+
+    def stats(self) -> dict[str, Any]:
+        """Shadow-mode report: Gemini calls reuse would (or did) save."""
+        return {
+            "checked": self.checked,
+            "matched_cached": self.matched_cached,
+            "matched_in_run": self.matched_in_run,
+            "gemini_calls_saveable": self.matched_cached + self.matched_in_run,
+            "threshold": self.threshold,
+            "samples": self.samples,
+        }
@@ -0,0 +1,320 @@
+"""
+Deterministic rule pre-scorer for scripted audit criteria.
+
+Criteria like QQ (qualifying questions) and VCI (verify customer info) mostly
+come down to whether the agent said the required script lines, which Gemini
+is slow and expensive to confirm. Before a call goes to Gemini its agent turns
+are normalized and run through one Aho-Corasick automaton built from every
+rule phrase, and each criterion with rules gets a PASS/FAIL decision and a
+confidence:
+
+- PASS when every required phrase was said (or, without required phrases,
+  at least ``min_hits`` of them), more confident the more optional phrases
+  were said too
+- FAIL when none of the phrases were said in a call long enough that they
+  should have been
+- anything in between is left to Gemini
+
+Decisions at or above PRESCORE_MIN_CONFIDENCE are final and only the
+remaining criteria are asked of Gemini; a call whose criteria are all
+decided is not sent at all. A prohibited-language hit leaves the whole call
+to Gemini. Phrases come from the built-in defaults below, the
+``script_templates`` and ``keyword_libraries`` tables, and a criterion's own
+``phrases`` in the audit template.
+
+PRESCORE_MODE controls what happens with the decisions:
+- ``off`` (default): skip the stage entirely
+- ``shadow``: send everything to Gemini and count how often the
+  decisions agree with it
+- ``on``: use the decisions and send Gemini only what is left
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from collections import deque
+from typing import Any
+
+from call_sync.compaction import parse_turns
+from call_sync.near_dup import normalize_transcript
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "rules"
+
+# Phrases for the fallback criteria; templates and script tables add to these
+DEFAULT_RULES: dict[str, dict[str, Any]] = {
+    "QQ": {
+        "min_hits": 2,
+        "phrases": [
+            {"phrase": "are you currently employed"},
+            {"phrase": "who is your employer"},
+            {"phrase": "how often do you get paid"},
+            {"phrase": "when is your next payday"},
+            {"phrase": "do you have a checking account"},
+            {"phrase": "direct deposit"},
+            {"phrase": "monthly income"},
+        ],
+    },
+    "VCI": {
+        "phrases": [
+            {"phrase": "verify", "required": True},
+            {"phrase": "date of birth"},
+            {"phrase": "last four"},
+            {"phrase": "social security"},
+            {"phrase": "mailing address"},
+            {"phrase": "confirm your address"},
+        ],
+    },
+}
+
+# Which script_templates / keyword_libraries categories feed which criterion
+SCRIPT_CATEGORIES = {"verification": "VCI"}
+LIBRARY_CATEGORIES: dict[str, str] = {}
+PROHIBITED_CATEGORY = "prohibited"
+# Softer prohibited phrases ("you must") are too common to send a call to Gemini over
+PROHIBITED_MIN_WEIGHT = 0.9
+
+# Agent words after which a missing script line is a confident FAIL
+FULL_CALL_AGENT_WORDS = 300
+# Confidence scale for transcripts without speaker labels
+UNLABELLED_PENALTY = 0.9
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over word tokens. Matching whole words means
+    phrases only match at word boundaries, and every phrase is found in one
+    pass over the transcript however many rules there are.
+    """
+
+    def __init__(self, phrases: list[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[set[str]] = [set()]
+        for phrase in phrases:
+            self._add(phrase)
+        self._link()
+
+    def _add(self, phrase: str) -> None:
+        state = 0
+        for word in phrase.split():
+            if word not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+                self.goto[state][word] = len(self.goto) - 1
+            state = self.goto[state][word]
+        self.output[state].add(phrase)
+
+    def _link(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(word, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def find(self, words: list[str]) -> set[str]:
+        """Every phrase that occurs in ``words``."""
+        found: set[str] = set()
+        state = 0
+        for word in words:
+            while state and word not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(word, 0)
+            found |= self.output[state]
+        return found
+
+
+def normalize_phrase(phrase: str) -> str:
+    """A rule phrase normalized the same way as transcripts."""
+    return normalize_transcript(phrase)
+
+
+def load_rule_sources(supabase) -> dict[str, list[dict[str, Any]]]:
+    """Active script templates and keyword libraries from Supabase."""
+    scripts = (
+        supabase.table("script_templates")
+        .select("category, required_phrases")
+        .eq("is_active", True)
+        .execute()
+    )
+    libraries = (
+        supabase.table("keyword_libraries")
+        .select("category, keywords")
+        .eq("is_active", True)
+        .execute()
+    )
+    return {"scripts": scripts.data or [], "libraries": libraries.data or []}
+
+
+def build_rules(criteria: list[dict[str, Any]], sources: dict[str, list[dict[str, Any]]]) -> dict[str, Any]:
+    """
+    Rule set for the run's criteria: phrases per criterion id, prohibited
+    phrases, and a fingerprint that changes whenever any of them change.
+    Criteria with no phrases from any source are always left to Gemini.
+    """
+    rules: dict[str, dict[str, Any]] = {}
+    for criterion in criteria:
+        base = DEFAULT_RULES.get(criterion["id"], {})
+        phrases = [*base.get("phrases", []), *(criterion.get("phrases") or [])]
+        if phrases:
+            rules[criterion["id"]] = {"min_hits": criterion.get("min_hits", base.get("min_hits", 1)), "phrases": phrases}
+
+    for script in sources.get("scripts", []):
+        criterion_id = SCRIPT_CATEGORIES.get(script.get("category"))
+        if criterion_id in rules:
+            rules[criterion_id]["phrases"].extend(script.get("required_phrases") or [])
+
+    prohibited: list[str] = []
+    for library in sources.get("libraries", []):
+        keywords = [k["phrase"] for k in library.get("keywords") or [] if k.get("phrase")]
+        if library.get("category") == PROHIBITED_CATEGORY:
+            prohibited.extend(
+                k["phrase"] for k in library.get("keywords") or []
+                if k.get("phrase") and k.get("weight", 1.0) >= PROHIBITED_MIN_WEIGHT
+            )
+        elif LIBRARY_CATEGORIES.get(library.get("category")) in rules:
+            rules[LIBRARY_CATEGORIES[library["category"]]]["phrases"].extend({"phrase": k} for k in keywords)
+
+    # Normalize and dedupe; a phrase required by any source stays required
+    for rule in rules.values():
+        merged: dict[str, dict[str, Any]] = {}
+        for entry in rule["phrases"]:
+            phrase = normalize_phrase(entry["phrase"])
+            if phrase:
+                required = merged.get(phrase, {}).get("required", False) or bool(entry.get("required"))
+                merged[phrase] = {"phrase": phrase, "required": required}
+        rule["phrases"] = sorted(merged.values(), key=lambda e: e["phrase"])
+
+    rule_set = {
+        "rules": {k: v for k, v in rules.items() if v["phrases"]},
+        "prohibited": sorted({p for p in map(normalize_phrase, prohibited) if p}),
+    }
+    rule_set["fingerprint"] = hashlib.sha256(json.dumps(rule_set, sort_keys=True).encode()).hexdigest()[:16]
+    return rule_set
+
+
+class PreScorer:
+    """Decides the criteria it has rules for, with a confidence per decision."""
+
+    def __init__(self, rule_set: dict[str, Any], min_confidence: float):
+        self.rules = rule_set["rules"]
+        self.min_confidence = min_confidence
+        self.prohibited = set(rule_set["prohibited"])
+        phrases = {e["phrase"] for rule in self.rules.values() for e in rule["phrases"]}
+        self.matcher = PhraseMatcher(sorted(phrases | self.prohibited))
+
+    def agent_words(self, transcript: str) -> tuple[list[str], bool]:
+        """Normalized words the agent said, and whether speakers were labelled."""
+        turns = parse_turns(transcript)
+        labelled = any(speaker for speaker, _ in turns)
+        text = " ".join(
+            body for speaker, body in turns
+            if not labelled or speaker.lower() in ("agent", "rep", "representative")
+        )
+        return normalize_transcript(text).split(), labelled
+
+    def decide(self, transcript: str) -> dict[str, dict[str, Any]]:
+        """
+        A decision for every criterion with rules, keyed by criterion id, in
+        the audit's criteria format plus ``source`` and ``confidence``. Use
+        ``confident`` to keep only the ones to act on.
+        """
+        words, labelled = self.agent_words(transcript)
+        found = self.matcher.find(words)
+        if found & self.prohibited:
+            return {}
+
+        decisions = {}
+        for criterion_id, rule in self.rules.items():
+            required = [e["phrase"] for e in rule["phrases"] if e["required"]]
+            optional = [e["phrase"] for e in rule["phrases"] if not e["required"]]
+            hits = sorted(found & {e["phrase"] for e in rule["phrases"]})
+            optional_share = len(found & set(optional)) / len(optional) if optional else 1.0
+
+            if required and all(p in found for p in required):
+                result, confidence = "PASS", 0.9 + 0.1 * optional_share
+            elif not required and len(hits) >= rule["min_hits"]:
+                result, confidence = "PASS", min(1.0, 0.85 + 0.05 * (len(hits) - rule["min_hits"] + 1))
+            elif not hits:
+                result, confidence = "FAIL", 0.95 * min(1.0, len(words) / FULL_CALL_AGENT_WORDS)
+            else:
+                # Some of the script but not enough: a judgement call for Gemini
+                result, confidence = "PARTIAL", 0.5
+
+            if not labelled:
+                confidence *= UNLABELLED_PENALTY
+            missing = [p for p in required if p not in found] or ([] if hits else [e["phrase"] for e in rule["phrases"]])
+            decisions[criterion_id] = {
+                "id": criterion_id,
+                "result": result,
+                "score": {"PASS": 100, "PARTIAL": 50, "FAIL": 0}[result],
+                "explanation": (
+                    f"Agent said: {', '.join(hits)}" if hits else "Agent said none of the script phrases"
+                ),
+                "recommendation": f"Say: {', '.join(missing[:3])}" if result != "PASS" and missing else "",
+                "source": SOURCE,
+                "confidence": round(confidence, 3),
+            }
+        return decisions
+
+    def confident(self, decisions: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        """Decisions confident enough to skip Gemini for."""
+        return {
+            k: d for k, d in decisions.items()
+            if d["result"] != "PARTIAL" and d["confidence"] >= self.min_confidence
+        }
+
+
+def full_result(criteria: list[dict[str, Any]], decided: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """
+    An audit result for a call whose criteria were all decided by rules.
+    Dimension scores average the criteria in that dimension; dimensions
+    without criteria get the overall score.
+    """
+    results = [decided[c["id"]] for c in criteria]
+    overall = round(sum(r["score"] for r in results) / len(results), 1)
+    by_dimension: dict[str, list[float]] = {}
+    for criterion, result in zip(criteria, results):
+        by_dimension.setdefault(criterion.get("dimension") or "compliance", []).append(result["score"])
+
+    def dimension_score(name: str) -> float:
+        scores = by_dimension.get(name)
+        return round(sum(scores) / len(scores), 1) if scores else overall
+
+    passed = [c["name"] for c, r in zip(criteria, results) if r["result"] == "PASS"]
+    failed = [c["name"] for c, r in zip(criteria, results) if r["result"] != "PASS"]
+    return {
+        "overall_score": overall,
+        **{
+            f"{name}_score": dimension_score(name)
+            for name in ("communication", "compliance", "accuracy", "tone", "empathy", "resolution")
+        },
+        "summary": f"Scored from script rules: {len(passed)} of {len(results)} criteria passed.",
+        "strengths": passed,
+        "areas_for_improvement": failed,
+        "recommendations": [r["recommendation"] for r in results if r["recommendation"]],
+        "criteria": results,
+        "ai_model": f"prescorer-{SOURCE}",
+        "ai_provider": SOURCE,
+    }
+
+
+def merge_result(audit_result: dict[str, Any], decided: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Gemini's audit of the remaining criteria with the rule decisions added back."""
+    criteria = [c for c in audit_result.get("criteria") or [] if c.get("id") not in decided]
+    return {**audit_result, "criteria": [*criteria, *decided.values()]}
+
+
+def agreement(decided: dict[str, dict[str, Any]], audit_result: dict[str, Any]) -> dict[str, bool]:
+    """Per criterion, whether a rule decision matches Gemini's result for it."""
+    gemini = {c.get("id"): str(c.get("result", "")).upper() for c in audit_result.get("criteria") or []}
+    return {k: gemini[k] == d["result"] for k, d in decided.items() if k in gemini}
@@ -0,0 +1,251 @@
+"""
+Gemini audit prompts and response parsing.
+
+The instructions, criteria and JSON schema are identical for every call in a
+run, so they go in the model's system instruction once instead of being
+repeated in every request. That also gives Gemini a stable prefix for
+implicit prompt caching (see ``build_model`` in ``call_sync/scoring.py``).
+
+Batch mode (GEMINI_BATCH_SIZE > 1) packs several short transcripts into one
+request under a token budget and asks for a JSON array keyed by call id.
+Each element is validated on its own; anything missing or malformed is
+scored again as a single call. Responses are parsed with the salvaging
+parser in ``call_sync/responses.py``, and criteria and dimension scores
+missing from an otherwise usable audit are asked for again with
+``missing_criteria_prompt``. The ``read_*`` helpers turn each kind of
+engine outcome into audits and failure reasons.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from call_sync.responses import (
+    FAILURE_REASONS,
+    parse_audit,
+    repair_json,
+    salvage_audit,
+    salvage_criteria,
+    salvage_scores,
+)
+
+logger = logging.getLogger(__name__)
+
+AUDIT_SCHEMA = """{
+  "overall_score": 0-100,
+  "communication_score": 0-100,
+  "compliance_score": 0-100,
+  "accuracy_score": 0-100,
+  "tone_score": 0-100,
+  "empathy_score": 0-100,
+  "resolution_score": 0-100,
+  "summary": "2-3 sentence assessment",
+  "strengths": ["strength1", "strength2"],
+  "areas_for_improvement": ["area1", "area2"],
+  "recommendations": ["rec1", "rec2"],
+  "criteria": [
+    {"id": "CRITERION_ID", "result": "PASS|PARTIAL|FAIL|N/A", "score": 0-100, "explanation": "...", "recommendation": "..."}
+  ]
+}"""
+
+
+def build_preamble(criteria: list[dict[str, Any]]) -> str:
+    """Static audit instructions shared by every request in a run."""
+    criteria_text = "\n".join(
+        f"- {c['id']}: {c['name']} - {c['description']}"
+        for c in criteria
+    )
+    return f"""You are an expert call quality auditor. Analyze each call transcript you are given.
+
+CRITERIA TO EVALUATE:
+{criteria_text}
+
+For each call, return ONLY valid JSON with this structure:
+{AUDIT_SCHEMA}"""
+
+
+def decided_note(decided: dict[str, dict[str, Any]] | None) -> str:
+    """
+    Tell Gemini which criteria the rule pre-scorer already decided, so it
+    skips them in "criteria" but still weighs them in the overall scores.
+    """
+    if not decided:
+        return ""
+    results = ", ".join(f"{criterion_id}={d['result']}" for criterion_id, d in decided.items())
+    return f"ALREADY SCORED (leave these out of \"criteria\"): {results}\n"
+
+
+def single_prompt(transcript: str, decided: dict[str, dict[str, Any]] | None = None) -> str:
+    """Prompt for one transcript, already fitted to the token budget."""
+    return f"{decided_note(decided)}TRANSCRIPT:\n{transcript}"
+
+
+def batch_prompt(
+    entries: list[tuple[str, str]],
+    decided: dict[str, dict[str, dict[str, Any]]] | None = None,
+) -> str:
+    """
+    Prompt for several ``(call_id, transcript)`` pairs in one request;
+    ``decided`` holds pre-scored criteria by call id.
+    """
+    calls = "\n\n".join(
+        f"=== CALL {call_id} ===\n{decided_note((decided or {}).get(call_id))}{transcript}"
+        for call_id, transcript in entries
+    )
+    return (
+        f"Audit each of the following {len(entries)} calls independently.\n"
+        "Return ONLY a JSON array with one element per call: the structure above "
+        'plus a "call_id" field copied exactly from the CALL header.\n\n'
+        f"{calls}"
+    )
+
+
+def missing_criteria_prompt(transcript: str, criteria_ids: list[str], score_fields: list[str] | None = None) -> str:
+    """
+    Prompt for only the criteria (and dimension scores) missing from an
+    earlier response, so a truncated audit isn't paid for twice.
+    """
+    lines = ["Return ONLY a JSON object with:"]
+    if criteria_ids:
+        lines.append(
+            f'- "criteria": one element for each of {", ".join(criteria_ids)}, in the criteria structure above'
+        )
+    for field in score_fields or []:
+        lines.append(f'- "{field}": 0-100')
+    lines += ["Leave out every other field.", f"TRANSCRIPT:\n{transcript}"]
+    return "\n".join(lines)
+
+
+def is_valid_audit(result: Any) -> bool:
+    """Minimal shape check for one audit object."""
+    if not isinstance(result, dict):
+        return False
+    score = result.get("overall_score")
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        return False
+    return isinstance(result.get("criteria", []), list)
+
+
+def parse_batch_response(text: str | None, call_ids: list[str]) -> dict[str, dict[str, Any]]:
+    """
+    Valid audits from a batch response, keyed by call id. Unknown, duplicate
+    or malformed elements are dropped so those calls fall back to single
+    scoring.
+    """
+    if not text:
+        return {}
+    try:
+        # A truncated array keeps its complete elements
+        elements, _ = repair_json(text)
+    except ValueError as e:
+        logger.warning(f"Unparseable batch response for {len(call_ids)} calls: {e}")
+        return {}
+    if isinstance(elements, dict):
+        elements = elements.get("calls") or elements.get("results") or [elements]
+    if not isinstance(elements, list):
+        return {}
+
+    expected = set(call_ids)
+    seen: dict[str, int] = {}
+    valid: dict[str, dict[str, Any]] = {}
+    for element in elements:
+        if not isinstance(element, dict):
+            continue
+        call_id = str(element.get("call_id", ""))
+        if call_id not in expected:
+            continue
+        seen[call_id] = seen.get(call_id, 0) + 1
+        result = {k: v for k, v in element.items() if k != "call_id"}
+        if is_valid_audit(result):
+            valid[call_id] = result
+
+    # An id answered twice is ambiguous; rescore it alone
+    return {call_id: result for call_id, result in valid.items() if seen[call_id] == 1}
+
+
+def pack_batches(
+    items: list[tuple[str, int]],
+    max_calls: int,
+    token_budget: int,
+    max_item_tokens: int,
+) -> tuple[list[list[str]], list[str]]:
+    """
+    Greedily pack ``(key, tokens)`` items into batches of up to ``max_calls``
+    and ``token_budget`` tokens. Items over ``max_item_tokens``, and any batch
+    that ends up with a single item, are returned as singles.
+    """
+    batches: list[list[str]] = []
+    singles: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+
+    for key, tokens in items:
+        if tokens > max_item_tokens:
+            singles.append(key)
+            continue
+        if current and (len(current) >= max_calls or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(key)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+
+    singles.extend(batch[0] for batch in batches if len(batch) == 1)
+    return [batch for batch in batches if len(batch) > 1], singles
+
+
+
+def read_batch_outcome(
+    outcome: dict[str, Any],
+    batch: list[str],
+    call_ids: dict[str, str],
+    expected: dict[str, list[str]],
+) -> dict[str, dict[str, Any]]:
+    """
+    ``salvage_audit`` result for every key of a batch request that got a
+    usable audit; keys left out are scored again as single calls.
+    """
+    parsed = {} if outcome["error"] else parse_batch_response(outcome["text"], [call_ids[key] for key in batch])
+    salvaged = {key: salvage_audit(parsed.get(call_ids[key]), expected[key]) for key in batch}
+    return {key: audit for key, audit in salvaged.items() if audit["result"] is not None}
+
+
+def read_single_outcome(outcome: dict[str, Any], expected: list[str]) -> dict[str, Any]:
+    """
+    ``parse_audit`` result for a single-call request, plus the ``error`` to
+    log when there is no usable audit. Request errors keep their own message.
+    """
+    if outcome["error"]:
+        reason = "no_text" if outcome["error"].startswith("No response text") else "request_error"
+        return {
+            "result": None,
+            "missing": list(expected),
+            "missing_scores": [],
+            "reason": reason,
+            "repairs": [],
+            "error": outcome["error"],
+        }
+
+    parsed = parse_audit(outcome["text"], expected)
+    if parsed["result"] is None and outcome["finish_reason"] == "MAX_TOKENS":
+        parsed["reason"] = "truncated"
+    parsed["error"] = FAILURE_REASONS[parsed["reason"]] if parsed["result"] is None else None
+    return parsed
+
+
+def read_followup_outcome(
+    outcome: dict[str, Any],
+    missing_criteria: list[str],
+    missing_scores: list[str],
+) -> tuple[list[dict[str, Any]], dict[str, float]]:
+    """Criteria and dimension scores recovered by a ``missing_criteria_prompt`` request."""
+    if outcome["error"]:
+        return [], {}
+    try:
+        value, _ = repair_json(outcome["text"] or "")
+    except ValueError as e:
+        logger.warning(f"Unparseable follow-up response: {e}")
+        return [], {}
+    return salvage_criteria(value, missing_criteria), salvage_scores(value, missing_scores)
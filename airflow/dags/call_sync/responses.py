@@ -0,0 +1,288 @@
+"""
+Salvaging parser for Gemini audit responses.
+
+A response that is cut off at max_output_tokens or slightly malformed used
+to be dropped whole, and the tokens paid for it with it. Responses now go
+through three steps:
+
+- ``repair_json`` finds the JSON (inside a code fence or after leading
+  prose), and if it doesn't load, fixes trailing commas, missing commas
+  between elements and brackets left open before a closer. For a truncated
+  response it cuts back to the last complete element and closes the rest.
+- ``salvage_audit`` checks the result against the audit schema, keeps every
+  valid score and criterion, and lists the expected criteria and dimension
+  scores that are missing or unusable, so only those are asked for again.
+- every call that still can't be scored gets a short failure reason
+  (``FAILURE_REASONS``) for ``call_sync_logs`` and the run metrics.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterable
+
+SCORE_FIELDS = (
+    "overall_score",
+    "communication_score",
+    "compliance_score",
+    "accuracy_score",
+    "tone_score",
+    "empathy_score",
+    "resolution_score",
+)
+LIST_FIELDS = ("strengths", "areas_for_improvement", "recommendations")
+RESULTS = ("PASS", "PARTIAL", "FAIL", "N/A")
+RESULT_ALIASES = {"PASSED": "PASS", "FAILED": "FAIL", "NA": "N/A", "NOT APPLICABLE": "N/A"}
+
+FAILURE_REASONS = {
+    "no_transcript": "No transcript or transcript too short to score",
+    "request_error": "Gemini request failed",
+    "no_text": "Gemini returned no text (blocked or empty candidates)",
+    "truncated": "Response cut off before the overall scores",
+    "unparseable": "Response is not repairable JSON",
+    "not_an_object": "Response JSON is not an audit object",
+    "no_overall_score": "Response has no valid overall_score",
+    "missing_scores": "Response is missing dimension scores, also after a follow-up",
+    "save_failed": "Saving report card failed",
+}
+
+# Cut points tried, latest first, when cutting a truncated response back
+MAX_CUT_ATTEMPTS = 20
+
+FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+
+
+def extract_json(text: str) -> str:
+    """The JSON part of a response: inside a code fence if any, from the first bracket."""
+    text = text.strip()
+    fenced = FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    return text[min(starts):] if starts else text
+
+
+def _scan(text: str) -> tuple[str, list[str], bool, list[tuple[int, tuple[str, ...]]], set[str]]:
+    """
+    One pass over ``text`` outside strings, fixing what can be fixed in
+    place. Returns the fixed text, the closers still open at the end,
+    whether it ends inside a string, the cut points where everything before
+    is complete (with the closers open there), and the repairs made.
+    """
+    out: list[str] = []
+    stack: list[str] = []
+    cuts: list[tuple[int, tuple[str, ...]]] = []
+    repairs: set[str] = set()
+    in_string = escaped = False
+    last = ""
+
+    def drop_trailing_comma() -> None:
+        index = len(out) - 1
+        while index >= 0 and out[index].isspace():
+            index -= 1
+        if index >= 0 and out[index] == ",":
+            del out[index]
+            repairs.add("trailing_comma")
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                last = '"'
+            continue
+        if ch.isspace():
+            out.append(ch)
+            continue
+
+        if ch in '{["' and last in ("}", "]"):
+            out.append(",")
+            repairs.add("missing_comma")
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+            cuts.append((len(out), tuple(stack)))
+        elif ch in "}]":
+            if ch not in stack:
+                repairs.add("stray_closer")
+                continue
+            drop_trailing_comma()
+            while stack[-1] != ch:
+                out.append(stack.pop())
+                repairs.add("unclosed_bracket")
+            stack.pop()
+            out.append(ch)
+            cuts.append((len(out), tuple(stack)))
+        elif ch == ",":
+            if stack:
+                cuts.append((len(out), tuple(stack)))
+            out.append(ch)
+        else:
+            out.append(ch)
+        last = ch
+
+    return "".join(out), stack, in_string, cuts, repairs
+
+
+def _closes_element(open_closers: tuple[str, ...] | list[str]) -> bool:
+    """Whether closing these would finish an array element (object) the model never finished."""
+    return any(
+        closer == "}" and parent == "]"
+        for parent, closer in zip(open_closers, open_closers[1:])
+    )
+
+
+def repair_json(text: str) -> tuple[Any, list[str]]:
+    """
+    Parse a model response as JSON, repairing it if needed. Returns the value
+    and the repairs made (empty for clean JSON); raises ValueError when
+    nothing usable is left.
+    """
+    body = extract_json(text or "")
+    if not body:
+        raise ValueError("empty response")
+    try:
+        return json.loads(body), []
+    except ValueError:
+        pass
+
+    fixed, stack, in_string, cuts, repairs = _scan(body)
+    candidates = []
+    tail = fixed.rstrip()
+    # Closing as-is only when the text ends on a complete token (a number cut
+    # short would load as a different value), and never inside an unfinished
+    # criterion or call: those are dropped whole
+    if not in_string and tail[-1:] in ('}', ']', '"') and not _closes_element(stack):
+        candidates.append((tail + "".join(reversed(stack)), "truncated" if stack else None))
+    usable_cuts = [(end, open_at_cut) for end, open_at_cut in cuts if not _closes_element(open_at_cut)]
+    for end, open_at_cut in reversed(usable_cuts[-MAX_CUT_ATTEMPTS:]):
+        candidates.append((fixed[:end] + "".join(reversed(open_at_cut)), "dropped_partial_element"))
+
+    for candidate, repair in candidates:
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        if repair:
+            repairs.add(repair)
+        if stack or in_string:
+            repairs.add("truncated")
+        return value, sorted(repairs)
+    raise ValueError(f"unrepairable JSON ({len(body)} chars)")
+
+
+def _score(value: Any) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value.strip().rstrip("%"))
+        except ValueError:
+            return None
+    if not isinstance(value, (int, float)) or not 0 <= value <= 100:
+        return None
+    return value
+
+
+def _criterion(item: Any) -> dict[str, Any] | None:
+    """A criteria_results element with a known result, or None."""
+    if not isinstance(item, dict) or not isinstance(item.get("id"), str) or not item["id"].strip():
+        return None
+    result = str(item.get("result", "")).strip().upper()
+    result = RESULT_ALIASES.get(result, result)
+    if result not in RESULTS:
+        return None
+    criterion = {
+        "id": item["id"].strip(),
+        "result": result,
+        "explanation": str(item.get("explanation") or ""),
+        "recommendation": str(item.get("recommendation") or ""),
+    }
+    score = _score(item.get("score"))
+    if score is not None:
+        criterion["score"] = score
+    return criterion
+
+
+def salvage_criteria(value: Any, wanted: Iterable[str] | None = None) -> list[dict[str, Any]]:
+    """
+    Valid criteria from a response object (or bare array), first answer per
+    id, limited to ``wanted`` when given.
+    """
+    items = value.get("criteria") if isinstance(value, dict) else value
+    wanted = set(wanted) if wanted is not None else None
+    criteria, seen = [], set()
+    for item in items if isinstance(items, list) else []:
+        criterion = _criterion(item)
+        if criterion is None or criterion["id"] in seen:
+            continue
+        if wanted is not None and criterion["id"] not in wanted:
+            continue
+        seen.add(criterion["id"])
+        criteria.append(criterion)
+    return criteria
+
+
+def salvage_scores(value: Any, wanted: Iterable[str] = SCORE_FIELDS) -> dict[str, float]:
+    """Valid 0-100 scores among ``wanted`` from a response object."""
+    if not isinstance(value, dict):
+        return {}
+    scores = {}
+    for field in wanted:
+        score = _score(value.get(field))
+        if score is not None:
+            scores[field] = score
+    return scores
+
+
+def salvage_audit(value: Any, expected: Iterable[str]) -> dict[str, Any]:
+    """
+    The schema-valid part of an audit object. Returns ``result`` (None when
+    the call can't be scored), ``missing`` expected criterion ids,
+    ``missing_scores`` dimension scores left out and a failure ``reason``.
+    """
+    expected = list(expected)
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    if not isinstance(value, dict):
+        return {"result": None, "missing": expected, "missing_scores": [], "reason": "not_an_object"}
+
+    result: dict[str, Any] = salvage_scores(value)
+    if "overall_score" not in result:
+        return {"result": None, "missing": expected, "missing_scores": [], "reason": "no_overall_score"}
+
+    result["summary"] = str(value.get("summary") or "")
+    for field in LIST_FIELDS:
+        items = value.get(field)
+        result[field] = [str(item) for item in items if item] if isinstance(items, list) else []
+    result["criteria"] = salvage_criteria(value)
+
+    answered = {c["id"] for c in result["criteria"]}
+    return {
+        "result": result,
+        "missing": [criterion_id for criterion_id in expected if criterion_id not in answered],
+        "missing_scores": [field for field in SCORE_FIELDS if field not in result],
+        "reason": None,
+    }
+
+
+def parse_audit(text: str | None, expected: Iterable[str]) -> dict[str, Any]:
+    """``salvage_audit`` over a raw response, with the repairs it needed."""
+    expected = list(expected)
+    try:
+        value, repairs = repair_json(text or "")
+    except ValueError:
+        return {"result": None, "missing": expected, "missing_scores": [], "reason": "unparseable", "repairs": []}
+    salvaged = salvage_audit(value, expected)
+    if salvaged["result"] is None and "truncated" in repairs:
+        salvaged["reason"] = "truncated"
+    return {**salvaged, "repairs": repairs}
@@ -0,0 +1,57 @@
+"""
+Per-agent and per-team scorecard rollups.
+
+Dashboards that show agent averages, trends and team comparisons used to
+aggregate all of ``report_cards`` on every read. ``save_report_cards_batch``
+now also adds each newly saved card to ``scorecard_rollups`` (count, sum and
+sum of squares per score dimension) and ``scorecard_criteria_rollups``
+(PASS/PARTIAL/FAIL/N/A counts per criterion), keyed by agent or team and by
+UTC day, week and pay period. The cards of a batch are grouped before the
+upsert, in the same transaction that inserts them, so a retried save never
+counts a card twice.
+
+Cards written outside the DAG, team moves and new pay periods are folded in
+by rebuilding a date range: ``rebuild_rollups`` asks Postgres to recompute
+every period that overlaps each chunk of the range from ``report_cards``
+(``rebuild_scorecard_rollups``). Whole periods are replaced, so chunks that
+share a week or pay period give the same totals.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date, timedelta
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def split_days(start: date, end: date, chunk_days: int) -> list[tuple[date, date]]:
+    """``[start, end)`` as consecutive ranges of at most ``chunk_days`` days."""
+    if end <= start:
+        raise ValueError(f"Rollup range is empty: {start.isoformat()} >= {end.isoformat()}")
+    step = timedelta(days=max(1, chunk_days))
+    ranges = []
+    current = start
+    while current < end:
+        ranges.append((current, min(current + step, end)))
+        current += step
+    return ranges
+
+
+def rebuild_rollups(supabase, start: date, end: date, chunk_days: int = 7) -> dict[str, Any]:
+    """
+    Recompute the rollups of every period overlapping ``[start, end)``, one
+    chunk per request so each rebuild stays well inside the statement timeout.
+    """
+    ranges = split_days(start, end, chunk_days)
+    written = 0
+    for lower, upper in ranges:
+        result = supabase.rpc(
+            "rebuild_scorecard_rollups",
+            {"from_day": lower.isoformat(), "to_day": upper.isoformat()},
+        ).execute()
+        written += result.data or 0
+        logger.info(f"Rebuilt scorecard rollups for {lower} to {upper}")
+    return {"chunks": len(ranges), "rows": written}
+
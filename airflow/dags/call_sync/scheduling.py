@@ -0,0 +1,215 @@
+"""
+Priority- and budget-aware admission of calls for scoring.
+
+Without a budget every call in the work set is scored in fetch order. With
+SCORING_RUN_BUDGET_TOKENS, SCORING_DAILY_BUDGET_TOKENS or
+SCORING_DAILY_BUDGET_USD set, ``filter_existing_calls`` gives each call a
+priority and an estimated Gemini cost, and keeps only the highest-priority
+calls that fit in what is left of the budget:
+
+- recency: up to double for a fresh call, the boost halving every
+  SCORING_RECENCY_HALF_LIFE_HOURS (old calls in a backfill keep the rest of
+  their priority)
+- campaign: SCORING_CAMPAIGN_WEIGHTS, e.g. ``{"Collections": 2}``
+- disposition risk: SCORING_RISK_WEIGHT for dispositions matching
+  SCORING_RISK_DISPOSITIONS (disputes, cease and desist, attorneys, ...)
+- coaching: SCORING_COACHING_WEIGHT for agents with an open or recent
+  coaching session
+- sampling: agents below SCORING_AGENT_DAILY_TARGET audits today are boosted,
+  agents at it are damped
+- every earlier deferral raises the priority, so low-priority calls still
+  get through eventually
+
+Admission keeps a min-heap of the admitted calls, so memory is bounded by
+the budget rather than by the window. Calls that don't fit are checkpointed
+as ``fetched`` with their priority and roll over: the resume scan picks up
+unfinished items highest priority first. ``score_calls_with_gemini`` records
+actual spend in ``gemini_daily_spend`` after every checkpoint chunk and
+stops once the daily budget is used up.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any
+
+from call_sync.checkpoints import DEFERRALS_KEY
+
+logger = logging.getLogger(__name__)
+
+SPEND_TABLE = "gemini_daily_spend"
+
+# Speech runs at roughly 150 words a minute, about 3.3 tokens a second
+TOKENS_PER_CALL_SECOND = 3.5
+# A full audit object with explanations for every criterion
+OUTPUT_TOKENS_PER_CALL = 800
+DEFERRAL_BOOST = 0.5
+SAMPLING_BOOST = 1.0
+OVER_TARGET_WEIGHT = 0.5
+
+
+def budget_limits(config: dict[str, Any], spent: dict[str, float] | None) -> dict[str, float]:
+    """
+    What this run may still spend, by ``tokens`` and ``usd``; empty when no
+    budget is configured.
+    """
+    budget = config["budget"]
+    limits: dict[str, float] = {}
+    if budget["run_tokens"]:
+        limits["tokens"] = budget["run_tokens"]
+    if budget["daily_tokens"]:
+        used = (spent or {}).get("prompt_tokens", 0) + (spent or {}).get("output_tokens", 0)
+        limits["tokens"] = min(limits.get("tokens", float("inf")), max(0, budget["daily_tokens"] - used))
+    if budget["daily_usd"]:
+        limits["usd"] = max(0.0, budget["daily_usd"] - float((spent or {}).get("cost_usd", 0)))
+    return limits
+
+
+def cost_usd(prompt_tokens: float, output_tokens: float, budget_config: dict[str, Any]) -> float:
+    return (
+        prompt_tokens * budget_config["input_usd_per_mtok"]
+        + output_tokens * budget_config["output_usd_per_mtok"]
+    ) / 1_000_000
+
+
+def estimate_cost(call: dict[str, Any], config: dict[str, Any]) -> dict[str, float]:
+    """Expected Gemini spend for one call, from its duration before the transcript is fetched."""
+    max_tokens = config["transcripts"]["max_tokens"]
+    seconds = call.get("length_seconds")
+    try:
+        prompt_tokens = min(max_tokens, float(seconds) * TOKENS_PER_CALL_SECOND)
+    except (TypeError, ValueError):
+        prompt_tokens = max_tokens / 2
+    return {
+        "tokens": prompt_tokens + OUTPUT_TOKENS_PER_CALL,
+        "usd": cost_usd(prompt_tokens, OUTPUT_TOKENS_PER_CALL, config["budget"]),
+    }
+
+
+def load_spend(supabase, day: str | None = None) -> dict[str, float]:
+    """Gemini spend recorded so far for ``day`` (UTC, default today)."""
+    day = day or datetime.now(timezone.utc).date().isoformat()
+    result = supabase.table(SPEND_TABLE).select("prompt_tokens, output_tokens, cost_usd").eq("day", day).execute()
+    return result.data[0] if result.data else {"prompt_tokens": 0, "output_tokens": 0, "cost_usd": 0}
+
+
+def record_spend(supabase, prompt_tokens: int, output_tokens: int, cost: float, calls: int) -> None:
+    """Add a chunk's Gemini usage to today's spend; a failed write is only logged."""
+    if not (prompt_tokens or output_tokens):
+        return
+    try:
+        supabase.rpc(
+            "record_gemini_spend",
+            {
+                "spend_day": datetime.now(timezone.utc).date().isoformat(),
+                "prompt_tokens": prompt_tokens,
+                "output_tokens": output_tokens,
+                "cost_usd": round(cost, 6),
+                "calls": calls,
+            },
+        ).execute()
+    except Exception as e:
+        logger.warning(f"Failed to record Gemini spend: {e}")
+
+
+def daily_budget_left(supabase, config: dict[str, Any]) -> bool:
+    """False once today's recorded spend has reached a daily budget."""
+    budget = config["budget"]
+    if not (budget["daily_tokens"] or budget["daily_usd"]):
+        return True
+    limits = budget_limits({"budget": {**budget, "run_tokens": 0}}, load_spend(supabase))
+    return all(value > 0 for value in limits.values())
+
+
+def load_priority_context(supabase, config: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Today's audit count and coaching status per agent email."""
+    result = supabase.rpc(
+        "scoring_priority_context",
+        {"coaching_days": config["priority"]["coaching_days"]},
+    ).execute()
+    return {
+        row["email"].lower(): row
+        for row in result.data or []
+        if row.get("email")
+    }
+
+
+def call_priority(
+    call: dict[str, Any],
+    priority_config: dict[str, Any],
+    agents: dict[str, dict[str, Any]],
+    now: datetime | None = None,
+) -> float:
+    """Relative value of auditing this call now; higher goes first."""
+    now = now or datetime.now(timezone.utc)
+    priority = 1.0
+
+    started = call.get("call_timestamp") or call.get("upload_timestamp")
+    if started:
+        try:
+            started_at = datetime.fromisoformat(str(started).replace("Z", "+00:00"))
+            if started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            age_hours = max(0.0, (now - started_at).total_seconds() / 3600)
+            priority *= 1 + 0.5 ** (age_hours / priority_config["recency_half_life_hours"])
+        except ValueError:
+            pass
+
+    priority *= priority_config["campaign_weights"].get(call.get("campaign") or "", 1.0)
+    if priority_config["risk_re"].search(call.get("disposition") or ""):
+        priority *= priority_config["risk_weight"]
+
+    agent = agents.get((call.get("agent_email") or "").lower()) or {}
+    if agent.get("in_coaching"):
+        priority *= priority_config["coaching_weight"]
+    target = priority_config["agent_daily_target"]
+    if target:
+        audits = agent.get("audits_today") or 0
+        priority *= 1 + SAMPLING_BOOST * (target - audits) / target if audits < target else OVER_TARGET_WEIGHT
+
+    return priority * (1 + DEFERRAL_BOOST * (call.get(DEFERRALS_KEY) or 0))
+
+
+def priority_config(config: dict[str, Any]) -> dict[str, Any]:
+    """The priority settings with the risk pattern compiled and weights parsed."""
+    settings = config["priority"]
+    return {
+        **settings,
+        "campaign_weights": json.loads(settings["campaign_weights"] or "{}"),
+        "risk_re": re.compile(settings["risk_dispositions"] or r"(?!)", re.IGNORECASE),
+    }
+
+
+class BudgetAdmission:
+    """
+    Highest-priority calls whose estimated cost fits ``limits``. ``offer``
+    returns the calls pushed out, which may include the one just offered.
+    """
+
+    def __init__(self, limits: dict[str, float]):
+        self.limits = limits
+        self.totals = {name: 0.0 for name in limits}
+        self.heap: list[tuple[float, int, dict[str, float], dict[str, Any]]] = []
+        self.sequence = itertools.count()
+
+    def offer(self, call: dict[str, Any], priority: float, cost: dict[str, float]) -> list[dict[str, Any]]:
+        heapq.heappush(self.heap, (priority, next(self.sequence), cost, call))
+        for name in self.totals:
+            self.totals[name] += cost[name]
+
+        evicted = []
+        while self.heap and any(self.totals[name] > self.limits[name] for name in self.totals):
+            _, _, lowest_cost, lowest = heapq.heappop(self.heap)
+            for name in self.totals:
+                self.totals[name] -= lowest_cost[name]
+            evicted.append(lowest)
+        return evicted
+
+    def admitted(self) -> list[dict[str, Any]]:
+        """Admitted calls, highest priority first."""
+        return [call for _, _, _, call in sorted(self.heap, key=lambda entry: (-entry[0], entry[1]))]
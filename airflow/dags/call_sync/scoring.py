@@ -0,0 +1,458 @@
+"""
+Concurrent Gemini scoring engine.
+
+Runs many ``generate_content`` requests in flight from a thread pool while a
+shared limiter keeps the run under GEMINI_RPM requests and GEMINI_TPM tokens
+per minute. 429 and 5xx responses slow the limiter down and are retried with
+jittered exponential backoff; successes gradually restore the full rate.
+Every request carries its own timeout so one slow response can't stall the
+batch, and outcomes come back in input order.
+
+``score_chunk`` runs one checkpoint chunk of cache misses through the
+engines: batch requests where they fit, single calls for the rest, and one
+follow-up for whatever a usable response left out. The DAG task only keys
+calls, checks the caches and records what comes back.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any
+
+from call_sync.prompts import (
+    batch_prompt,
+    missing_criteria_prompt,
+    pack_batches,
+    read_batch_outcome,
+    read_followup_outcome,
+    read_single_outcome,
+    single_prompt,
+)
+from call_sync.responses import FAILURE_REASONS
+from call_sync.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Rough chars-per-token ratio used to reserve TPM budget before a request
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for budgeting; settled against real usage later."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate limits, server errors and timeouts."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+        return True
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests and tokens per minute.
+
+    ``slow_down`` halves the effective rate after a 429/5xx and ``speed_up``
+    creeps back towards the configured limits on success.
+    """
+
+    MIN_SCALE = 0.1
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.scale = 1.0
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(
+            self.requests_per_minute,
+            self._requests + elapsed * self.requests_per_minute * self.scale / 60,
+        )
+        self._tokens = min(
+            self.tokens_per_minute,
+            self._tokens + elapsed * self.tokens_per_minute * self.scale / 60,
+        )
+
+    def acquire(self, tokens: int) -> None:
+        """Block until one request and ``tokens`` tokens are available."""
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / (self.requests_per_minute * self.scale),
+                    (tokens - self._tokens) * 60 / (self.tokens_per_minute * self.scale),
+                    0.01,
+                )
+            time.sleep(min(wait, 1.0))
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """Correct the token bucket once real usage is known."""
+        with self._lock:
+            self._tokens = min(self.tokens_per_minute, self._tokens + reserved - actual)
+
+    def slow_down(self) -> None:
+        with self._lock:
+            self.scale = max(self.MIN_SCALE, self.scale / 2)
+
+    def speed_up(self) -> None:
+        with self._lock:
+            self.scale = min(1.0, self.scale + 0.05)
+
+
+class ScoringEngine:
+    """Score prompts concurrently against a Gemini ``GenerativeModel``."""
+
+    def __init__(
+        self,
+        model,
+        generation_config,
+        max_concurrency: int = 8,
+        requests_per_minute: int = 300,
+        tokens_per_minute: int = 1_000_000,
+        request_timeout: float = 60,
+        max_retries: int = 4,
+        backoff_seconds: float = 2.0,
+        limiter: RateLimiter | None = None,
+    ):
+        self.model = model
+        self.generation_config = generation_config
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_output_tokens = getattr(generation_config, "max_output_tokens", None) or 0
+        # Engines that share a limiter share one quota
+        self.limiter = limiter or RateLimiter(requests_per_minute, tokens_per_minute)
+        self.outcomes: list[dict[str, Any]] = []
+        self.elapsed = 0.0
+
+    def _score_one(self, prompt: str) -> dict[str, Any]:
+        reserved = estimate_tokens(prompt) + self.max_output_tokens
+        outcome: dict[str, Any] = {
+            "text": None,
+            "error": None,
+            "attempts": 0,
+            "latency_s": 0.0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "cached_tokens": 0,
+            "finish_reason": None,
+        }
+
+        for attempt in range(self.max_retries + 1):
+            outcome["attempts"] = attempt + 1
+            self.limiter.acquire(reserved)
+            started = time.monotonic()
+            try:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=self.generation_config,
+                    request_options={"timeout": self.request_timeout},
+                )
+            except Exception as e:
+                outcome["latency_s"] = time.monotonic() - started
+                self.limiter.settle(reserved, estimate_tokens(prompt))
+                if is_retryable(e) and attempt < self.max_retries:
+                    self.limiter.slow_down()
+                    delay = self.backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    logger.warning(f"Gemini request failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                outcome["error"] = str(e)
+                return outcome
+
+            outcome["latency_s"] = time.monotonic() - started
+            usage = getattr(response, "usage_metadata", None)
+            outcome["prompt_tokens"] = getattr(usage, "prompt_token_count", 0) or estimate_tokens(prompt)
+            outcome["output_tokens"] = getattr(usage, "candidates_token_count", 0) or 0
+            outcome["cached_tokens"] = getattr(usage, "cached_content_token_count", 0) or 0
+            self.limiter.settle(reserved, outcome["prompt_tokens"] + outcome["output_tokens"])
+            self.limiter.speed_up()
+            # e.g. MAX_TOKENS when the output budget cut the response short
+            candidates = getattr(response, "candidates", None) or []
+            finish_reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+            outcome["finish_reason"] = getattr(finish_reason, "name", None) or (str(finish_reason) if finish_reason else None)
+
+            try:
+                outcome["text"] = response.text
+            except Exception as e:
+                # Blocked or empty candidates raise on .text
+                outcome["error"] = f"No response text: {e}"
+            return outcome
+
+        return outcome
+
+    def score_all(self, prompts: list[str]) -> list[dict[str, Any]]:
+        """
+        Score every prompt and return one outcome per prompt, in input order.
+
+        Each outcome has ``text`` (or ``error``), ``attempts``, ``latency_s``,
+        ``prompt_tokens``, ``output_tokens``, ``cached_tokens`` and
+        ``finish_reason``.
+        """
+        if not prompts:
+            return []
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini") as executor:
+            outcomes = list(executor.map(self._score_one, prompts))
+        self.elapsed += time.monotonic() - started
+        self.outcomes.extend(outcomes)
+        return outcomes
+
+    def stats(self) -> dict[str, Any]:
+        """Per-run latency and token usage summary."""
+        latencies = [o["latency_s"] for o in self.outcomes]
+        return {
+            "requests": len(self.outcomes),
+            "errors": sum(1 for o in self.outcomes if o["error"]),
+            "retries": sum(o["attempts"] - 1 for o in self.outcomes),
+            "prompt_tokens": sum(o["prompt_tokens"] for o in self.outcomes),
+            "output_tokens": sum(o["output_tokens"] for o in self.outcomes),
+            "cached_tokens": sum(o["cached_tokens"] for o in self.outcomes),
+            "elapsed_s": round(self.elapsed, 3),
+            "calls_per_s": round(len(self.outcomes) / self.elapsed, 2) if self.elapsed else 0.0,
+            "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "final_rate_scale": round(self.limiter.scale, 2),
+        }
+
+
+def build_model(genai, model_name: str, preamble: str, context_cache: bool, min_cache_tokens: int):
+    """
+    GenerativeModel with the preamble as its system instruction, served from
+    explicit cached content when enabled and the preamble is big enough.
+
+    Returns ``(model, cached_content)``; delete ``cached_content`` when done.
+    """
+    if context_cache:
+        if estimate_tokens(preamble) < min_cache_tokens:
+            logger.info(
+                f"Audit preamble is ~{estimate_tokens(preamble)} tokens, below the "
+                f"{min_cache_tokens}-token context cache minimum; using implicit caching"
+            )
+        else:
+            try:
+                cached = genai.caching.CachedContent.create(
+                    model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+                    system_instruction=preamble,
+                    ttl=timedelta(minutes=30),
+                )
+                return genai.GenerativeModel.from_cached_content(cached_content=cached), cached
+            except Exception as e:
+                logger.warning(f"Context cache unavailable for {model_name}, sending preamble inline: {e}")
+
+    return genai.GenerativeModel(model_name, system_instruction=preamble), None
+
+
+def build_engines(
+    genai,
+    model,
+    gemini_config: dict[str, Any],
+    shard_concurrency: int,
+) -> tuple[ScoringEngine, ScoringEngine | None]:
+    """
+    Single-call engine, and a batch engine with room for a whole array in
+    batch mode. Every shard gets an equal slice of the quota, shared by
+    single and batch requests.
+    """
+    limiter = RateLimiter(
+        max(1, gemini_config["requests_per_minute"] // shard_concurrency),
+        max(1, gemini_config["tokens_per_minute"] // shard_concurrency),
+    )
+
+    def build_engine(max_output_tokens: int) -> ScoringEngine:
+        return ScoringEngine(
+            model,
+            genai.GenerationConfig(
+                response_mime_type="application/json",
+                temperature=0.3,
+                max_output_tokens=max_output_tokens,
+            ),
+            max_concurrency=gemini_config["max_concurrency"],
+            request_timeout=gemini_config["request_timeout_seconds"],
+            max_retries=gemini_config["max_retries"],
+            limiter=limiter,
+        )
+
+    return build_engine(4000), build_engine(8192) if gemini_config["batch_size"] > 1 else None
+
+
+def split_cache_hits(
+    keyed: list[tuple[int, str, str]],
+    cached: dict[str, dict[str, Any]],
+) -> tuple[dict[int, dict[str, Any]], dict[str, tuple[str, list[int]]]]:
+    """
+    Split ``(index, content_hash, cache_key)`` entries into cached results by
+    input index and ``cache_key -> (content_hash, indexes)`` still to score.
+    Identical transcripts share one pending entry, so each is sent once.
+    """
+    results: dict[int, dict[str, Any]] = {}
+    pending: dict[str, tuple[str, list[int]]] = {}
+    for index, content_hash, cache_key in keyed:
+        if cache_key in cached:
+            results[index] = {**cached[cache_key], "from_cache": True}
+        elif cache_key in pending:
+            pending[cache_key][1].append(index)
+        else:
+            pending[cache_key] = (content_hash, [index])
+    return results, pending
+
+
+def spread_result(
+    audit_result: dict[str, Any],
+    indexes: list[int],
+    outcome: dict[str, Any] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """
+    One audit for every call with the same transcript; all but the first
+    count as cache hits. Without an ``outcome`` no request was made.
+    """
+    usage: dict[str, Any] = {"processing_time_ms": 0}
+    if outcome:
+        usage = {
+            "processing_time_ms": round(outcome["latency_s"] * 1000),
+            "prompt_tokens": outcome["prompt_tokens"],
+            "output_tokens": outcome["output_tokens"],
+        }
+    return {
+        index: {**audit_result, "from_cache": position > 0, **usage}
+        for position, index in enumerate(indexes)
+    }
+
+
+def combine_outcomes(first: dict[str, Any], second: dict[str, Any]) -> dict[str, Any]:
+    """``first`` with the latency and tokens of a follow-up request added."""
+    return {
+        **first,
+        "latency_s": first["latency_s"] + second["latency_s"],
+        "prompt_tokens": first["prompt_tokens"] + second["prompt_tokens"],
+        "output_tokens": first["output_tokens"] + second["output_tokens"],
+    }
+
+
+def score_chunk(
+    keys: list[str],
+    transcripts: dict[str, str],
+    call_ids: dict[str, str],
+    expected: dict[str, list[str]],
+    decided: dict[str, dict[str, dict[str, Any]]],
+    engine: ScoringEngine,
+    metrics,
+    batch_engine: ScoringEngine | None = None,
+    batch_config: dict[str, Any] | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    Score every key of one chunk. Returns ``result`` (None on failure),
+    ``error``, ``reason`` (a FAILURE_REASONS key), ``complete`` (every
+    expected criterion answered) and the request ``outcome`` per key.
+
+    ``decided`` holds pre-scored criteria left out of the prompts, and
+    ``batch_config`` the GEMINI_BATCH_* settings for ``batch_engine``.
+    """
+    scored: dict[str, dict[str, Any]] = {}
+    # key -> (criteria, dimension scores) missing from an otherwise usable audit
+    followups: dict[str, tuple[list[str], list[str]]] = {}
+
+    # Short transcripts share requests in batch mode; misses fall back to single calls
+    single_keys = list(keys)
+    if batch_engine and len(keys) > 1:
+        batches, single_keys = pack_batches(
+            [(key, estimate_tokens(transcripts[key])) for key in keys],
+            max_calls=batch_config["batch_size"],
+            token_budget=batch_config["batch_token_budget"],
+            max_item_tokens=batch_config["batch_max_transcript_tokens"],
+        )
+        with metrics.stage("gemini_batch"):
+            batch_outcomes = batch_engine.score_all([
+                batch_prompt(
+                    [(call_ids[key], transcripts[key]) for key in batch],
+                    {call_ids[key]: decided[key] for key in batch if key in decided},
+                )
+                for batch in batches
+            ])
+
+        for batch, outcome in zip(batches, batch_outcomes):
+            answered = read_batch_outcome(outcome, batch, call_ids, expected)
+            share = {
+                **outcome,
+                "prompt_tokens": outcome["prompt_tokens"] // len(batch),
+                "output_tokens": outcome["output_tokens"] // len(batch),
+            }
+            for key in batch:
+                if key not in answered:
+                    single_keys.append(key)
+                    continue
+                salvaged = answered[key]
+                scored[key] = {"result": salvaged["result"], "error": None, "reason": None, "complete": True, "outcome": share}
+                if salvaged["missing"] or salvaged["missing_scores"]:
+                    followups[key] = (salvaged["missing"], salvaged["missing_scores"])
+        metrics.incr("gemini.batch_requests", len(batches))
+        metrics.incr("gemini.batched_calls", sum(len(b) for b in batches))
+        metrics.incr("gemini.batch_fallbacks", sum(len(b) for b in batches) - len(scored))
+
+    with metrics.stage("gemini"):
+        outcomes = engine.score_all([single_prompt(transcripts[key], decided.get(key)) for key in single_keys])
+
+    # Keep every valid score and criterion of a truncated or malformed response
+    for key, outcome in zip(single_keys, outcomes):
+        parsed = read_single_outcome(outcome, expected[key])
+        metrics.incr("parse.repaired", 1 if parsed["repairs"] else 0)
+        for repair in parsed["repairs"]:
+            metrics.incr(f"parse.repairs.{repair}")
+        scored[key] = {
+            "result": parsed["result"],
+            "error": parsed["error"],
+            "reason": parsed["reason"],
+            "complete": True,
+            "outcome": outcome,
+        }
+        if parsed["result"] is not None and (parsed["missing"] or parsed["missing_scores"]):
+            followups[key] = (parsed["missing"], parsed["missing_scores"])
+
+    # One short request per call for just the criteria and scores a response left out
+    if followups:
+        followup_keys = list(followups)
+        with metrics.stage("gemini_followup"):
+            followup_outcomes = engine.score_all([
+                missing_criteria_prompt(transcripts[key], *followups[key]) for key in followup_keys
+            ])
+        for key, followup in zip(followup_keys, followup_outcomes):
+            missing_criteria, missing_scores = followups[key]
+            recovered, scores = read_followup_outcome(followup, missing_criteria, missing_scores)
+            entry = scored[key]
+            entry["result"]["criteria"].extend(recovered)
+            entry["result"].update(scores)
+            # An audit still missing criteria is saved but not reused from the cache
+            entry["complete"] = len(recovered) == len(missing_criteria)
+            entry["outcome"] = combine_outcomes(entry["outcome"], followup)
+            metrics.incr("parse.criteria_recovered", len(recovered))
+            metrics.incr("parse.criteria_unresolved", len(missing_criteria) - len(recovered))
+            metrics.incr("parse.scores_recovered", len(scores))
+            # A report card can't be saved with dimension scores missing
+            if len(scores) < len(missing_scores):
+                entry.update(result=None, reason="missing_scores", error=FAILURE_REASONS["missing_scores"])
+        metrics.incr("parse.followup_requests", len(followup_keys))
+
+    return scored
@@ -0,0 +1,125 @@
+"""
+On-disk staging of Five9 rows between tasks.
+
+Rows are read from SQL Server a page at a time and written to gzipped JSON
+Lines batch files under SYNC_STAGING_DIR. Only the manifest (file paths and
+row counts) goes through XCom, so worker memory and the Airflow metadata DB
+stay flat no matter how many calls are in the window.
+
+With more than one worker, SYNC_STAGING_DIR must be on a shared filesystem.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import re
+import shutil
+import time
+from collections.abc import Iterator
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def _run_dir(staging_root: str, run_id: str | None) -> Path:
+    return Path(staging_root) / re.sub(r"[^A-Za-z0-9_.-]", "_", run_id or "manual")
+
+
+def run_staging_dir(staging_root: str, run_id: str | None, partition: str | None = None) -> Path:
+    """
+    Return (and create) the per-run staging directory, or a subdirectory of
+    it for one backfill partition so parallel partitions don't collide.
+    """
+    run_dir = _run_dir(staging_root, run_id)
+    if partition:
+        run_dir = run_dir / re.sub(r"[^A-Za-z0-9_.-]", "_", partition)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    return run_dir
+
+
+def cursor_pages(cursor, page_size: int) -> Iterator[list[dict[str, Any]]]:
+    """Yield result rows in pages of ``page_size`` using ``fetchmany``."""
+    while True:
+        page = cursor.fetchmany(page_size)
+        if not page:
+            return
+        yield page
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Cannot stage value of type {type(value).__name__}")
+
+
+def write_batch(run_dir: Path, name: str, rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """Write one batch file and return its manifest entry."""
+    path = run_dir / f"{name}.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=_json_default, separators=(",", ":")))
+            f.write("\n")
+    return {"path": str(path), "rows": len(rows)}
+
+
+def build_manifest(run_dir: Path, batches: list[dict[str, Any]], prefix: str) -> dict[str, Any]:
+    """Wrap written batch entries in the manifest passed through XCom."""
+    manifest = {
+        "run_dir": str(run_dir),
+        "batches": batches,
+        "rows": sum(b["rows"] for b in batches),
+    }
+    logger.info(f"Staged {manifest['rows']} rows in {len(batches)} '{prefix}' batches")
+    return manifest
+
+
+def shard_manifest(run_dir: Path, batch: dict[str, Any]) -> dict[str, Any]:
+    """Manifest holding a single batch, used as one mapped shard."""
+    return {"run_dir": str(run_dir), "batches": [batch], "rows": batch["rows"]}
+
+
+def read_batch(batch: dict[str, Any]) -> list[dict[str, Any]]:
+    """Load a single staged batch file."""
+    with gzip.open(batch["path"], "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def iter_staged_batches(manifest: dict[str, Any]) -> Iterator[list[dict[str, Any]]]:
+    """Yield the rows of a manifest one batch at a time."""
+    for batch in manifest.get("batches", []):
+        yield read_batch(batch)
+
+
+def iter_staged_rows(manifest: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Yield the rows of a manifest one at a time."""
+    for rows in iter_staged_batches(manifest):
+        yield from rows
+
+
+def remove_run_dir(staging_root: str, run_id: str | None) -> None:
+    """Delete a run's staging directory once the run is finished."""
+    run_dir = _run_dir(staging_root, run_id)
+    if run_dir.exists():
+        shutil.rmtree(run_dir, ignore_errors=True)
+        logger.info(f"Removed staging dir {run_dir}")
+
+
+def prune_staging(staging_root: str, max_age_hours: int) -> None:
+    """Delete run directories older than ``max_age_hours``."""
+    root = Path(staging_root)
+    if not root.exists():
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    for run_dir in root.iterdir():
+        if run_dir.is_dir() and run_dir.stat().st_mtime < cutoff:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            logger.info(f"Pruned stale staging dir {run_dir}")
@@ -0,0 +1,112 @@
+"""
+Deferrable wait for webhook events.
+
+``WaitForCallEventsOperator`` hands the wait to ``CallEventsTrigger`` in the
+triggerer, so an idle ``call_sync_events`` run holds no worker slot. The
+trigger polls the queue backlog every EVENTS_POLL_SECONDS and fires as soon
+as a micro-batch is ready (see ``call_sync.events.batch_ready``).
+
+The trigger reads the Supabase credentials from Airflow Variables itself
+rather than taking them as kwargs, so they are never serialized into the
+trigger table. For the same reason the operator only takes the ``events``
+settings: its templated fields are rendered into the task instance and
+shown in the UI.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+from airflow.models import BaseOperator, Variable
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+from supabase import create_client
+
+from call_sync.events import batch_ready, queue_backlog
+
+
+def _client():
+    return create_client(
+        Variable.get("SUPABASE_URL"),
+        Variable.get("SUPABASE_SERVICE_KEY", deserialize_json=False),
+    )
+
+
+class CallEventsTrigger(BaseTrigger):
+    """Fires with the queue backlog once a batch of webhook events is ready."""
+
+    def __init__(
+        self,
+        batch_size: int,
+        max_wait_seconds: float,
+        poll_seconds: float,
+        lease_seconds: int,
+        max_attempts: int,
+    ):
+        super().__init__()
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def serialize(self) -> tuple[str, dict[str, Any]]:
+        return (
+            "call_sync.triggers.CallEventsTrigger",
+            {
+                "batch_size": self.batch_size,
+                "max_wait_seconds": self.max_wait_seconds,
+                "poll_seconds": self.poll_seconds,
+                "lease_seconds": self.lease_seconds,
+                "max_attempts": self.max_attempts,
+            },
+        )
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        client = await asyncio.to_thread(_client)
+        while True:
+            try:
+                backlog = await asyncio.to_thread(queue_backlog, client, self.lease_seconds, self.max_attempts)
+            except Exception as e:
+                # A Supabase blip shouldn't fail the wait; try again next poll
+                self.log.warning(f"Failed to read the call event backlog: {e}")
+            else:
+                if batch_ready(backlog, self.batch_size, self.max_wait_seconds):
+                    yield TriggerEvent(backlog)
+                    return
+            await asyncio.sleep(self.poll_seconds)
+
+
+class WaitForCallEventsOperator(BaseOperator):
+    """
+    Defer until a micro-batch of webhook events is waiting in the queue.
+
+    ``events_config`` is templated so it can come from an upstream task; it
+    must not hold credentials.
+    """
+
+    template_fields = ("events_config",)
+
+    def __init__(self, events_config: dict[str, Any], **kwargs):
+        # Idle waits can last as long as the webhook is quiet
+        kwargs.setdefault("execution_timeout", None)
+        super().__init__(**kwargs)
+        self.events_config = events_config
+
+    def execute(self, context) -> None:
+        events_config = self.events_config
+        self.defer(
+            trigger=CallEventsTrigger(
+                batch_size=events_config["batch_size"],
+                max_wait_seconds=events_config["max_wait_seconds"],
+                poll_seconds=events_config["poll_seconds"],
+                lease_seconds=events_config["lease_seconds"],
+                max_attempts=events_config["max_attempts"],
+            ),
+            method_name="execute_complete",
+        )
+
+    def execute_complete(self, context, event: dict[str, Any]) -> dict[str, Any]:
+        self.log.info(f"Call event batch ready: {event}")
+        return event
@@ -0,0 +1,160 @@
+"""
+High-water mark for incremental Five9 extraction.
+
+Each run pulls only rows past the last (upload_timestamp, recording_id) seen,
+minus a small overlap for late arrivals. Every SYNC_RECONCILE_INTERVAL_HOURS
+the full SYNC_LOOKBACK_HOURS window is swept instead to catch anything the
+delta missed.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_TABLE = "call_sync_watermarks"
+FIVE9_SOURCE = "five9_call_recording_logs"
+
+
+def load_watermark(supabase, source: str = FIVE9_SOURCE) -> dict[str, Any] | None:
+    """Return the stored watermark row for a source, or None on first run."""
+    result = supabase.table(WATERMARK_TABLE).select("*").eq("source", source).execute()
+    return result.data[0] if result.data else None
+
+
+def build_sync_window(
+    watermark: dict[str, Any] | None,
+    lookback_hours: int,
+    overlap_minutes: int,
+    reconcile_interval_hours: int,
+    now: datetime | None = None,
+) -> dict[str, Any]:
+    """
+    Decide what range of Five9 rows this run should pull.
+
+    Returns a JSON-serializable window with ``mode`` set to ``"incremental"``
+    (delta past the watermark) or ``"reconcile"`` (full lookback sweep).
+    """
+    now = now or datetime.now(timezone.utc)
+
+    if watermark is None:
+        return {"mode": "reconcile", "lookback_hours": lookback_hours, "reason": "no watermark"}
+
+    last_reconciled = watermark.get("last_reconciled_at")
+    if last_reconciled:
+        last_reconciled_at = datetime.fromisoformat(last_reconciled.replace("Z", "+00:00"))
+        if now - last_reconciled_at >= timedelta(hours=reconcile_interval_hours):
+            return {"mode": "reconcile", "lookback_hours": lookback_hours, "reason": "interval elapsed"}
+    else:
+        return {"mode": "reconcile", "lookback_hours": lookback_hours, "reason": "never reconciled"}
+
+    return {
+        "mode": "incremental",
+        "since": watermark["upload_timestamp"],
+        "after_recording_id": watermark.get("recording_id") or "",
+        "overlap_minutes": overlap_minutes,
+    }
+
+
+def window_predicate(window: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    """
+    Return the upload_timestamp predicate and its pymssql parameters.
+
+    Incremental mode is a keyset comparison on (upload_timestamp, recording_id);
+    with a non-zero overlap the first branch already covers the tie-break.
+    Range mode is a bounded ``[start, end)`` backfill partition.
+    """
+    if window["mode"] == "range":
+        return "upload_timestamp >= %(start)s AND upload_timestamp < %(end)s", {
+            "start": datetime.fromisoformat(window["start"]),
+            "end": datetime.fromisoformat(window["end"]),
+        }
+
+    if window["mode"] == "incremental":
+        predicate = """(
+                upload_timestamp > DATEADD(MINUTE, -%(overlap_minutes)s, %(since)s)
+                OR (upload_timestamp = %(since)s AND recording_id > %(after_recording_id)s)
+            )"""
+        params = {
+            "since": datetime.fromisoformat(window["since"]),
+            "after_recording_id": window["after_recording_id"],
+            "overlap_minutes": window["overlap_minutes"],
+        }
+        return predicate, params
+
+    return "upload_timestamp >= DATEADD(HOUR, -%(lookback_hours)s, GETDATE())", {
+        "lookback_hours": window["lookback_hours"],
+    }
+
+
+def max_watermark(calls: list[dict[str, Any]]) -> dict[str, str] | None:
+    """Return the largest (upload_timestamp, recording_id) among fetched rows."""
+    keyed = [c for c in calls if c.get("upload_timestamp") is not None]
+    if not keyed:
+        return None
+
+    latest = max(keyed, key=lambda c: (c["upload_timestamp"], _recording_sort_key(c.get("recording_id"))))
+    upload_timestamp = latest["upload_timestamp"]
+    return {
+        "upload_timestamp": (
+            upload_timestamp.isoformat() if isinstance(upload_timestamp, datetime) else str(upload_timestamp)
+        ),
+        "recording_id": str(latest.get("recording_id") or ""),
+    }
+
+
+def _recording_sort_key(recording_id: Any) -> str:
+    """Order recording ids the way SQL Server does for numeric ids."""
+    return str(recording_id or "").zfill(20)
+
+
+def _mark_key(mark: dict[str, Any]) -> tuple[datetime, str]:
+    return (
+        datetime.fromisoformat(mark["upload_timestamp"]),
+        _recording_sort_key(mark.get("recording_id")),
+    )
+
+
+def later_watermark(
+    a: dict[str, str] | None, b: dict[str, str] | None
+) -> dict[str, str] | None:
+    """Return whichever of two watermarks is further along."""
+    if a is None or b is None:
+        return a or b
+    return a if _mark_key(a) >= _mark_key(b) else b
+
+
+def advance_watermark(
+    supabase,
+    window: dict[str, Any],
+    latest: dict[str, str] | None,
+    source: str = FIVE9_SOURCE,
+) -> dict[str, Any] | None:
+    """
+    Persist the new high-water mark after a run's calls are safely inserted.
+
+    Never moves the mark backwards, and stamps ``last_reconciled_at`` when the
+    run was a reconciliation sweep.
+    """
+    current = load_watermark(supabase, source)
+    row: dict[str, Any] = {"source": source, "updated_at": datetime.now(timezone.utc).isoformat()}
+
+    if latest and (current is None or _mark_key(latest) > _mark_key(current)):
+        row.update(latest)
+    elif current is not None:
+        row["upload_timestamp"] = current["upload_timestamp"]
+        row["recording_id"] = current.get("recording_id") or ""
+    else:
+        # Nothing fetched and nothing stored yet - wait for a run with data
+        logger.info("No watermark to persist yet")
+        return None
+
+    if window["mode"] == "reconcile":
+        row["last_reconciled_at"] = datetime.now(timezone.utc).isoformat()
+
+    supabase.table(WATERMARK_TABLE).upsert(row, on_conflict="source").execute()
+    logger.info(f"Watermark for {source} at {row['upload_timestamp']} / {row['recording_id']}")
+    return row
@@ -0,0 +1,105 @@
+"""
+Batched Supabase writes.
+
+PostgREST accepts a list of rows per request, so writes go out in chunks and
+only fall back to one request per row for the chunk that failed.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable, Iterator
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Keeps the PostgREST in_() query string well under URL length limits
+LOOKUP_CHUNK_SIZE = 100
+
+
+def chunked(items: list[Any], size: int) -> Iterator[list[Any]]:
+    """Yield successive ``size``-length slices of ``items``."""
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def dedupe_rows(rows: list[dict[str, Any]], key: str) -> list[dict[str, Any]]:
+    """
+    Keep the last row for each conflict key.
+
+    Postgres rejects an upsert that would touch the same row twice in one
+    statement, so duplicates within a chunk must be collapsed first.
+    """
+    by_key: dict[Any, dict[str, Any]] = {}
+    for row in rows:
+        by_key[row[key]] = row
+    return list(by_key.values())
+
+
+def write_in_batches(
+    rows: list[dict[str, Any]],
+    batch_size: int,
+    write: Callable[[list[dict[str, Any]]], list[dict[str, Any]] | None],
+    label: str,
+    key: str,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Send rows through ``write`` in chunks of ``batch_size``.
+
+    A chunk that raises is retried one row at a time, so only the bad rows are
+    lost. Returns ``(written, failed)``: whatever ``write`` returned, and the
+    input rows that still failed on their own.
+    """
+    written: list[dict[str, Any]] = []
+    failed: list[dict[str, Any]] = []
+
+    for batch in chunked(rows, batch_size):
+        try:
+            written.extend(write(batch) or [])
+            continue
+        except Exception as e:
+            logger.warning(f"Batch write of {len(batch)} rows to {label} failed, retrying per row: {e}")
+
+        for row in batch:
+            try:
+                written.extend(write([row]) or [])
+            except Exception as e:
+                logger.error(f"Failed to write {label} row {row.get(key)}: {e}")
+                failed.append(row)
+
+    return written, failed
+
+
+def upsert_in_batches(
+    supabase,
+    table: str,
+    rows: list[dict[str, Any]],
+    on_conflict: str,
+    batch_size: int,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Upsert rows into ``table`` in chunks, returning ``(written, failed)``."""
+    return write_in_batches(
+        dedupe_rows(rows, on_conflict),
+        batch_size,
+        lambda batch: supabase.table(table).upsert(batch, on_conflict=on_conflict).execute().data,
+        label=table,
+        key=on_conflict,
+    )
+
+
+def rpc_in_batches(
+    supabase,
+    function: str,
+    param: str,
+    rows: list[dict[str, Any]],
+    batch_size: int,
+    key: str,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Pass rows to a set-based Postgres function in chunks, returning ``(written, failed)``."""
+    return write_in_batches(
+        rows,
+        batch_size,
+        lambda batch: supabase.rpc(function, {param: batch}).execute().data,
+        label=function,
+        key=key,
+    )
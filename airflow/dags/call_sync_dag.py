@@ -8,53 +8,134 @@ This DAG runs every 15 minutes to:
 4. Score calls with Gemini AI
 5. Store results in Supabase (calls, report_cards tables)
 
+The call_sync_backfill DAG runs the same stages over hourly or daily
+partitions of a requested date range (see call_sync/backfill.py), and the
+call_sync_events DAG runs them in micro-batches as five9-webhook events
+arrive (see call_sync/events.py); the 15-minute schedule then only has to
+reconcile whatever the webhook missed. scorecard_rollups_rebuild recomputes
+the per-agent and per-team scorecard rollups for a date range (see
+call_sync/rollups.py), and call_texts_backfill moves transcript text out of
+calls rows written before call_texts existed (see call_sync/call_texts.py).
+
 Uses TaskFlow API with minimal top-level code.
 """
 
 from __future__ import annotations
 
-import hashlib
-import json
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
 from typing import Any
 
 import google.generativeai as genai
 import pymssql
-import requests
-from airflow.decorators import dag, task
+from airflow.decorators import dag, task, task_group
+from airflow.exceptions import AirflowFailException
 from airflow.models import Variable
+from airflow.models.param import Param
+from airflow.stats import Stats
+from airflow.utils.state import TaskInstanceState
 from supabase import create_client
 
+from call_sync.agents import AgentIndex, group_agents, lookup_profiles, provision_agents
+from call_sync.audit_cache import AuditCache, LocalAuditCache, criteria_fingerprint
+from call_sync.backfill import (
+    PARTITION_SIZES,
+    apply_backfill_limits,
+    parse_bound,
+    partition_outcomes,
+    plan_partitions,
+    record_partitions,
+    split_range,
+)
+from call_sync.blobs import BlobStore
+from call_sync.call_texts import load_texts, move_call_texts, store_texts, text_columns
+from call_sync.checkpoints import (
+    PRIORITY_KEY,
+    STATE_KEY,
+    checkpoint,
+    claim,
+    defer,
+    in_flight,
+    item_key,
+    load_resumable,
+    load_states,
+    requeue,
+    resume_call,
+    state_rank,
+)
+from call_sync.compaction import fit_transcripts
+from call_sync.events import ack_events, claim_events, event_row, invoke_edge_function
+from call_sync.five9 import build_query, has_scorable_column, is_scorable, nas_links
+from call_sync.metrics import XCOM_KEY, TaskMetrics, log_call_outcomes, merge_summaries
+from call_sync.nas import NasFetcher
+from call_sync.nas_mirror import NasMirror
+from call_sync.near_dup import NearDuplicateDetector
+from call_sync.prescorer import PreScorer, agreement, build_rules, full_result, load_rule_sources, merge_result
+from call_sync.prompts import build_preamble
+from call_sync.responses import FAILURE_REASONS
+from call_sync.rollups import rebuild_rollups
+from call_sync.scheduling import (
+    BudgetAdmission,
+    budget_limits,
+    call_priority,
+    cost_usd,
+    daily_budget_left,
+    estimate_cost,
+    load_priority_context,
+    load_spend,
+    priority_config,
+    record_spend,
+)
+from call_sync.scoring import build_engines, build_model, score_chunk, split_cache_hits, spread_result
+from call_sync.staging import (
+    build_manifest,
+    cursor_pages,
+    iter_staged_batches,
+    iter_staged_rows,
+    prune_staging,
+    remove_run_dir,
+    run_staging_dir,
+    shard_manifest,
+    write_batch,
+)
+from call_sync.triggers import WaitForCallEventsOperator
+from call_sync.watermark import (
+    advance_watermark,
+    build_sync_window,
+    later_watermark,
+    load_watermark,
+    max_watermark,
+    window_predicate,
+)
+from call_sync.writers import LOOKUP_CHUNK_SIZE, chunked, rpc_in_batches, upsert_in_batches
+
 logger = logging.getLogger(__name__)
 
+# Caps how many shards of per-call work run at once across all workers
+CALL_SYNC_POOL = "call_sync_shards"
+# Backfill partitions and shards; kept apart so backfills never take live slots
+BACKFILL_POOL = "call_sync_backfill"
+
 
 # =============================================================================
-# DAG DEFINITION
+# TASKS
 # =============================================================================
 
-@dag(
-    dag_id="call_sync_and_audit",
-    description="Sync Five9 calls to Supabase and score with Gemini AI",
-    schedule="*/15 * * * *",  # Every 15 minutes
-    start_date=datetime(2025, 1, 1),
-    catchup=False,
-    max_active_runs=1,
-    default_args={
-        "owner": "cliopa",
-        "retries": 2,
-        "retry_delay": timedelta(minutes=2),
-        "execution_timeout": timedelta(minutes=10),
-    },
-    tags=["cliopa", "five9", "ai-audit", "gemini"],
-)
-def call_sync_dag():
-    """Main DAG for syncing and auditing calls."""
+def call_sync_tasks(mode: str = "live") -> None:
+    """
+    Define the call sync tasks and wire them up in the current DAG.
+
+    ``live`` syncs the watermark window, ``backfill`` runs the same per-call
+    stages over time partitions of the triggered date range, and ``events``
+    over a micro-batch of queued webhook events.
+    """
+    pool = BACKFILL_POOL if mode == "backfill" else CALL_SYNC_POOL
 
     @task()
     def get_config() -> dict[str, Any]:
         """Load configuration from Airflow Variables."""
-        return {
+        config = {
             "mssql": {
                 "server": Variable.get("MSSQL_SERVER"),
                 "database": Variable.get("MSSQL_DATABASE"),
@@ -68,105 +149,273 @@ def call_sync_dag():
             "gemini": {
                 "api_key": Variable.get("GEMINI_API_KEY", deserialize_json=False),
                 "model": Variable.get("GEMINI_MODEL", default_var="gemini-2.0-flash"),
+                "max_concurrency": int(Variable.get("GEMINI_MAX_CONCURRENCY", default_var="8")),
+                "requests_per_minute": int(Variable.get("GEMINI_RPM", default_var="300")),
+                "tokens_per_minute": int(Variable.get("GEMINI_TPM", default_var="1000000")),
+                "request_timeout_seconds": int(
+                    Variable.get("GEMINI_TIMEOUT_SECONDS", default_var="60")
+                ),
+                "max_retries": int(Variable.get("GEMINI_MAX_RETRIES", default_var="4")),
+                # 1 disables batching; otherwise up to this many short calls per request
+                "batch_size": int(Variable.get("GEMINI_BATCH_SIZE", default_var="1")),
+                "batch_token_budget": int(Variable.get("GEMINI_BATCH_TOKEN_BUDGET", default_var="24000")),
+                "batch_max_transcript_tokens": int(
+                    Variable.get("GEMINI_BATCH_MAX_TRANSCRIPT_TOKENS", default_var="1500")
+                ),
+                "context_cache": Variable.get("GEMINI_CONTEXT_CACHE", default_var="false").lower() == "true",
+                "context_cache_min_tokens": int(
+                    Variable.get("GEMINI_CONTEXT_CACHE_MIN_TOKENS", default_var="4096")
+                ),
+            },
+            "audit_cache": {
+                "dir": Variable.get("AUDIT_CACHE_DIR", default_var="/tmp/cliopa_audit_cache"),
+                "max_mb": int(Variable.get("AUDIT_CACHE_MAX_MB", default_var="256")),
+                "ttl_hours": int(Variable.get("AUDIT_CACHE_TTL_HOURS", default_var="168")),
+            },
+            "agents": {
+                "index_dir": Variable.get("AGENT_INDEX_DIR", default_var="/tmp/cliopa_agent_index"),
+                "full_refresh_hours": int(Variable.get("AGENT_INDEX_FULL_REFRESH_HOURS", default_var="24")),
+                "provision_concurrency": int(Variable.get("AGENT_PROVISION_CONCURRENCY", default_var="4")),
+            },
+            "blob_store": {
+                "dir": Variable.get("BLOB_STORE_DIR", default_var="/tmp/cliopa_blobs"),
+                "compress": Variable.get("BLOB_STORE_COMPRESS", default_var="true").lower() == "true",
+            },
+            "transcripts": {
+                # Gemini input budget per transcript; 3000 tokens ~ the old 12,000 characters
+                "max_tokens": int(Variable.get("TRANSCRIPT_MAX_TOKENS", default_var="3000")),
+                "compaction": Variable.get("TRANSCRIPT_COMPACTION", default_var="true").lower() == "true",
+            },
+            "budget": {
+                # 0 = no limit; with any limit set calls are admitted by priority (see call_sync/scheduling.py)
+                "run_tokens": int(Variable.get("SCORING_RUN_BUDGET_TOKENS", default_var="0")),
+                "daily_tokens": int(Variable.get("SCORING_DAILY_BUDGET_TOKENS", default_var="0")),
+                "daily_usd": float(Variable.get("SCORING_DAILY_BUDGET_USD", default_var="0")),
+                "input_usd_per_mtok": float(Variable.get("GEMINI_INPUT_USD_PER_MTOK", default_var="0.10")),
+                "output_usd_per_mtok": float(Variable.get("GEMINI_OUTPUT_USD_PER_MTOK", default_var="0.40")),
+            },
+            "priority": {
+                "recency_half_life_hours": float(Variable.get("SCORING_RECENCY_HALF_LIFE_HOURS", default_var="24")),
+                "campaign_weights": Variable.get("SCORING_CAMPAIGN_WEIGHTS", default_var="{}"),
+                "risk_dispositions": Variable.get(
+                    "SCORING_RISK_DISPOSITIONS",
+                    default_var="dispute|cease|bankrupt|attorney|complaint|settle",
+                ),
+                "risk_weight": float(Variable.get("SCORING_RISK_WEIGHT", default_var="2")),
+                "coaching_weight": float(Variable.get("SCORING_COACHING_WEIGHT", default_var="1.5")),
+                "coaching_days": int(Variable.get("SCORING_COACHING_DAYS", default_var="14")),
+                "agent_daily_target": int(Variable.get("SCORING_AGENT_DAILY_TARGET", default_var="0")),
+            },
+            "prescore": {
+                "mode": Variable.get("PRESCORE_MODE", default_var="off"),
+                "min_confidence": float(Variable.get("PRESCORE_MIN_CONFIDENCE", default_var="0.9")),
+            },
+            "near_dup": {
+                "mode": Variable.get("NEAR_DUP_MODE", default_var="off"),
+                "threshold": float(Variable.get("NEAR_DUP_THRESHOLD", default_var="0.9")),
+            },
+            "nas": {
+                "base_url": Variable.get("NAS_BASE_URL", default_var="https://nas01.tlcops.com"),
+                "max_concurrency": int(Variable.get("NAS_MAX_CONCURRENCY", default_var="16")),
+                "max_connections_per_host": int(
+                    Variable.get("NAS_MAX_CONNECTIONS_PER_HOST", default_var="8")
+                ),
+                "retries": int(Variable.get("NAS_RETRIES", default_var="3")),
+                "deadline_seconds": int(Variable.get("NAS_DEADLINE_SECONDS", default_var="480")),
+                "mirror_dir": Variable.get("NAS_MIRROR_DIR", default_var="/tmp/cliopa_nas_mirror"),
+                "mirror_revalidate_hours": float(Variable.get("NAS_MIRROR_REVALIDATE_HOURS", default_var="24")),
+                # Missing files are rechecked after this long, doubling per miss up to the max
+                "missing_recheck_minutes": float(Variable.get("NAS_MISSING_RECHECK_MINUTES", default_var="15")),
+                "missing_recheck_max_hours": float(Variable.get("NAS_MISSING_RECHECK_MAX_HOURS", default_var="12")),
+                "repoll_limit": int(Variable.get("NAS_REPOLL_LIMIT", default_var="200")),
+                "repoll_max_age_hours": int(Variable.get("NAS_REPOLL_MAX_AGE_HOURS", default_var="72")),
             },
             "sync": {
                 "lookback_hours": int(Variable.get("SYNC_LOOKBACK_HOURS", default_var="24")),
                 "batch_size": int(Variable.get("SYNC_BATCH_SIZE", default_var="50")),
+                "shard_concurrency": int(Variable.get("SYNC_SHARD_CONCURRENCY", default_var="4")),
+                "watermark_overlap_minutes": int(
+                    Variable.get("SYNC_WATERMARK_OVERLAP_MINUTES", default_var="10")
+                ),
+                "reconcile_interval_hours": int(
+                    Variable.get("SYNC_RECONCILE_INTERVAL_HOURS", default_var="6")
+                ),
+                "write_batch_size": int(Variable.get("SUPABASE_WRITE_BATCH_SIZE", default_var="200")),
+                "fetch_page_size": int(Variable.get("SYNC_FETCH_PAGE_SIZE", default_var="1000")),
+                "staging_dir": Variable.get("SYNC_STAGING_DIR", default_var="/tmp/cliopa_call_sync"),
+                # Unfinished calls from earlier runs picked up per run, and how often each is retried
+                "resume_limit": int(Variable.get("SYNC_RESUME_LIMIT", default_var="500")),
+                "resume_max_attempts": int(Variable.get("SYNC_RESUME_MAX_ATTEMPTS", default_var="5")),
+                "resume_after_minutes": int(Variable.get("SYNC_RESUME_AFTER_MINUTES", default_var="30")),
+                # Gemini results are cached and checkpointed after every this many transcripts
+                "checkpoint_size": int(Variable.get("SYNC_CHECKPOINT_SIZE", default_var="25")),
+            },
+            "backfill": {
+                "partition": Variable.get("BACKFILL_PARTITION", default_var="hour"),
+                "max_partitions": int(Variable.get("BACKFILL_MAX_PARTITIONS", default_var="48")),
+                # Slots in the call_sync_backfill pool
+                "concurrency": int(Variable.get("BACKFILL_CONCURRENCY", default_var="2")),
+                "gemini_share": float(Variable.get("BACKFILL_GEMINI_SHARE", default_var="0.25")),
+            },
+            "events": {
+                # A micro-batch starts at this many queued events, or when the oldest has waited max_wait
+                "batch_size": int(Variable.get("EVENTS_BATCH_SIZE", default_var="25")),
+                "max_wait_seconds": float(Variable.get("EVENTS_MAX_WAIT_SECONDS", default_var="15")),
+                "poll_seconds": float(Variable.get("EVENTS_POLL_SECONDS", default_var="3")),
+                "max_claim": int(Variable.get("EVENTS_MAX_CLAIM", default_var="200")),
+                "lease_seconds": int(Variable.get("EVENTS_LEASE_SECONDS", default_var="900")),
+                "max_attempts": int(Variable.get("EVENTS_MAX_ATTEMPTS", default_var="5")),
             },
         }
+        if mode == "backfill":
+            return apply_backfill_limits(config)
+        if mode == "events":
+            # Leftovers from earlier runs are the live DAG's job
+            config["sync"]["resume_limit"] = 0
+        return config
+
+    @task()
+    def resolve_sync_window(config: dict[str, Any]) -> dict[str, Any]:
+        """
+        Decide whether this run pulls the delta past the stored watermark
+        or does a full SYNC_LOOKBACK_HOURS reconciliation sweep.
+        """
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+
+        sync_config = config["sync"]
+        window = build_sync_window(
+            load_watermark(supabase),
+            lookback_hours=sync_config["lookback_hours"],
+            overlap_minutes=sync_config["watermark_overlap_minutes"],
+            reconcile_interval_hours=sync_config["reconcile_interval_hours"],
+        )
+        logger.info(f"Sync window: {window}")
+        return window
+
+    @task()
+    def get_events_config(config: dict[str, Any]) -> dict[str, Any]:
+        """Micro-batch settings for the event wait, without any credentials."""
+        return config["events"]
+
+    @task()
+    def claim_call_events(config: dict[str, Any], run_id: str | None = None) -> dict[str, Any]:
+        """
+        Lease up to EVENTS_MAX_CLAIM queued webhook events and stage them
+        like Five9 rows. Events the Five9 query would have filtered out
+        (voicemails, hangups, no agent) are acknowledged straight away.
+        """
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+        metrics = TaskMetrics("claim_call_events")
+        metrics.instrument_supabase(supabase)
+
+        events_config = config["events"]
+        with metrics.stage("claim"):
+            events = claim_events(
+                supabase,
+                events_config["max_claim"],
+                run_id,
+                lease_seconds=events_config["lease_seconds"],
+                max_attempts=events_config["max_attempts"],
+            )
+
+        store = BlobStore(config["blob_store"]["dir"], compress=config["blob_store"]["compress"])
+        rows = [event_row(event, store) for event in events]
+        scorable = [row for row in rows if is_scorable(row)]
+        skipped = [row["call_id"] for row in rows if not is_scorable(row)]
+        if skipped:
+            ack_events(supabase, run_id, skipped)
+
+        run_dir = run_staging_dir(config["sync"]["staging_dir"], run_id)
+        batches = [
+            write_batch(run_dir, f"events-{index:05d}", page)
+            for index, page in enumerate(chunked(scorable, config["sync"]["fetch_page_size"]))
+        ]
+        manifest = build_manifest(run_dir, batches, "events")
+
+        now = datetime.now(timezone.utc)
+        for event in events:
+            received_at = datetime.fromisoformat(event["received_at"].replace("Z", "+00:00"))
+            metrics.observe("events.queue_latency_ms", (now - received_at).total_seconds() * 1000)
+        metrics.incr("items", len(events))
+        metrics.incr("events.claimed", len(events))
+        metrics.incr("events.unscorable", len(skipped))
+        metrics.publish()
+        logger.info(f"Claimed {len(events)} call events ({len(skipped)} not scorable)")
+        return manifest
+
+    @task(trigger_rule="all_done")
+    def ack_call_events(config: dict[str, Any], run_id: str | None = None) -> int:
+        """
+        Acknowledge this run's events whose calls now have a checkpoint;
+        the rest are claimed again once their lease runs out.
+        """
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+        acked = ack_events(supabase, run_id)
+        logger.info(f"Acknowledged {acked} call events")
+        return acked
+
+    @task()
+    def plan_backfill(
+        config: dict[str, Any],
+        params: dict[str, Any] | None = None,
+        run_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Split the triggered ``start``/``end`` range into partition windows and
+        return the ones this run should process, per the backfill ledger.
+        """
+        params = params or {}
+        if not params.get("start") or not params.get("end"):
+            raise AirflowFailException(
+                'Trigger call_sync_backfill with {"start": "2026-10-01", "end": "2026-10-08"}'
+            )
+
+        backfill_config = config["backfill"]
+        try:
+            windows = split_range(
+                parse_bound(params["start"]),
+                parse_bound(params["end"]),
+                params.get("partition") or backfill_config["partition"],
+            )
+        except ValueError as e:
+            raise AirflowFailException(str(e)) from e
+
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+        return plan_partitions(
+            supabase,
+            windows,
+            limit=backfill_config["max_partitions"],
+            run_id=run_id,
+            force=bool(params.get("force")),
+        )
 
     @task()
-    def fetch_calls_from_five9(config: dict[str, Any]) -> list[dict[str, Any]]:
+    def fetch_calls_from_five9(
+        config: dict[str, Any], window: dict[str, Any], run_id: str | None = None
+    ) -> dict[str, Any]:
         """
         Fetch new calls from Five9 SQL Server.
-        Filters out voicemails and very short calls.
+        Filters out voicemails and very short calls in the query.
+
+        Rows are read with fetchmany and staged to disk a page at a time;
+        only the batch manifest is returned through XCom.
         """
+        metrics = TaskMetrics("fetch_calls_from_five9")
         mssql_config = config["mssql"]
-        lookback_hours = config["sync"]["lookback_hours"]
-
-        query = """
-        SELECT
-            recording_id,
-            upload_timestamp,
-            file_name,
-            call_timestamp,
-            length_seconds,
-            call_type,
-            number1,
-            email,
-            first_name,
-            last_name,
-            inf_cust_id,
-            disposition,
-            campaign,
-            agent_name,
-            agent_email,
-            agent_group,
-            deleted,
-            status,
-            call_id,
-            server_name,
-            file_path,
-            CASE
-                WHEN server_name = 'F9' THEN CONCAT(
-                    'https://nas01.tlcops.com/Five9VmBackup/',
-                    file_path,
-                    file_name
-                )
-                ELSE CONCAT(
-                    'https://nas01.tlcops.com',
-                    file_path,
-                    file_name
-                )
-            END AS recording_link,
-            CASE
-                WHEN server_name = 'F9' AND call_id IS NOT NULL THEN
-                    CONCAT(
-                        'https://nas01.tlcops.com/Five9VmBackup/',
-                        REPLACE(file_path, 'recordings', 'transcripts'),
-                        call_id, '_', agent_email, '_transcript.txt'
-                    )
-                WHEN server_name = 'F9' THEN
-                    CONCAT(
-                        'https://nas01.tlcops.com/Five9VmBackup/',
-                        REPLACE(file_path, 'recordings', 'transcripts'),
-                        LEFT(file_name, CHARINDEX('_', file_name) - 1),
-                        '_', agent_email, '_transcript.txt'
-                    )
-                ELSE ''
-            END AS transcript_link,
-            CASE
-                WHEN server_name = 'F9' AND call_id IS NOT NULL THEN
-                    CONCAT(
-                        'https://nas01.tlcops.com/Five9VmBackup/',
-                        REPLACE(file_path, 'recordings', 'summaries'),
-                        call_id, '_', agent_email, '_summary.txt'
-                    )
-                WHEN server_name = 'F9' THEN
-                    CONCAT(
-                        'https://nas01.tlcops.com/Five9VmBackup/',
-                        REPLACE(file_path, 'recordings', 'summaries'),
-                        LEFT(file_name, CHARINDEX('_', file_name) - 1),
-                        '_', agent_email, '_summary.txt'
-                    )
-                ELSE ''
-            END AS summary_link
-        FROM fivenine.call_recording_logs
-        WHERE
-            upload_timestamp >= DATEADD(HOUR, -%s, GETDATE())
-            AND deleted = 0
-            AND agent_email IS NOT NULL
-            AND agent_email != ''
-            -- Filter out very short calls (likely hangups)
-            AND length_seconds >= 30
-            -- Filter out voicemails based on disposition
-            AND LOWER(ISNULL(disposition, '')) NOT LIKE '%%voicemail%%'
-            AND LOWER(ISNULL(disposition, '')) NOT LIKE '%%vm%%'
-            AND LOWER(ISNULL(disposition, '')) NOT LIKE '%%no answer%%'
-            AND LOWER(ISNULL(disposition, '')) NOT LIKE '%%busy%%'
-            AND LOWER(ISNULL(disposition, '')) NOT LIKE '%%disconnected%%'
-        ORDER BY upload_timestamp DESC
-        """
+        page_size = config["sync"]["fetch_page_size"]
+        window_sql, params = window_predicate(window)
 
         conn = pymssql.connect(
             server=mssql_config["server"],
@@ -177,93 +426,369 @@ def call_sync_dag():
 
         try:
             cursor = conn.cursor(as_dict=True)
-            cursor.execute(query, (lookback_hours,))
-            calls = cursor.fetchall()
-            logger.info(f"Fetched {len(calls)} calls from Five9 (last {lookback_hours} hours)")
-            return calls
+            # Seek on the sync index once sql/five9_call_sync_index.sql is applied
+            pushdown = has_scorable_column(cursor)
+            if not pushdown:
+                logger.warning("is_scorable column missing on Five9; filtering dispositions with LIKE scans")
+            with metrics.stage("query"):
+                cursor.execute(build_query(window_sql, pushdown), params)
+            metrics.incr("mssql.round_trips", 2)
+
+            run_dir = run_staging_dir(config["sync"]["staging_dir"], run_id, window.get("partition"))
+            batches = []
+            latest = None
+            with metrics.stage("read_and_stage"):
+                for index, page in enumerate(cursor_pages(cursor, page_size)):
+                    latest = later_watermark(latest, max_watermark(page))
+                    batch = write_batch(run_dir, f"five9-{index:05d}", page)
+                    batches.append(batch)
+                    metrics.incr("mssql.round_trips")
+                    metrics.incr("staged_bytes", Path(batch["path"]).stat().st_size)
+
+            manifest = build_manifest(run_dir, batches, "five9")
+            manifest["watermark"] = latest
+            if window.get("partition"):
+                manifest["partition"] = window["partition"]
+            metrics.incr("items", manifest["rows"])
+            metrics.publish()
+            logger.info(f"Fetched {manifest['rows']} calls from Five9 ({window.get('partition') or window['mode']})")
+            return manifest
         finally:
             conn.close()
 
     @task()
     def filter_existing_calls(
-        calls: list[dict[str, Any]], config: dict[str, Any]
+        manifest: dict[str, Any], config: dict[str, Any], run_id: str | None = None
     ) -> list[dict[str, Any]]:
-        """Filter out calls that already exist in Supabase."""
-        if not calls:
-            return []
-
+        """
+        Pick the run's work set, one staged batch at a time: new calls, plus
+        calls whose checkpoint hasn't reached ``saved`` yet (from this window
+        or left over from earlier runs).
+
+        The work set is restaged in shards of SYNC_BATCH_SIZE; the returned
+        list of shard manifests is what the per-call stages are mapped over.
+        With a scoring budget only the highest-priority calls that fit are
+        staged, and the rest are deferred to later runs.
+        """
         supabase = create_client(
             config["supabase"]["url"],
             config["supabase"]["service_key"],
         )
 
-        # Get call IDs to check
-        call_ids = [c.get("call_id") or c.get("recording_id") for c in calls if c.get("call_id") or c.get("recording_id")]
+        metrics = TaskMetrics("filter_existing_calls")
+        metrics.instrument_supabase(supabase)
+
+        sync_config = config["sync"]
+        run_dir = run_staging_dir(sync_config["staging_dir"], run_id, manifest.get("partition"))
+        batch_size = sync_config["batch_size"]
+        shards = []
+        buffered: list[dict[str, Any]] = []
+        resumed: list[dict[str, Any]] = []
+        seen: set[str] = set()
+        existing_count = 0
+        exhausted_count = 0
+        in_flight_count = 0
+        deferred_count = 0
+
+        budget_config = config["budget"]
+        admission = None
+        if budget_config["run_tokens"] or budget_config["daily_tokens"] or budget_config["daily_usd"]:
+            with metrics.stage("load_budget"):
+                daily = budget_config["daily_tokens"] or budget_config["daily_usd"]
+                limits = budget_limits(config, load_spend(supabase) if daily else None)
+                agents = load_priority_context(supabase, config)
+            admission = BudgetAdmission(limits)
+            priorities = priority_config(config)
+            deferred: list[dict[str, Any]] = []
+            for name, limit in limits.items():
+                metrics.gauge(f"budget.limit_{name}", limit)
+
+        def stage(calls: list[dict[str, Any]]) -> None:
+            nonlocal buffered
+            buffered.extend(calls)
+            while len(buffered) >= batch_size:
+                shard, buffered = buffered[:batch_size], buffered[batch_size:]
+                shards.append(shard_manifest(run_dir, write_batch(run_dir, f"shard-{len(shards):05d}", shard)))
+
+        def admit(calls: list[dict[str, Any]], flush: bool = False) -> None:
+            # Deferred new calls get a fetched checkpoint so the resume scan finds them
+            nonlocal deferred_count
+            for call in calls:
+                call[PRIORITY_KEY] = call_priority(call, priorities, agents)
+                deferred.extend(admission.offer(call, call[PRIORITY_KEY], estimate_cost(call, config)))
+            if deferred and (flush or len(deferred) >= sync_config["write_batch_size"]):
+                with metrics.stage("defer"):
+                    defer(supabase, deferred, run_id, sync_config["write_batch_size"])
+                deferred_count += len(deferred)
+                deferred.clear()
+
+        for calls in iter_staged_batches(manifest) if manifest["rows"] else []:
+            call_ids = [key for key in map(item_key, calls) if key]
+            seen.update(call_ids)
+
+            with metrics.stage("lookup_existing"):
+                items = load_states(supabase, call_ids)
+                # Calls synced before checkpoints existed only have a calls row
+                existing_ids = set()
+                unknown = [key for key in call_ids if key not in items]
+                for batch in chunked(unknown, LOOKUP_CHUNK_SIZE):
+                    result = supabase.table("calls").select("call_id").in_("call_id", batch).execute()
+                    existing_ids.update(r["call_id"] for r in result.data)
+            metrics.incr("items", len(calls))
+
+            new_calls = []
+            for call in calls:
+                key = item_key(call)
+                item = items.get(key)
+                if item is None:
+                    if key in existing_ids:
+                        existing_count += 1
+                    elif "recording_link" in call:
+                        # Webhook events arrive with their links
+                        new_calls.append(call)
+                    else:
+                        # NAS links are only built for new calls
+                        new_calls.append({**call, **nas_links(call, config["nas"]["base_url"])})
+                elif item["state"] == "saved":
+                    existing_count += 1
+                elif item["attempts"] >= sync_config["resume_max_attempts"]:
+                    exhausted_count += 1
+                elif in_flight(item, run_id, sync_config["resume_after_minutes"]):
+                    in_flight_count += 1
+                else:
+                    resumed.append(resume_call(call, item))
+            if admission is None:
+                stage(new_calls)
+            else:
+                admit(new_calls)
+
+        # Unfinished calls from earlier runs, e.g. a shard that timed out
+        with metrics.stage("load_resumable"):
+            resumed.extend(load_resumable(
+                supabase,
+                exclude=seen,
+                limit=sync_config["resume_limit"],
+                max_attempts=sync_config["resume_max_attempts"],
+                stale_minutes=sync_config["resume_after_minutes"],
+            ))
+        if admission is None:
+            claim(supabase, resumed, run_id, sync_config["write_batch_size"])
+            stage(resumed)
+        else:
+            # Only admitted resumed calls are claimed; the rest stay where they are
+            admit(resumed, flush=True)
+            admitted = admission.admitted()
+            resumed = [call for call in admitted if call.get(STATE_KEY)]
+            claim(supabase, resumed, run_id, sync_config["write_batch_size"])
+            stage(admitted)
+            for name, total in admission.totals.items():
+                metrics.gauge(f"budget.estimated_{name}", total)
+
+        if buffered:
+            shards.append(shard_manifest(run_dir, write_batch(run_dir, f"shard-{len(shards):05d}", buffered)))
+        if manifest.get("partition"):
+            for shard in shards:
+                shard["partition"] = manifest["partition"]
+
+        new_count = sum(shard["rows"] for shard in shards) - len(resumed)
+        metrics.incr("calls.existing", existing_count)
+        metrics.incr("calls.new", new_count)
+        metrics.incr("calls.resumed", len(resumed))
+        metrics.incr("calls.resume_exhausted", exhausted_count)
+        metrics.incr("calls.in_flight", in_flight_count)
+        metrics.incr("calls.deferred", deferred_count)
+        metrics.incr("shards", len(shards))
+        metrics.publish()
+        logger.info(
+            f"Filtered to {new_count} new and {len(resumed)} resumed calls in {len(shards)} shards "
+            f"({existing_count} already synced, {exhausted_count} out of resume attempts, "
+            f"{in_flight_count} in flight in another run"
+            + (f", {deferred_count} deferred by the scoring budget)" if admission is not None else ")")
+        )
+        return shards
+
+    def open_nas(config: dict[str, Any], store: BlobStore) -> tuple[NasFetcher, NasMirror]:
+        """NAS fetcher plus this worker's mirror of what the NAS returned before."""
+        nas_config = config["nas"]
+        fetcher = NasFetcher(
+            max_workers=nas_config["max_concurrency"],
+            max_connections_per_host=nas_config["max_connections_per_host"],
+            retries=nas_config["retries"],
+            deadline_seconds=nas_config["deadline_seconds"],
+        )
+        mirror = NasMirror(
+            nas_config["mirror_dir"],
+            store,
+            revalidate_hours=nas_config["mirror_revalidate_hours"],
+            recheck_minutes=nas_config["missing_recheck_minutes"],
+            max_recheck_hours=nas_config["missing_recheck_max_hours"],
+        )
+        return fetcher, mirror
+
+    def publish_nas_stats(metrics: TaskMetrics, fetcher: NasFetcher) -> dict[str, Any]:
+        nas_stats = fetcher.stats()
+        for key in ("requests", "failures", "timed_out", "bytes", "mirror_hits", "not_modified", "negative_skips"):
+            metrics.incr(f"nas.{key}", nas_stats[key])
+        for latency in fetcher.latencies:
+            metrics.observe("nas.latency_ms", latency * 1000)
+        return nas_stats
 
-        if not call_ids:
-            return calls
+    @task()
+    def repoll_pending_transcripts(config: dict[str, Any], run_id: str | None = None) -> dict[str, int]:
+        """
+        Look for late transcripts of recent ``pending`` calls and requeue the
+        calls that now have one, so this run's resume scan scores them.
 
-        # Check which already exist (batch in chunks of 100)
-        existing_ids = set()
-        for i in range(0, len(call_ids), 100):
-            batch = call_ids[i : i + 100]
-            result = supabase.table("calls").select("call_id").in_("call_id", batch).execute()
-            existing_ids.update(r["call_id"] for r in result.data)
+        Goes through the NAS mirror: transcripts already downloaded aren't
+        fetched again and known-missing ones are only rechecked when due.
+        """
+        nas_config = config["nas"]
+        if nas_config["repoll_limit"] <= 0:
+            return {"candidates": 0, "found": 0}
 
-        # Filter to new calls only
-        new_calls = [
-            c for c in calls
-            if (c.get("call_id") or c.get("recording_id")) not in existing_ids
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+        metrics = TaskMetrics("repoll_pending_transcripts")
+        metrics.instrument_supabase(supabase)
+
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=nas_config["repoll_max_age_hours"])
+        with metrics.stage("load_pending"):
+            result = (
+                supabase.table("calls")
+                .select("id, call_id, user_id, status, customer_name, recording_url, transcript_url, summary_url")
+                .eq("status", "pending")
+                .gte("created_at", cutoff.isoformat())
+                .order("created_at", desc=True)
+                .limit(nas_config["repoll_limit"])
+                .execute()
+            )
+        calls = [
+            {
+                "id": row["id"],
+                "call_id": row["call_id"],
+                "user_id": row["user_id"],
+                "status": row["status"],
+                "customer_name": row.get("customer_name"),
+                "recording_link": row.get("recording_url"),
+                "transcript_link": row.get("transcript_url") or "",
+                "summary_link": row.get("summary_url") or "",
+            }
+            for row in result.data
+            if row.get("call_id") and row.get("transcript_url")
         ]
 
-        logger.info(f"Filtered to {len(new_calls)} new calls ({len(existing_ids)} already synced)")
-        return new_calls
+        store = BlobStore(config["blob_store"]["dir"], compress=config["blob_store"]["compress"])
+        fetcher, mirror = open_nas(config, store)
+        try:
+            with metrics.stage("nas_fetch"):
+                fetched = fetcher.fetch_all(calls, mirror)
+        finally:
+            mirror.close()
+
+        found = []
+        for call in fetched:
+            if call.get("transcript_text"):
+                call["transcript_hash"] = store.put(call.pop("transcript_text"))
+                summary_text = call.pop("summary_text", None)
+                # Keep a summary hash already in the checkpoint when none was fetched
+                if summary_text:
+                    call["summary_hash"] = store.put(summary_text)
+                found.append(call)
+
+        requeued = 0
+        if found:
+            items = load_states(supabase, [item_key(call) for call in found])
+            requeued = requeue(supabase, found, items, run_id, config["sync"]["write_batch_size"])
+
+        nas_stats = publish_nas_stats(metrics, fetcher)
+        metrics.incr("items", len(calls))
+        metrics.incr("calls.transcript_late", requeued)
+        metrics.publish()
+        logger.info(
+            f"Re-polled {len(calls)} pending calls: {requeued} transcripts arrived "
+            f"({nas_stats['requests']} NAS requests, {nas_stats['negative_skips']} not due for a recheck)"
+        )
+        return {"candidates": len(calls), "found": requeued}
 
-    @task()
-    def fetch_transcripts(calls: list[dict[str, Any]]) -> list[dict[str, Any]]:
-        """Fetch transcript text from NAS URLs for each call."""
-        calls_with_transcripts = []
+    @task(pool=pool)
+    def fetch_transcripts(
+        manifest: dict[str, Any], config: dict[str, Any], run_id: str | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Fetch transcript and summary text from NAS URLs concurrently.
 
-        for call in calls:
-            transcript_url = call.get("transcript_link", "")
-            summary_url = call.get("summary_link", "")
-
-            transcript_text = None
-            summary_text = None
-
-            # Fetch transcript
-            if transcript_url:
-                try:
-                    resp = requests.get(transcript_url, timeout=30)
-                    if resp.ok and len(resp.text) >= 10:
-                        transcript_text = resp.text
-                except Exception as e:
-                    logger.warning(f"Failed to fetch transcript for {call.get('call_id')}: {e}")
-
-            # Fetch summary
-            if summary_url:
-                try:
-                    resp = requests.get(summary_url, timeout=30)
-                    if resp.ok and len(resp.text) >= 10:
-                        summary_text = resp.text
-                except Exception as e:
-                    logger.warning(f"Failed to fetch summary for {call.get('call_id')}: {e}")
-
-            calls_with_transcripts.append({
-                **call,
-                "transcript_text": transcript_text,
-                "summary_text": summary_text,
-            })
+        Resumed calls whose transcript is still in the blob store are not
+        fetched again; calls already in Supabase reuse the stored transcript.
+        """
+        metrics = TaskMetrics("fetch_transcripts")
 
-        with_transcripts = sum(1 for c in calls_with_transcripts if c.get("transcript_text"))
-        logger.info(f"Fetched transcripts: {with_transcripts}/{len(calls)} have transcripts")
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+        metrics.instrument_supabase(supabase)
+
+        store = BlobStore(config["blob_store"]["dir"], compress=config["blob_store"]["compress"])
+        calls = list(iter_staged_rows(manifest))
+        ready = [c for c in calls if store.exists(c.get("transcript_hash"))]
+        missing = [c for c in calls if not store.exists(c.get("transcript_hash"))]
+
+        # Inserted calls may already have their transcript in Supabase
+        stored = [item_key(c) for c in missing if state_rank(c.get(STATE_KEY)) >= state_rank("inserted")]
+        stored_texts = {}
+        with metrics.stage("stored_transcripts"):
+            stored_hashes = {}
+            for batch in chunked(stored, LOOKUP_CHUNK_SIZE):
+                result = (
+                    supabase.table("calls")
+                    .select("call_id, transcript_hash")
+                    .in_("call_id", batch)
+                    .eq("has_transcript", True)
+                    .execute()
+                )
+                stored_hashes.update((r["call_id"], r["transcript_hash"]) for r in result.data)
+            bodies = load_texts(supabase, stored_hashes.values())
+            stored_texts = {k: bodies[h] for k, h in stored_hashes.items() if h in bodies}
+
+        fetcher, mirror = open_nas(config, store)
+        try:
+            with metrics.stage("nas_fetch"):
+                fetched = fetcher.fetch_all([c for c in missing if item_key(c) not in stored_texts], mirror)
+        finally:
+            mirror.close()
+
+        calls_with_transcripts = list(ready)
+        with metrics.stage("blob_store"):
+            for call in [c for c in missing if item_key(c) in stored_texts]:
+                call["transcript_hash"] = store.put(stored_texts[item_key(call)])
+                calls_with_transcripts.append(call)
+            for call in fetched:
+                # Bodies go to the blob store; only their hashes travel through XCom
+                call["transcript_hash"] = store.put(call.pop("transcript_text", None))
+                call["summary_hash"] = store.put(call.pop("summary_text", None))
+                calls_with_transcripts.append(call)
+
+        checkpoint(supabase, calls_with_transcripts, "fetched", run_id, config["sync"]["write_batch_size"])
+
+        with_transcripts = sum(1 for c in calls_with_transcripts if c.get("transcript_hash"))
+        nas_stats = publish_nas_stats(metrics, fetcher)
+        metrics.incr("items", len(calls_with_transcripts))
+        metrics.incr("calls.with_transcript", with_transcripts)
+        metrics.incr("calls.transcript_reused", len(calls) - len(fetched))
+        metrics.publish()
+
+        logger.info(f"Fetched transcripts: {with_transcripts}/{len(calls_with_transcripts)} have transcripts")
+        logger.info(f"NAS fetch stats: {nas_stats}")
         return calls_with_transcripts
 
     @task()
     def get_agent_mapping(
-        calls: list[dict[str, Any]], config: dict[str, Any]
+        shards: list[dict[str, Any]], config: dict[str, Any]
     ) -> dict[str, str]:
         """Get or create agent profiles, return email -> user_id mapping."""
+        calls = [call for shard in shards for call in iter_staged_rows(shard)]
         if not calls:
             return {}
 
@@ -272,90 +797,62 @@ def call_sync_dag():
             config["supabase"]["service_key"],
         )
 
-        # Get unique agent emails
-        agent_emails = list({c.get("agent_email", "").lower() for c in calls if c.get("agent_email")})
-
-        if not agent_emails:
+        agents = group_agents(calls)
+        if not agents:
             return {}
 
-        # Fetch existing profiles
-        result = supabase.table("profiles").select("id, email").in_("email", agent_emails).execute()
-        mapping = {r["email"].lower(): r["id"] for r in result.data}
-
-        # Find missing agents
-        missing = [e for e in agent_emails if e not in mapping]
-
-        # Create missing agents
-        for email in missing:
-            # Find the call data for this agent
-            call_data = next((c for c in calls if c.get("agent_email", "").lower() == email), None)
-            agent_name = call_data.get("agent_name", "") if call_data else ""
-
-            # Parse name
-            if agent_name:
-                parts = agent_name.split(" ", 1)
-                first_name = parts[0]
-                last_name = parts[1] if len(parts) > 1 else ""
-            else:
-                username = email.split("@")[0]
-                name_parts = username.replace(".", " ").replace("_", " ").split()
-                first_name = name_parts[0].title() if name_parts else ""
-                last_name = name_parts[1].title() if len(name_parts) > 1 else ""
-
-            # Determine team from email domain
-            domain = email.split("@")[1] if "@" in email else ""
-            team = None
-            if "boostcreditline" in domain:
-                team = "Boost"
-            elif "bisongreen" in domain:
-                team = "Bison"
-            elif "tlc" in domain:
-                team = "TLC"
-            elif "yattaops" in domain:
-                team = "Yatta"
-
-            try:
-                # Create auth user
-                auth_result = supabase.auth.admin.create_user({
-                    "email": email,
-                    "password": f"Temp{datetime.now().timestamp()}!",
-                    "email_confirm": True,
-                    "user_metadata": {
-                        "first_name": first_name,
-                        "last_name": last_name,
-                        "created_by_airflow": True,
-                    },
-                })
-
-                user_id = auth_result.user.id
-
-                # Create profile
-                supabase.table("profiles").upsert({
-                    "id": user_id,
-                    "email": email,
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "role": "agent",
-                    "team": team,
-                    "hourly_rate": 15.00,
-                }).execute()
-
-                mapping[email] = user_id
-                logger.info(f"Created agent: {first_name} {last_name} ({email})")
-
-            except Exception as e:
-                logger.error(f"Failed to create agent {email}: {e}")
+        metrics = TaskMetrics("get_agent_mapping")
+        metrics.instrument_supabase(supabase)
 
+        agent_config = config["agents"]
+        index = AgentIndex(agent_config["index_dir"], agent_config["full_refresh_hours"])
+        try:
+            with metrics.stage("refresh_index"):
+                index.refresh(supabase)
+            mapping = index.get_many(list(agents))
+
+            # Profiles created since the refresh (e.g. from the web app)
+            unknown = [email for email in agents if email not in mapping]
+            with metrics.stage("lookup_profiles"):
+                found = lookup_profiles(supabase, unknown)
+            mapping.update(found)
+
+            missing = {email: agents[email] for email in unknown if email not in found}
+            with metrics.stage("provision"):
+                created = provision_agents(
+                    supabase,
+                    missing,
+                    max_concurrency=agent_config["provision_concurrency"],
+                    batch_size=config["sync"]["write_batch_size"],
+                )
+            mapping.update(created)
+            index.put_many({**found, **created})
+        finally:
+            index.close()
+
+        logger.info(f"Agent lookups: {len(agents) - len(unknown)} from index, {len(found)} from profiles, "
+                    f"{len(created)} created, {len(missing) - len(created)} failed")
+        metrics.incr("items", len(agents))
+        metrics.incr("agents.from_index", len(agents) - len(unknown))
+        metrics.incr("agents.from_profiles", len(found))
+        metrics.incr("agents.created", len(created))
+        metrics.incr("agents.failed", len(missing) - len(created))
+        metrics.publish()
         logger.info(f"Agent mapping: {len(mapping)} agents resolved")
         return mapping
 
-    @task()
+    @task(pool=pool)
     def insert_calls_to_supabase(
         calls: list[dict[str, Any]],
         agent_mapping: dict[str, str],
         config: dict[str, Any],
+        run_id: str | None = None,
     ) -> list[dict[str, Any]]:
-        """Insert calls into Supabase calls table."""
+        """
+        Upsert calls into Supabase calls table in batches. Resumed calls that
+        are already inserted only get their transcript written if it arrived
+        since.
+        """
         if not calls:
             return []
 
@@ -363,19 +860,68 @@ def call_sync_dag():
             config["supabase"]["url"],
             config["supabase"]["service_key"],
         )
-
-        inserted_calls = []
+        metrics = TaskMetrics("insert_calls_to_supabase")
+        metrics.instrument_supabase(supabase)
+        outcomes = []
+
+        store = BlobStore(config["blob_store"]["dir"], compress=config["blob_store"]["compress"])
+        rows = []
+        transcript_updates = []
+        already_inserted = []
+        source_calls = {}
+        unstored_calls = []
+
+        # Bodies go to call_texts before the calls rows that point at them;
+        # inserted calls only need theirs if the transcript arrived since
+        bodies = {}
+        for call in calls:
+            if call.get("id") and state_rank(call.get(STATE_KEY)) >= state_rank("inserted") and call.get("status") != "pending":
+                continue
+            for field in ("transcript_hash", "summary_hash"):
+                body = store.get(call.get(field))
+                if body:
+                    bodies[call[field]] = body
+        with metrics.stage("call_texts"):
+            unstored = store_texts(supabase, bodies, config["sync"]["write_batch_size"])
+        metrics.incr("call_texts.written", len(bodies) - len(unstored))
 
         for call in calls:
-            agent_email = call.get("agent_email", "").lower()
-            user_id = agent_mapping.get(agent_email)
+            if call.get("transcript_hash") in unstored or call.get("summary_hash") in unstored:
+                unstored_calls.append(call)
+                outcomes.append({
+                    "call_id": call.get("call_id") or call.get("recording_id"),
+                    "status": "error",
+                    "error_message": "Storing transcript failed",
+                })
+                continue
+
+            transcript_text = bodies.get(call.get("transcript_hash"))
+            if call.get("id") and state_rank(call.get(STATE_KEY)) >= state_rank("inserted"):
+                if transcript_text and call.get("status") == "pending":
+                    transcript_updates.append({
+                        "call_id": item_key(call),
+                        "user_id": call["user_id"],
+                        **text_columns(call["transcript_hash"], transcript_text, call.get("summary_hash"), bodies),
+                        "status": "transcribed",
+                    })
+                    call["status"] = "transcribed"
+                already_inserted.append(call)
+                continue
+
+            agent_email = (call.get("agent_email") or "").lower()
+            user_id = agent_mapping.get(agent_email) or call.get("user_id")
 
             if not user_id:
                 logger.warning(f"No user_id for agent {agent_email}, skipping call")
+                outcomes.append({
+                    "call_id": call.get("call_id") or call.get("recording_id"),
+                    "status": "skipped",
+                    "error_message": f"No profile for agent {agent_email}",
+                })
                 continue
 
             call_id = call.get("call_id") or call.get("recording_id")
-            transcript_text = call.get("transcript_text")
+            source_calls[call_id] = call
 
             # Determine call type
             call_type_raw = (call.get("call_type") or "").lower()
@@ -389,33 +935,89 @@ def call_sync_dag():
             # Determine status based on transcript availability
             status = "transcribed" if transcript_text else "pending"
 
-            try:
-                result = supabase.table("calls").insert({
-                    "user_id": user_id,
-                    "call_id": call_id,
-                    "campaign_name": call.get("campaign"),
-                    "call_type": call_type,
-                    "call_start_time": call.get("call_timestamp").isoformat() if call.get("call_timestamp") else None,
-                    "call_duration_seconds": call.get("length_seconds"),
-                    "recording_url": call.get("recording_link"),
-                    "transcript_text": transcript_text,
-                    "transcript_url": call.get("transcript_link"),
-                    "customer_phone": call.get("number1"),
-                    "customer_name": " ".join(filter(None, [call.get("first_name"), call.get("last_name")])) or None,
-                    "disposition": call.get("disposition"),
-                    "status": status,
-                }).execute()
-
-                if result.data:
-                    inserted_call = result.data[0]
-                    inserted_call["transcript_text"] = transcript_text  # Keep for scoring
-                    inserted_calls.append(inserted_call)
-                    logger.debug(f"Inserted call {call_id}")
-
-            except Exception as e:
-                logger.error(f"Failed to insert call {call_id}: {e}")
-
-        logger.info(f"Inserted {len(inserted_calls)} calls to Supabase")
+            rows.append({
+                "user_id": user_id,
+                "call_id": call_id,
+                "campaign_name": call.get("campaign"),
+                "call_type": call_type,
+                "call_start_time": call.get("call_timestamp") or None,
+                "call_duration_seconds": call.get("length_seconds"),
+                "recording_url": call.get("recording_link"),
+                # The body is in call_texts; calls only points at it
+                **text_columns(call.get("transcript_hash"), transcript_text, call.get("summary_hash"), bodies),
+                "transcript_url": call.get("transcript_link"),
+                # Re-polled with the transcript while the call is pending
+                "summary_url": call.get("summary_link") or None,
+                "customer_phone": call.get("number1"),
+                "customer_name": " ".join(filter(None, [call.get("first_name"), call.get("last_name")])) or None,
+                "disposition": call.get("disposition"),
+                "status": status,
+            })
+
+        # Upsert on call_id so a retried task can't insert the same call twice
+        with metrics.stage("upsert"):
+            written, failed = upsert_in_batches(
+                supabase,
+                "calls",
+                rows,
+                on_conflict="call_id",
+                batch_size=config["sync"]["write_batch_size"],
+            )
+            if transcript_updates:
+                _, failed_updates = upsert_in_batches(
+                    supabase,
+                    "calls",
+                    transcript_updates,
+                    on_conflict="call_id",
+                    batch_size=config["sync"]["write_batch_size"],
+                )
+                failed.extend(failed_updates)
+
+        inserted_calls = []
+        for inserted_call in written:
+            # Scoring reloads the body from the blob store by hash
+            inserted_call.pop("transcript_text", None)
+            inserted_call.pop("summary_text", None)
+            # Keep the Five9 fields and links so the checkpoint can resume from here
+            inserted_calls.append({**source_calls.get(inserted_call["call_id"], {}), **inserted_call})
+
+        checkpoint(supabase, inserted_calls, "inserted", run_id, config["sync"]["write_batch_size"])
+
+        # Webhook events with only a recording: transcribe-call writes the
+        # transcript and triggers the audit and conversation analysis itself
+        to_transcribe = [
+            {"callId": call["id"], "recordingUrl": call["recording_link"]}
+            for call in inserted_calls
+            if call.get("transcribe_recording") and call.get("status") == "pending"
+        ]
+        with metrics.stage("transcribe_call"):
+            invoked = invoke_edge_function(supabase, "transcribe-call", to_transcribe)
+        transcribing = {body["callId"] for body in invoked}
+        # audit-call scores these once the transcript is in, so they leave the
+        # DAG here; a failed invocation leaves the call to the resume path
+        handed_off = [call for call in inserted_calls if call["id"] in transcribing]
+        checkpoint(supabase, handed_off, "saved", run_id, config["sync"]["write_batch_size"])
+        inserted_calls = [call for call in inserted_calls if call["id"] not in transcribing]
+        inserted_calls.extend(already_inserted)
+
+        outcomes.extend(
+            {"call_id": row["call_id"], "status": "error", "error_message": "Insert into calls failed"}
+            for row in failed
+        )
+        log_call_outcomes(supabase, outcomes, run_id, config["sync"]["write_batch_size"])
+
+        metrics.incr("items", len(calls))
+        metrics.incr("calls.inserted", len(inserted_calls) + len(handed_off) - len(already_inserted))
+        metrics.incr("calls.already_inserted", len(already_inserted))
+        metrics.incr("calls.failed", len(failed) + len(unstored_calls))
+        metrics.incr("calls.skipped", len(calls) - len(rows) - len(already_inserted) - len(unstored_calls))
+        metrics.incr("calls.transcription_requested", len(handed_off))
+        metrics.publish()
+
+        logger.info(
+            f"Inserted {len(inserted_calls) + len(handed_off) - len(already_inserted)} calls to Supabase "
+            f"({len(already_inserted)} resumed, {len(failed)} failed, {len(handed_off)} sent to transcribe-call)"
+        )
         return inserted_calls
 
     @task()
@@ -441,122 +1043,341 @@ def call_sync_dag():
         ]
 
     @task()
+    def load_prescore_rules(criteria: list[dict[str, Any]], config: dict[str, Any]) -> dict[str, Any]:
+        """Build the rule pre-scorer's phrase rules for the run's criteria."""
+        if config["prescore"]["mode"] == "off":
+            return {}
+
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+        try:
+            sources = load_rule_sources(supabase)
+        except Exception as e:
+            # The built-in and template phrases still apply
+            logger.warning(f"Failed to load script templates and keyword libraries: {e}")
+            sources = {}
+
+        rule_set = build_rules(criteria, sources)
+        logger.info(
+            f"Pre-scorer rules for {sorted(rule_set['rules'])} "
+            f"({len(rule_set['prohibited'])} prohibited phrases), fingerprint {rule_set['fingerprint']}"
+        )
+        return rule_set
+
+    @task(pool=pool)
     def score_calls_with_gemini(
         calls: list[dict[str, Any]],
         criteria: list[dict[str, Any]],
+        rule_set: dict[str, Any],
         config: dict[str, Any],
+        run_id: str | None = None,
     ) -> list[dict[str, Any]]:
-        """Score calls with Gemini AI."""
+        """Score calls with Gemini AI, after the rule pre-scorer where it applies."""
         if not calls:
             return []
 
+        metrics = TaskMetrics("score_calls_with_gemini")
+        outcomes_log = []
+
         gemini_config = config["gemini"]
         genai.configure(api_key=gemini_config["api_key"])
-        model = genai.GenerativeModel(gemini_config["model"])
 
         supabase = create_client(
             config["supabase"]["url"],
             config["supabase"]["service_key"],
         )
-
-        # Build criteria text for prompt
-        criteria_text = "\n".join(
-            f"- {c['id']}: {c['name']} - {c['description']}"
-            for c in criteria
+        metrics.instrument_supabase(supabase)
+
+        # Rule decisions change the cached audits, so the rules are part of the key
+        prescore_mode = config["prescore"]["mode"] if rule_set and rule_set["rules"] else "off"
+        criteria_hash = criteria_fingerprint(criteria)
+        if prescore_mode == "on":
+            criteria_hash = criteria_fingerprint([*criteria, {"prescore": rule_set["fingerprint"]}])
+
+        cache_config = config["audit_cache"]
+        cache = AuditCache(
+            supabase,
+            LocalAuditCache(
+                cache_config["dir"],
+                max_bytes=cache_config["max_mb"] * 1024 * 1024,
+                ttl_seconds=cache_config["ttl_hours"] * 3600,
+            ),
+            model=gemini_config["model"],
+            criteria_hash=criteria_hash,
         )
 
-        scored_calls = []
+        store = BlobStore(config["blob_store"]["dir"], compress=config["blob_store"]["compress"])
+        write_batch_size = config["sync"]["write_batch_size"]
 
-        for call in calls:
-            transcript = call.get("transcript_text")
+        # Key every scorable transcript, then check both cache tiers in one pass
+        keyed = []
+        for index, call in enumerate(calls):
+            transcript = store.get(call.get("transcript_hash"))
             if not transcript or len(transcript) < 50:
                 logger.info(f"Skipping call {call.get('call_id')} - no/short transcript")
+                outcomes_log.append({
+                    "call_id": call.get("call_id"),
+                    "status": "skipped",
+                    "error_message": FAILURE_REASONS["no_transcript"],
+                    "failure_reason": "no_transcript",
+                })
                 continue
 
-            # Check cache first
-            transcript_hash = hashlib.sha256(transcript.strip().lower().encode()).hexdigest()
-            cache_result = supabase.table("audit_cache").select("audit_result").eq("transcript_hash", transcript_hash).execute()
+            keyed.append((index, call["transcript_hash"], cache.key_for(call["transcript_hash"])))
+
+        with metrics.stage("cache_lookup"):
+            cached = cache.lookup([cache_key for _, _, cache_key in keyed])
+        # Results are keyed by input index so output stays in input order
+        results, pending = split_cache_hits(keyed, cached)
+        texts = {key: store.get(content_hash) for key, (content_hash, _) in pending.items()}
+
+        # Near-duplicates of already-audited transcripts (shadow mode only reports them)
+        near_dup_config = config["near_dup"]
+        near_dup = None
+        sketches: dict[str, dict[str, Any]] = {}
+        if near_dup_config["mode"] != "off" and pending:
+            near_dup = NearDuplicateDetector(
+                supabase,
+                gemini_config["model"],
+                cache.criteria_hash,
+                threshold=near_dup_config["threshold"],
+            )
+            with metrics.stage("near_dup"):
+                for cache_key, (_, indexes) in pending.items():
+                    sketch = near_dup.sketch(texts[cache_key], [calls[indexes[0]].get("customer_name") or ""])
+                    if sketch:
+                        sketches[cache_key] = sketch
+                matches = near_dup.find_matches(sketches)
+            if near_dup_config["mode"] == "reuse":
+                reusable = {k: m["match"] for k, m in matches.items() if not m["in_run"]}
+                reused = cache.lookup(list(reusable.values()))
+                for cache_key, match_key in reusable.items():
+                    if match_key not in reused:
+                        continue
+                    _, indexes = pending.pop(cache_key)
+                    cache.record_hits(match_key, len(indexes) - 1)
+                    for index in indexes:
+                        results[index] = {**reused[match_key], "from_cache": True, "near_duplicate_of": match_key}
+
+        # Criteria the rules decide confidently are final in "on" mode; a call
+        # with every criterion decided never reaches Gemini
+        decided: dict[str, dict[str, dict[str, Any]]] = {}
+        if prescore_mode != "off" and pending:
+            prescorer = PreScorer(rule_set, config["prescore"]["min_confidence"])
+            criteria_ids = {c["id"] for c in criteria}
+            with metrics.stage("prescore"):
+                for cache_key in pending:
+                    confident = prescorer.confident(prescorer.decide(texts[cache_key]))
+                    if confident:
+                        decided[cache_key] = confident
+                    metrics.incr("prescore.criteria_decided", len(confident))
+                    metrics.incr("prescore.criteria_sent", len(criteria_ids) - len(confident))
+
+            if prescore_mode == "on":
+                for cache_key in [k for k, d in decided.items() if set(d) >= criteria_ids]:
+                    content_hash, indexes = pending.pop(cache_key)
+                    audit_result = full_result(criteria, decided.pop(cache_key))
+                    cache.add(cache_key, content_hash, audit_result)
+                    cache.record_hits(cache_key, len(indexes) - 1)
+                    results.update(spread_result(audit_result, indexes))
+                    metrics.incr("prescore.calls_decided")
+
+        # Shadow mode sends everything and only compares; "on" sends what is left
+        prompt_decided = decided if prescore_mode == "on" else {}
+
+        # Fit each transcript to the token budget; compaction keeps the opening and closing
+        transcript_config = config["transcripts"]
+        with metrics.stage("compaction"):
+            transcripts, compaction = fit_transcripts(
+                {key: texts[key] for key in pending},
+                transcript_config["max_tokens"],
+                transcript_config["compaction"],
+            )
+        for name, count in compaction.items():
+            metrics.incr(f"transcript.{name}", count)
+        metrics.incr("transcript.tokens_saved", compaction["tokens_in"] - compaction["tokens_out"])
+
+        call_ids = {key: str(calls[indexes[0]].get("call_id")) for key, (_, indexes) in pending.items()}
+        # Criteria each response should answer (pre-scored ones are left out of the prompt)
+        expected = {
+            key: [c["id"] for c in criteria if c["id"] not in prompt_decided.get(key, {})]
+            for key in pending
+        }
+        scored_keys = []
+        budget_config = config["budget"]
+        track_spend = bool(budget_config["run_tokens"] or budget_config["daily_tokens"] or budget_config["daily_usd"])
+
+        # Instructions, criteria and schema go out once as the system instruction
+        model, cached_preamble = build_model(
+            genai,
+            gemini_config["model"],
+            build_preamble(criteria),
+            context_cache=gemini_config["context_cache"],
+            min_cache_tokens=gemini_config["context_cache_min_tokens"],
+        )
+        # The preamble cache is billed until it is deleted, so it goes even if scoring fails
+        try:
+            engine, batch_engine = build_engines(genai, model, gemini_config, config["sync"]["shard_concurrency"])
+
+            # Each chunk is cached and checkpointed before the next one starts, so a
+            # retry after a timeout gets the finished chunks back as cache hits
+            chunks = list(chunked(list(pending), config["sync"]["checkpoint_size"]))
+            for position, chunk in enumerate(chunks):
+                # Other runs spend from the same daily budget; what's left rolls over
+                if track_spend and not daily_budget_left(supabase, config):
+                    rolled_over = sum(len(pending[key][1]) for rest in chunks[position:] for key in rest)
+                    logger.warning(f"Daily Gemini budget used up; {rolled_over} calls roll over to a later run")
+                    metrics.incr("budget.rolled_over", rolled_over)
+                    break
+
+                scored = score_chunk(
+                    chunk,
+                    transcripts,
+                    call_ids,
+                    expected,
+                    prompt_decided,
+                    engine,
+                    metrics,
+                    batch_engine=batch_engine,
+                    batch_config=gemini_config,
+                )
+
+                for cache_key in chunk:
+                    content_hash, indexes = pending[cache_key]
+                    entry = scored[cache_key]
+                    audit_result, outcome = entry["result"], entry["outcome"]
+                    if audit_result is None:
+                        logger.error(f"Gemini scoring failed for call {call_ids[cache_key]}: {entry['error']}")
+                        metrics.incr(f"parse.failed.{entry['reason']}")
+                        metrics.incr("gemini.wasted_output_tokens", outcome["output_tokens"])
+                        outcomes_log.extend(
+                            {
+                                "call_id": calls[i].get("call_id"),
+                                "status": "error",
+                                "error_message": entry["error"],
+                                "failure_reason": entry["reason"],
+                            }
+                            for i in indexes
+                        )
+                        continue
+
+                    if cache_key in prompt_decided:
+                        audit_result = merge_result(audit_result, prompt_decided[cache_key])
+                    elif cache_key in decided:
+                        agreed = agreement(decided[cache_key], audit_result)
+                        metrics.incr("prescore.agreed", sum(agreed.values()))
+                        metrics.incr("prescore.disagreed", len(agreed) - sum(agreed.values()))
+
+                    # Buffer for batched write-back; later duplicates count as cache hits
+                    if entry["complete"]:
+                        cache.add(cache_key, content_hash, audit_result)
+                    scored_keys.append(cache_key)
+                    cache.record_hits(cache_key, len(indexes) - 1)
+                    results.update(spread_result(audit_result, indexes, outcome))
+
+                with metrics.stage("cache_flush"):
+                    cache.flush(write_batch_size)
+                checkpoint(
+                    supabase,
+                    [calls[i] for key in chunk for i in pending[key][1] if i in results],
+                    "scored",
+                    run_id,
+                    write_batch_size,
+                )
+                if track_spend:
+                    prompt_tokens = sum(scored[key]["outcome"]["prompt_tokens"] for key in chunk)
+                    output_tokens = sum(scored[key]["outcome"]["output_tokens"] for key in chunk)
+                    spent_usd = cost_usd(prompt_tokens, output_tokens, budget_config)
+                    record_spend(supabase, prompt_tokens, output_tokens, spent_usd, len(chunk))
+                    metrics.incr("budget.spent_tokens", prompt_tokens + output_tokens)
+                    metrics.incr("budget.spent_usd", spent_usd)
+
+            # Cache hits and near-duplicate reuse were scored without Gemini
+            with metrics.stage("cache_flush"):
+                cache.flush(write_batch_size)
+        finally:
+            cache.local.close()
+            if cached_preamble is not None:
+                cached_preamble.delete()
+
+        checkpoint(
+            supabase,
+            [call for index, call in enumerate(calls) if index in results],
+            "scored",
+            run_id,
+            write_batch_size,
+        )
 
-            if cache_result.data:
-                logger.info(f"Cache HIT for call {call.get('call_id')}")
-                audit_result = cache_result.data[0]["audit_result"]
-                audit_result["from_cache"] = True
-            else:
-                # Call Gemini
-                prompt = f"""You are an expert call quality auditor. Analyze this call transcript.
-
-CRITERIA TO EVALUATE:
-{criteria_text}
-
-TRANSCRIPT:
-{transcript[:12000]}
-
-Return ONLY valid JSON with this structure:
-{{
-  "overall_score": 0-100,
-  "communication_score": 0-100,
-  "compliance_score": 0-100,
-  "accuracy_score": 0-100,
-  "tone_score": 0-100,
-  "empathy_score": 0-100,
-  "resolution_score": 0-100,
-  "summary": "2-3 sentence assessment",
-  "strengths": ["strength1", "strength2"],
-  "areas_for_improvement": ["area1", "area2"],
-  "recommendations": ["rec1", "rec2"],
-  "criteria": [
-    {{"id": "CRITERION_ID", "result": "PASS|PARTIAL|FAIL|N/A", "score": 0-100, "explanation": "...", "recommendation": "..."}}
-  ]
-}}"""
-
-                try:
-                    response = model.generate_content(
-                        prompt,
-                        generation_config=genai.GenerationConfig(
-                            response_mime_type="application/json",
-                            temperature=0.3,
-                            max_output_tokens=4000,
-                        ),
-                    )
-
-                    # Parse response
-                    response_text = response.text.strip()
-                    if response_text.startswith("```"):
-                        response_text = response_text.split("```")[1]
-                        if response_text.startswith("json"):
-                            response_text = response_text[4:]
-
-                    audit_result = json.loads(response_text)
-                    audit_result["from_cache"] = False
-
-                    # Cache the result
-                    supabase.table("audit_cache").upsert({
-                        "transcript_hash": transcript_hash,
-                        "audit_result": audit_result,
-                        "ai_provider": "gemini",
-                        "ai_model": gemini_config["model"],
-                        "hit_count": 1,
-                    }, on_conflict="transcript_hash").execute()
-
-                except Exception as e:
-                    logger.error(f"Gemini scoring failed for call {call.get('call_id')}: {e}")
-                    continue
+        if near_dup:
+            near_dup.index(
+                {k: sketches[k] for k in scored_keys if k in sketches},
+                write_batch_size,
+            )
+            logger.info(f"Near-duplicate stats ({near_dup_config['mode']}): {near_dup.stats()}")
+
+        scored_calls = []
+        for index, call in enumerate(calls):
+            if index not in results:
+                continue
 
             # Add call metadata to result
+            audit_result = results[index]
             audit_result["call_db_id"] = call.get("id")
             audit_result["call_id"] = call.get("call_id")
             audit_result["user_id"] = call.get("user_id")
             scored_calls.append(audit_result)
 
+        log_call_outcomes(supabase, outcomes_log, run_id, write_batch_size)
+
+        engine_stats = engine.stats()
+        batch_stats = batch_engine.stats() if batch_engine else {}
+        cache_stats = cache.stats()
+        metrics.incr("items", len(calls))
+        metrics.incr("calls.scored", len(scored_calls))
+        metrics.incr("calls.failed", sum(1 for o in outcomes_log if o["status"] == "error"))
+        metrics.incr("calls.skipped", sum(1 for o in outcomes_log if o["status"] == "skipped"))
+        metrics.incr("cache.local_hits", cache_stats["local_hits"])
+        metrics.incr("cache.remote_hits", cache_stats["remote_hits"])
+        metrics.incr("cache.misses", cache_stats["misses"])
+        metrics.gauge("cache.hit_ratio", cache_stats["hit_ratio"])
+        metrics.incr("gemini.requests", engine_stats["requests"] + batch_stats.get("requests", 0))
+        metrics.incr("gemini.errors", engine_stats["errors"] + batch_stats.get("errors", 0))
+        metrics.incr("gemini.retries", engine_stats["retries"] + batch_stats.get("retries", 0))
+        metrics.incr("gemini.prompt_tokens", engine_stats["prompt_tokens"] + batch_stats.get("prompt_tokens", 0))
+        metrics.incr("gemini.output_tokens", engine_stats["output_tokens"] + batch_stats.get("output_tokens", 0))
+        metrics.incr("gemini.cached_tokens", engine_stats["cached_tokens"] + batch_stats.get("cached_tokens", 0))
+        for outcome in engine.outcomes:
+            metrics.observe("gemini.latency_ms", outcome["latency_s"] * 1000)
+        for outcome in batch_engine.outcomes if batch_engine else []:
+            metrics.observe("gemini.batch_latency_ms", outcome["latency_s"] * 1000)
+        metrics.publish()
+
         logger.info(f"Scored {len(scored_calls)} calls with Gemini")
+        if prescore_mode != "off":
+            logger.info(
+                f"Pre-scorer ({prescore_mode}): {metrics.counters['prescore.criteria_decided']} criteria decided, "
+                f"{metrics.counters['prescore.calls_decided']} calls without Gemini, "
+                f"{metrics.counters['prescore.agreed']} agreed / {metrics.counters['prescore.disagreed']} disagreed"
+            )
+        logger.info(
+            f"Transcript compaction saved {metrics.counters['transcript.tokens_saved']} of "
+            f"{metrics.counters['transcript.tokens_in']} input tokens"
+        )
+        logger.info(f"Gemini scoring stats: {engine_stats}")
+        if batch_engine:
+            logger.info(f"Gemini batch scoring stats: {batch_stats}")
+        logger.info(f"Audit cache stats: {cache_stats}")
         return scored_calls
 
-    @task()
+    @task(pool=pool)
     def save_report_cards(
         scored_calls: list[dict[str, Any]],
         config: dict[str, Any],
+        run_id: str | None = None,
     ) -> dict[str, int]:
-        """Save audit results as report cards and update call status."""
+        """Save audit results as report cards and mark their calls audited, in batches."""
         if not scored_calls:
             return {"saved": 0, "errors": 0}
 
@@ -564,63 +1385,452 @@ Return ONLY valid JSON with this structure:
             config["supabase"]["url"],
             config["supabase"]["service_key"],
         )
+        metrics = TaskMetrics("save_report_cards")
+        metrics.instrument_supabase(supabase)
+
+        report_cards = [
+            {
+                "user_id": result["user_id"],
+                "call_id": result["call_db_id"],
+                "source_file": result.get("call_id", "synced_call"),
+                "source_type": "call",
+                "overall_score": result.get("overall_score", 0),
+                "communication_score": result.get("communication_score"),
+                "compliance_score": result.get("compliance_score"),
+                "accuracy_score": result.get("accuracy_score"),
+                "tone_score": result.get("tone_score"),
+                "empathy_score": result.get("empathy_score"),
+                "resolution_score": result.get("resolution_score"),
+                "feedback": result.get("summary"),
+                "strengths": result.get("strengths", []),
+                "areas_for_improvement": result.get("areas_for_improvement", []),
+                "recommendations": result.get("recommendations", []),
+                "criteria_results": result.get("criteria", []),
+                "ai_model": result.get("ai_model", config["gemini"]["model"]),
+                "ai_provider": result.get("ai_provider", "gemini"),
+                "processing_time_ms": result.get("processing_time_ms"),
+            }
+            for result in scored_calls
+        ]
 
-        saved = 0
-        errors = 0
-
-        for result in scored_calls:
-            try:
-                # Insert report card
-                report_card = {
-                    "user_id": result["user_id"],
-                    "call_id": result["call_db_id"],
-                    "source_file": result.get("call_id", "synced_call"),
-                    "source_type": "call",
-                    "overall_score": result.get("overall_score", 0),
-                    "communication_score": result.get("communication_score"),
-                    "compliance_score": result.get("compliance_score"),
-                    "accuracy_score": result.get("accuracy_score"),
-                    "tone_score": result.get("tone_score"),
-                    "empathy_score": result.get("empathy_score"),
-                    "resolution_score": result.get("resolution_score"),
-                    "feedback": result.get("summary"),
-                    "strengths": result.get("strengths", []),
-                    "areas_for_improvement": result.get("areas_for_improvement", []),
-                    "recommendations": result.get("recommendations", []),
-                    "criteria_results": result.get("criteria", []),
-                    "ai_model": config["gemini"]["model"],
-                    "ai_provider": "gemini",
+        # Insert report cards, mark their calls audited and add the cards to the
+        # scorecard rollups in one transaction per chunk
+        with metrics.stage("save_rpc"):
+            saved, failed = rpc_in_batches(
+                supabase,
+                "save_report_cards_batch",
+                "cards",
+                report_cards,
+                batch_size=config["sync"]["write_batch_size"],
+                key="call_id",
+            )
+
+        # The webhook used to trigger conversation analysis for the calls it
+        # received; polled calls never had it
+        if mode == "events":
+            with metrics.stage("analyze_conversation"):
+                analyzed = invoke_edge_function(
+                    supabase,
+                    "analyze-conversation",
+                    [{"callId": row["audited_call_id"]} for row in saved],
+                )
+            metrics.incr("calls.analysis_requested", len(analyzed))
+
+        five9_ids = {r["call_db_id"]: r.get("call_id") for r in scored_calls}
+        failed_ids = {card["call_id"] for card in failed}
+        log_call_outcomes(
+            supabase,
+            [
+                {
+                    "call_id": five9_ids[card["call_id"]],
+                    "status": "error",
+                    "error_message": FAILURE_REASONS["save_failed"],
+                    "failure_reason": "save_failed",
                 }
+                if card["call_id"] in failed_ids
+                else {"call_id": five9_ids[card["call_id"]], "status": "success"}
+                for card in report_cards
+            ],
+            run_id,
+            config["sync"]["write_batch_size"],
+        )
 
-                supabase.table("report_cards").insert(report_card).execute()
+        cached = sum(1 for r in scored_calls if r.get("from_cache"))
+        metrics.incr("items", len(scored_calls))
+        metrics.incr("report_cards.saved", len(saved))
+        metrics.incr("report_cards.from_cache", cached)
+        metrics.incr("calls.failed", len(failed))
+        metrics.publish()
+        logger.info(f"Saved {len(saved)} report cards ({cached} from cache, {len(failed)} failed)")
+        return {"saved": len(saved), "errors": len(failed)}
+
+    @task(trigger_rule="none_failed")
+    def commit_watermark(
+        manifest: dict[str, Any],
+        window: dict[str, Any],
+        config: dict[str, Any],
+    ) -> dict[str, Any] | None:
+        """Advance the high-water mark once this run's calls are in Supabase."""
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
 
-                # Update call status to audited
-                supabase.table("calls").update({"status": "audited"}).eq("id", result["call_db_id"]).execute()
+        return advance_watermark(supabase, window, manifest.get("watermark"))
 
-                saved += 1
-                cache_note = " (cached)" if result.get("from_cache") else ""
-                logger.info(f"Saved report card for {result.get('call_id')}: {result.get('overall_score')}/100{cache_note}")
+    @task(trigger_rule="all_done")
+    def collect_shards(shard_lists: list[list[dict[str, Any]]]) -> list[dict[str, Any]]:
+        """
+        Flatten the shards of every backfill partition into one list to map
+        the per-call stages over. Partitions that failed to fetch or filter
+        are left out and stay pending in the ledger.
+        """
+        return [shard for shards in shard_lists if shards for shard in shards]
 
-            except Exception as e:
-                logger.error(f"Failed to save report card for {result.get('call_id')}: {e}")
-                errors += 1
+    @task(trigger_rule="all_done")
+    def commit_partitions(
+        partitions: list[dict[str, Any]],
+        shards: list[dict[str, Any]],
+        config: dict[str, Any],
+        **context,
+    ) -> dict[str, int]:
+        """Mark partitions whose shards were all saved as done in the backfill ledger."""
+        succeeded = context["dag_run"].get_task_instances(state=[TaskInstanceState.SUCCESS])
+        filtered = {
+            ti.map_index for ti in succeeded if ti.task_id == "process_partition.filter_existing_calls"
+        }
+        saved = {
+            ti.map_index: ti.xcom_pull(task_ids=ti.task_id, map_indexes=ti.map_index) or {}
+            for ti in succeeded
+            if ti.task_id == "process_shard.save_report_cards"
+        }
 
-        return {"saved": saved, "errors": errors}
+        rows = partition_outcomes(partitions, shards, filtered, saved)
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+        record_partitions(supabase, rows)
+
+        done = sum(1 for row in rows if row["status"] == "done")
+        logger.info(f"Backfilled {done} of {len(rows)} partitions ({len(rows) - done} left for the next run)")
+        return {"done": done, "failed": len(rows) - done}
+
+    @task(trigger_rule="none_failed")
+    def cleanup_staging(config: dict[str, Any], run_id: str | None = None) -> None:
+        """
+        Remove this run's staged batch files, plus any left behind by failed
+        runs that were never cleared, and blobs no run has touched lately.
+
+        Failed runs keep their shards so individual shards can be cleared and
+        retried from the UI.
+        """
+        remove_run_dir(config["sync"]["staging_dir"], run_id)
+        prune_staging(config["sync"]["staging_dir"], max_age_hours=48)
+        BlobStore(config["blob_store"]["dir"]).prune(max_age_hours=48)
+
+    @task(trigger_rule="all_done")
+    def record_run(config: dict[str, Any], **context) -> dict[str, Any]:
+        """
+        Roll every task's metrics up into a ``call_sync_runs`` row and emit
+        run-level StatsD metrics.
+
+        Runs even when shards fail, then fails itself so the DAG run still
+        shows as failed.
+        """
+        dag_run = context["dag_run"]
+        window = context["ti"].xcom_pull(task_ids="resolve_sync_window")
+        summaries = context["ti"].xcom_pull(
+            task_ids=[t.task_id for t in context["dag"].tasks],
+            key=XCOM_KEY,
+        )
+        run_metrics = merge_summaries([s for s in summaries or [] if s])
+        totals = run_metrics["totals"]
+
+        failed_tasks = sorted({
+            ti.task_id
+            for ti in dag_run.get_task_instances(
+                state=[TaskInstanceState.FAILED, TaskInstanceState.UPSTREAM_FAILED]
+            )
+        })
+        lookups = totals.get("cache.local_hits", 0) + totals.get("cache.remote_hits", 0) + totals.get("cache.misses", 0)
+        run_metrics["cache_hit_ratio"] = round(
+            (totals.get("cache.local_hits", 0) + totals.get("cache.remote_hits", 0)) / lookups, 3
+        ) if lookups else None
+        run_metrics["window_mode"] = window.get("mode") if window else mode
+
+        completed_at = datetime.now(dag_run.start_date.tzinfo)
+        duration_ms = round((completed_at - dag_run.start_date).total_seconds() * 1000)
+        run_row = {
+            "dag_run_id": dag_run.run_id,
+            "started_at": dag_run.start_date.isoformat(),
+            "completed_at": completed_at.isoformat(),
+            "status": "failed" if failed_tasks else "completed",
+            "calls_synced": totals.get("calls.inserted", 0),
+            "calls_skipped": totals.get("calls.existing", 0) + totals.get("calls.skipped", 0),
+            "calls_failed": totals.get("calls.failed", 0),
+            "error_message": f"Failed tasks: {', '.join(failed_tasks)}" if failed_tasks else None,
+            "duration_ms": duration_ms,
+            "metrics": run_metrics,
+        }
+
+        supabase = create_client(
+            config["supabase"]["url"],
+            config["supabase"]["service_key"],
+        )
+        try:
+            supabase.table("call_sync_runs").upsert(run_row, on_conflict="dag_run_id").execute()
+        except Exception as e:
+            logger.error(f"Failed to record run summary: {e}")
+
+        Stats.timing("call_sync.run.duration", duration_ms)
+        Stats.gauge("call_sync.run.calls_synced", run_row["calls_synced"])
+        Stats.gauge("call_sync.run.calls_failed", run_row["calls_failed"])
+        if run_metrics["cache_hit_ratio"] is not None:
+            Stats.gauge("call_sync.run.cache_hit_ratio", run_metrics["cache_hit_ratio"])
+        logger.info(f"Run summary: {run_row}")
+
+        if failed_tasks:
+            raise AirflowFailException(f"Upstream tasks failed: {', '.join(failed_tasks)}")
+        return {k: run_row[k] for k in ("status", "calls_synced", "calls_skipped", "calls_failed", "duration_ms")}
 
     # ==========================================================================
     # DAG FLOW
     # ==========================================================================
 
+    @task_group(group_id="process_partition")
+    def process_partition(window: dict[str, Any], config: dict[str, Any]):
+        """Fetch and filter one backfill partition; partitions run in parallel."""
+        manifest = fetch_calls_from_five9.override(pool=pool)(config, window)
+        return filter_existing_calls.override(pool=pool)(manifest, config)
+
+    @task_group(group_id="process_shard")
+    def process_shard(
+        shard: dict[str, Any],
+        agent_mapping: dict[str, str],
+        criteria: list[dict[str, Any]],
+        rule_set: dict[str, Any],
+        config: dict[str, Any],
+    ):
+        """Per-call stages for one SYNC_BATCH_SIZE shard; shards run in parallel."""
+        calls_with_transcripts = fetch_transcripts(shard, config)
+        inserted_calls = insert_calls_to_supabase(calls_with_transcripts, agent_mapping, config)
+        scored_calls = score_calls_with_gemini(inserted_calls, criteria, rule_set, config)
+        return save_report_cards(scored_calls, config)
+
     config = get_config()
-    raw_calls = fetch_calls_from_five9(config)
-    new_calls = filter_existing_calls(raw_calls, config)
-    calls_with_transcripts = fetch_transcripts(new_calls)
-    agent_mapping = get_agent_mapping(calls_with_transcripts, config)
-    inserted_calls = insert_calls_to_supabase(calls_with_transcripts, agent_mapping, config)
+    if mode == "backfill":
+        partitions = plan_backfill(config)
+        shards = collect_shards(process_partition.partial(config=config).expand(window=partitions))
+    elif mode == "events":
+        # Deferred in the triggerer until a micro-batch is waiting
+        events_ready = WaitForCallEventsOperator(
+            task_id="wait_for_call_events",
+            events_config=get_events_config(config),
+        )
+        raw_calls = claim_call_events(config)
+        events_ready >> raw_calls
+        shards = filter_existing_calls(raw_calls, config)
+    else:
+        window = resolve_sync_window(config)
+        raw_calls = fetch_calls_from_five9(config, window)
+        shards = filter_existing_calls(raw_calls, config)
+        # Late transcripts are requeued before the resume scan picks its work
+        repoll_pending_transcripts(config) >> shards
+    agent_mapping = get_agent_mapping(shards, config)
     criteria = load_audit_template(config)
-    scored_calls = score_calls_with_gemini(inserted_calls, criteria, config)
-    save_report_cards(scored_calls, config)
+    rule_set = load_prescore_rules(criteria, config)
+    shard_results = process_shard.partial(
+        agent_mapping=agent_mapping,
+        criteria=criteria,
+        rule_set=rule_set,
+        config=config,
+    ).expand(shard=shards)
+    if mode == "backfill":
+        committed = commit_partitions(partitions, shards, config)
+    elif mode == "events":
+        committed = ack_call_events(config)
+    else:
+        committed = commit_watermark(raw_calls, window, config)
+    cleanup = cleanup_staging(config)
+    shard_results >> [committed, cleanup]
+    [committed, cleanup] >> record_run(config)
+
+
+# =============================================================================
+# DAG DEFINITIONS
+# =============================================================================
+
+@dag(
+    dag_id="call_sync_and_audit",
+    description="Sync Five9 calls to Supabase and score with Gemini AI",
+    schedule="*/15 * * * *",  # Every 15 minutes
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    default_args={
+        "owner": "cliopa",
+        "retries": 2,
+        "retry_delay": timedelta(minutes=2),
+        "execution_timeout": timedelta(minutes=10),
+        # Ahead of call_sync_backfill when both are waiting for a worker slot
+        "priority_weight": 10,
+    },
+    tags=["cliopa", "five9", "ai-audit", "gemini"],
+)
+def call_sync_dag():
+    """Main DAG for syncing and auditing calls."""
+    call_sync_tasks()
+
+
+@dag(
+    dag_id="call_sync_backfill",
+    description="Reprocess a date range of Five9 calls in parallel time partitions",
+    schedule=None,
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    params={
+        "start": Param("", type="string", description="First Five9 upload_timestamp to sync, e.g. 2026-10-01"),
+        "end": Param("", type="string", description="End of the range (exclusive), e.g. 2026-10-08"),
+        "partition": Param(
+            "",
+            type="string",
+            enum=["", *PARTITION_SIZES],
+            description="hour or day; empty uses BACKFILL_PARTITION",
+        ),
+        "force": Param(False, type="boolean", description="Rerun partitions already marked done"),
+    },
+    default_args={
+        "owner": "cliopa",
+        "retries": 2,
+        "retry_delay": timedelta(minutes=2),
+        "execution_timeout": timedelta(minutes=10),
+        "priority_weight": 1,
+        "weight_rule": "absolute",
+    },
+    tags=["cliopa", "five9", "ai-audit", "gemini", "backfill"],
+)
+def call_sync_backfill_dag():
+    """Backfill DAG: the call sync stages over partitions of a date range."""
+    call_sync_tasks(mode="backfill")
+
+
+@dag(
+    dag_id="call_sync_events",
+    description="Score Five9 calls in micro-batches as five9-webhook events arrive",
+    # Each run waits (deferred) for the next batch; a new run starts as soon as one ends
+    schedule="@continuous",
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    default_args={
+        "owner": "cliopa",
+        "retries": 2,
+        "retry_delay": timedelta(seconds=30),
+        "execution_timeout": timedelta(minutes=10),
+        "priority_weight": 10,
+    },
+    tags=["cliopa", "five9", "ai-audit", "gemini", "webhook"],
+)
+def call_sync_events_dag():
+    """Event-driven DAG: the call sync stages over queued webhook events."""
+    call_sync_tasks(mode="events")
+
+
+@dag(
+    dag_id="scorecard_rollups_rebuild",
+    description="Recompute per-agent and per-team scorecard rollups for a date range",
+    schedule=None,
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    params={
+        "start": Param("", type="string", description="First report card day (UTC) to rebuild, e.g. 2026-10-01"),
+        "end": Param("", type="string", description="End of the range (exclusive), e.g. 2026-11-01"),
+        "chunk_days": Param(7, type="integer", minimum=1, description="Days recomputed per request"),
+    },
+    default_args={
+        "owner": "cliopa",
+        "retries": 2,
+        "retry_delay": timedelta(minutes=2),
+        "execution_timeout": timedelta(minutes=30),
+    },
+    tags=["cliopa", "ai-audit", "rollups"],
+)
+def scorecard_rollups_rebuild_dag():
+    """Rebuild DAG: scorecard rollups from report_cards, for backfills and repairs."""
+
+    @task()
+    def rebuild_scorecard_rollups(params: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Recompute every rollup period overlapping the triggered ``start``/``end`` range."""
+        params = params or {}
+        if not params.get("start") or not params.get("end"):
+            raise AirflowFailException(
+                'Trigger scorecard_rollups_rebuild with {"start": "2026-10-01", "end": "2026-11-01"}'
+            )
+        try:
+            start, end = date.fromisoformat(params["start"]), date.fromisoformat(params["end"])
+        except ValueError as e:
+            raise AirflowFailException(str(e)) from e
+        if end <= start:
+            raise AirflowFailException(f"Rollup range is empty: {start.isoformat()} >= {end.isoformat()}")
+
+        supabase = create_client(
+            Variable.get("SUPABASE_URL"),
+            Variable.get("SUPABASE_SERVICE_KEY", deserialize_json=False),
+        )
+        result = rebuild_rollups(supabase, start, end, int(params.get("chunk_days") or 7))
+        logger.info(f"Rebuilt scorecard rollups from {start} to {end}: {result}")
+        return result
+
+    rebuild_scorecard_rollups()
+
+
+@dag(
+    dag_id="call_texts_backfill",
+    description="Move transcript and summary text out of existing calls rows into call_texts",
+    schedule=None,
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    params={
+        "batch_size": Param(500, type="integer", minimum=1, description="Calls rows moved per request"),
+        "max_batches": Param(0, type="integer", minimum=0, description="Stop after this many batches (0 = until done)"),
+    },
+    default_args={
+        "owner": "cliopa",
+        "retries": 2,
+        "retry_delay": timedelta(minutes=2),
+        "execution_timeout": timedelta(hours=2),
+    },
+    tags=["cliopa", "ai-audit", "backfill"],
+)
+def call_texts_backfill_dag():
+    """Backfill DAG: call_texts from the text columns of calls written before the migration."""
+
+    @task()
+    def move_texts(params: dict[str, Any] | None = None) -> dict[str, int]:
+        """Move texts in batches until no calls row carries transcript or summary text."""
+        params = params or {}
+        supabase = create_client(
+            Variable.get("SUPABASE_URL"),
+            Variable.get("SUPABASE_SERVICE_KEY", deserialize_json=False),
+        )
+        result = move_call_texts(
+            supabase,
+            int(params.get("batch_size") or 500),
+            int(params.get("max_batches") or 0) or None,
+        )
+        logger.info(f"Moved call texts: {result}")
+        return result
+
+    move_texts()
 
 
-# Instantiate the DAG
+# Instantiate the DAGs
 call_sync_dag()
+call_sync_backfill_dag()
+call_sync_events_dag()
+scorecard_rollups_rebuild_dag()
+call_texts_backfill_dag()
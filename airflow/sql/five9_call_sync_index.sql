@@ -0,0 +1,34 @@
+-- Five9 Call Sync Index
+-- Persisted disposition classification and a seekable index for fetch_calls_from_five9 (SQL Server, fivenine schema)
+--
+-- Adding a persisted column rewrites every row of call_recording_logs; run it
+-- in a maintenance window. Sessions that write to the table need the default
+-- ANSI SET options (ARITHABORT, QUOTED_IDENTIFIER, ANSI_NULLS ON), which
+-- ODBC/OLE DB clients use unless they turn them off.
+
+-- Must match UNSCORABLE_DISPOSITIONS in dags/call_sync/five9.py
+IF COL_LENGTH('fivenine.call_recording_logs', 'is_scorable') IS NULL
+    ALTER TABLE fivenine.call_recording_logs ADD is_scorable AS CAST(
+        CASE
+            WHEN LOWER(ISNULL(disposition, '')) LIKE '%voicemail%'
+              OR LOWER(ISNULL(disposition, '')) LIKE '%vm%'
+              OR LOWER(ISNULL(disposition, '')) LIKE '%no answer%'
+              OR LOWER(ISNULL(disposition, '')) LIKE '%busy%'
+              OR LOWER(ISNULL(disposition, '')) LIKE '%disconnected%'
+            THEN 0
+            ELSE 1
+        END AS BIT
+    ) PERSISTED NOT NULL;
+GO
+
+-- Equality on deleted/is_scorable, then a range on upload_timestamp in the
+-- sync window's order; length and agent email are checked without a lookup
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_call_recording_logs_call_sync'
+    AND object_id = OBJECT_ID('fivenine.call_recording_logs')
+)
+    CREATE NONCLUSTERED INDEX IX_call_recording_logs_call_sync
+        ON fivenine.call_recording_logs (deleted, is_scorable, upload_timestamp, recording_id)
+        INCLUDE (length_seconds, agent_email);
+GO
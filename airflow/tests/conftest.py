@@ -0,0 +1,20 @@
+"""
+Put ``airflow/dags`` on the path, as Airflow does for the DAG folder, and
+``airflow/benchmarks`` for the in-memory Supabase stand-in.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "dags"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+
+@pytest.fixture
+def supabase():
+    from fakes import FakeSupabase
+
+    return FakeSupabase(latency=0)
@@ -0,0 +1,82 @@
+import pytest
+
+from call_sync.audit_cache import AuditCache, LocalAuditCache, audit_cache_key
+
+
+@pytest.fixture
+def local(tmp_path):
+    cache = LocalAuditCache(str(tmp_path), max_bytes=1_000_000, ttl_seconds=3600)
+    yield cache
+    cache.close()
+
+
+def cache_rows(supabase):
+    return {row["transcript_hash"]: row for row in supabase.tables.get("audit_cache", [])}
+
+
+def test_key_depends_on_model_and_criteria():
+    key = audit_cache_key("content", "gemini-2.0-flash", "criteria")
+    assert key == audit_cache_key("content", "gemini-2.0-flash", "criteria")
+    assert key != audit_cache_key("content", "gemini-2.5-flash", "criteria")
+    assert key != audit_cache_key("content", "gemini-2.0-flash", "other")
+
+
+def test_add_leaves_hit_count_to_the_column_default(supabase):
+    cache = AuditCache(supabase, None, "model", "criteria")
+    key = cache.key_for("h1")
+    cache.add(key, "h1", {"overall_score": 80})
+    cache.flush(batch_size=50)
+
+    row = cache_rows(supabase)[key]
+    assert row["hit_count"] == 1
+    assert row["content_hash"] == "h1"
+    assert row["ai_provider"] == "gemini"
+
+
+def test_racing_add_keeps_the_accumulated_hit_count(supabase):
+    first = AuditCache(supabase, None, "model", "criteria")
+    key = first.key_for("h1")
+    first.add(key, "h1", {"overall_score": 80})
+    first.flush(batch_size=50)
+    first.record_hits(key, 4)
+    first.flush(batch_size=50)
+    assert cache_rows(supabase)[key]["hit_count"] == 5
+
+    # Another run scored the same transcript before it saw the cached row
+    second = AuditCache(supabase, None, "model", "criteria")
+    second.add(key, "h1", {"overall_score": 82})
+    second.flush(batch_size=50)
+
+    row = cache_rows(supabase)[key]
+    assert row["audit_result"] == {"overall_score": 82}
+    assert row["hit_count"] == 5
+
+
+def test_lookup_promotes_remote_hits_and_counts_them(supabase, local):
+    seed = AuditCache(supabase, None, "model", "criteria")
+    cached, missing = seed.key_for("h1"), seed.key_for("h2")
+    seed.add(cached, "h1", {"overall_score": 70})
+    seed.flush(batch_size=50)
+
+    cache = AuditCache(supabase, local, "model", "criteria")
+    assert cache.lookup([cached, missing, cached]) == {cached: {"overall_score": 70}}
+    assert cache.stats() == {"local_hits": 0, "remote_hits": 1, "misses": 1, "hit_ratio": 0.5}
+    assert local.get_many([cached]) == {cached: {"overall_score": 70}}
+
+    cache.flush(batch_size=50)
+    assert cache_rows(supabase)[cached]["hit_count"] == 3
+
+
+def test_local_tier_expires_and_evicts_least_recently_used(tmp_path):
+    local = LocalAuditCache(str(tmp_path), max_bytes=60, ttl_seconds=3600)
+    local.put_many({"a": {"x": "a" * 20}})
+    local.put_many({"b": {"x": "b" * 20}})
+    local.get_many(["a"])
+    local.put_many({"c": {"x": "c" * 20}})
+    assert set(local.get_many(["a", "b", "c"])) == {"a", "c"}
+    local.close()
+
+    expired = LocalAuditCache(str(tmp_path / "ttl"), max_bytes=1_000, ttl_seconds=-1)
+    expired.put_many({"a": {"x": 1}})
+    assert expired.get_many(["a"]) == {}
+    expired.close()
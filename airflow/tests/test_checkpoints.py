@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+from call_sync.checkpoints import (
+    DEFERRALS_KEY,
+    ITEMS_TABLE,
+    REQUEUED_AT,
+    STATE_KEY,
+    checkpoint,
+    claim,
+    defer,
+    in_flight,
+    item_key,
+    load_resumable,
+    load_states,
+    requeue,
+    resume_call,
+    state_rank,
+)
+
+
+def ago(minutes):
+    return (datetime.now(timezone.utc) - timedelta(minutes=minutes)).isoformat()
+
+
+def stored_item(call_id, state, attempts, priority, minutes_ago):
+    return {
+        "call_id": call_id,
+        "state": state,
+        "attempts": attempts,
+        "priority": priority,
+        "payload": {"call_id": call_id},
+        "updated_at": ago(minutes_ago),
+    }
+
+
+def items(supabase):
+    return {row["call_id"]: row for row in supabase.tables.get(ITEMS_TABLE, [])}
+
+
+def test_state_rank_and_item_key():
+    assert state_rank("fetched") < state_rank("inserted") < state_rank("scored") < state_rank("saved")
+    assert state_rank(None) == -1
+    assert item_key({"call_id": 12}) == "12"
+    assert item_key({"recording_id": "r1"}) == "r1"
+    assert item_key({}) is None
+
+
+def test_checkpoint_only_moves_calls_forward(supabase):
+    calls = [
+        {"call_id": "a", "transcript_text": "body", "sync_priority": 2.5},
+        {"call_id": "b", STATE_KEY: "saved"},
+        {"recording_id": None},
+    ]
+    assert checkpoint(supabase, calls, "inserted", "run-1", 10) == 1
+
+    row = items(supabase)["a"]
+    assert row["state"] == "inserted"
+    assert row["priority"] == 2.5
+    assert row["dag_run_id"] == "run-1"
+    # Bodies travel through the blob store, not the checkpoint payload
+    assert "transcript_text" not in row["payload"]
+    assert calls[0][STATE_KEY] == "inserted"
+
+    assert checkpoint(supabase, calls[:1], "inserted", "run-1", 10) == 0
+    assert checkpoint(supabase, calls[:1], "scored", "run-1", 10) == 1
+    assert items(supabase)["a"]["state"] == "scored"
+
+
+def test_load_states_and_resume_call(supabase):
+    checkpoint(supabase, [{"call_id": "a", "campaign": "Sales"}], "inserted", "run-1", 10)
+    states = load_states(supabase, ["a", "missing"])
+    assert list(states) == ["a"]
+
+    resumed = resume_call({"call_id": "a", "campaign": "Old", "agent_email": "x@y"}, states["a"])
+    assert resumed["campaign"] == "Sales"
+    assert resumed["agent_email"] == "x@y"
+    assert resumed[STATE_KEY] == "inserted"
+    assert resumed["sync_attempts"] == 0
+
+
+def test_load_resumable_skips_finished_exhausted_and_recent_items(supabase):
+    supabase.tables[ITEMS_TABLE] = [
+        stored_item("low", "inserted", attempts=0, priority=1, minutes_ago=120),
+        stored_item("high", "fetched", attempts=1, priority=5, minutes_ago=60),
+        stored_item("saved", "saved", attempts=0, priority=9, minutes_ago=120),
+        stored_item("spent", "inserted", attempts=3, priority=9, minutes_ago=120),
+        stored_item("busy", "inserted", attempts=0, priority=9, minutes_ago=1),
+        stored_item("mine", "inserted", attempts=0, priority=9, minutes_ago=120),
+    ]
+    resumable = load_resumable(supabase, exclude={"mine"}, limit=10, max_attempts=3, stale_minutes=30)
+    assert [call["call_id"] for call in resumable] == ["high", "low"]
+    assert load_resumable(supabase, exclude=set(), limit=0, max_attempts=3, stale_minutes=30) == []
+
+
+def test_in_flight():
+    assert in_flight({"updated_at": ago(1), "dag_run_id": "other"}, "run-1", 30)
+    assert not in_flight({"updated_at": ago(1), "dag_run_id": "run-1"}, "run-1", 30)
+    assert not in_flight({"updated_at": ago(60), "dag_run_id": "other"}, "run-1", 30)
+    assert not in_flight({}, "run-1", 30)
+
+
+def test_requeue_resets_attempts_and_leaves_saved_calls(supabase):
+    stored = {
+        "a": {"call_id": "a", "state": "fetched", "attempts": 3, "payload": {"campaign": "Sales"}},
+        "b": {"call_id": "b", "state": "scored", "attempts": 2, "payload": {}},
+        "c": {"call_id": "c", "state": "saved", "attempts": 0, "payload": {}},
+    }
+    calls = [
+        {"call_id": "a", "transcript_hash": "h1", "transcript_text": "body"},
+        {"call_id": "b", "transcript_hash": "h2"},
+        {"call_id": "c", "transcript_hash": "h3"},
+    ]
+    assert requeue(supabase, calls, stored, "run-2", 10) == 2
+
+    rows = items(supabase)
+    assert rows["a"]["state"] == "inserted"
+    assert rows["a"]["payload"] == {"campaign": "Sales", "call_id": "a", "transcript_hash": "h1"}
+    assert rows["b"]["state"] == "scored"
+    assert all(rows[key]["attempts"] == 0 and rows[key]["updated_at"] == REQUEUED_AT for key in ("a", "b"))
+    assert "c" not in rows
+
+
+def test_defer_counts_deferrals_and_keeps_resumed_state(supabase):
+    calls = [{"call_id": "new", "sync_priority": 1.5}, {"call_id": "old", STATE_KEY: "inserted", DEFERRALS_KEY: 2}]
+    assert defer(supabase, calls, "run-1", 10) == 2
+
+    rows = items(supabase)
+    assert rows["new"]["state"] == "fetched"
+    assert rows["new"]["payload"][DEFERRALS_KEY] == 1
+    assert rows["new"]["priority"] == 1.5
+    assert rows["old"]["state"] == "inserted"
+    assert rows["old"]["payload"][DEFERRALS_KEY] == 3
+
+
+def test_claim_counts_an_attempt_for_resumed_calls_only(supabase):
+    claim(supabase, [{"call_id": "a", STATE_KEY: "inserted", "sync_attempts": 1}, {"call_id": "new"}], "run-3", 10)
+    rows = items(supabase)
+    assert rows["a"]["attempts"] == 2
+    assert rows["a"]["dag_run_id"] == "run-3"
+    assert "new" not in rows
@@ -0,0 +1,36 @@
+import pytest
+
+from call_sync.blobs import BlobStore
+from call_sync.events import event_row, invoke_edge_function
+from call_sync.triggers import WaitForCallEventsOperator
+
+
+@pytest.mark.parametrize(
+    "payload, transcribe",
+    [
+        ({"recordingUrl": "r.wav"}, True),
+        ({"recordingUrl": "r.wav", "transcriptUrl": "t.txt"}, False),
+        ({"recordingUrl": "r.wav", "transcriptText": "Agent: hello"}, False),
+        ({}, False),
+    ],
+)
+def test_event_row_flags_recordings_without_a_transcript(tmp_path, payload, transcribe):
+    row = event_row({"call_id": "c1", "payload": payload}, BlobStore(str(tmp_path)))
+    assert row["transcribe_recording"] is transcribe
+    assert ("transcript_hash" in row) is ("transcriptText" in payload)
+
+
+def test_invoke_edge_function_returns_only_successful_invocations(supabase):
+    def invoke(function, invoke_options):
+        if invoke_options["body"]["callId"] == "bad":
+            raise RuntimeError("boom")
+
+    supabase.functions.invoke = invoke
+    bodies = [{"callId": "a"}, {"callId": "bad"}, {"callId": "b"}]
+    assert invoke_edge_function(supabase, "transcribe-call", bodies) == [{"callId": "a"}, {"callId": "b"}]
+
+
+def test_wait_operator_templates_only_the_events_settings():
+    operator = WaitForCallEventsOperator(task_id="wait", events_config={"batch_size": 25})
+    assert operator.template_fields == ("events_config",)
+    assert not hasattr(operator, "config")
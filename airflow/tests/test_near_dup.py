@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from call_sync.near_dup import (
+    INDEX_TABLE,
+    MIN_SHINGLES,
+    MinHasher,
+    NearDuplicateDetector,
+    band_keys,
+    estimated_similarity,
+    normalize_transcript,
+    shingles,
+)
+
+WORDS = "account balance payment schedule confirm verify address today amount due date bank".split()
+
+
+def transcript(seed, length=120):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def test_normalize_strips_timestamps_speakers_fillers_numbers_and_names():
+    text = "[00:01:02] Agent: Um, hi Jane Doe, your balance is 250 dollars\nCustomer: uh okay"
+    assert normalize_transcript(text, ["Jane Doe"]) == "hi name name your balance is # dollars okay"
+
+
+def test_transcripts_differing_in_noise_normalize_alike():
+    a = "00:01 Agent: Hello John, your payment of 120 is due\n00:05 Customer: um okay"
+    b = "[12:41] Rep - hello Maria, your payment of 95 is due\n[12:44] Caller: okay"
+    assert normalize_transcript(a, ["John"]) == normalize_transcript(b, ["Maria"])
+
+
+def test_shingles():
+    assert shingles("") == set()
+    assert len(shingles("one two three")) == 1
+    assert len(shingles("a b c d e f g")) == 3
+
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher()
+    base = set(range(1000))
+    overlap = set(range(200, 1200))  # Jaccard 800 / 1200
+    similarity = estimated_similarity(hasher.signature(base), hasher.signature(overlap))
+    assert similarity == pytest.approx(2 / 3, abs=0.12)
+    assert estimated_similarity(hasher.signature(base), hasher.signature(base)) == 1.0
+    assert estimated_similarity([], []) == 0.0
+
+
+def test_band_keys_are_stable_and_shared_by_identical_bands():
+    signature = list(range(128))
+    keys = band_keys(signature)
+    assert len(keys) == 16
+    assert keys == band_keys(list(signature))
+    changed = band_keys([*signature[:-1], -1])
+    assert keys[:-1] == changed[:-1]
+    assert keys[-1] != changed[-1]
+
+
+def detector(supabase):
+    return NearDuplicateDetector(supabase, "gemini-2.0-flash", "criteria", threshold=0.8)
+
+
+def test_sketch_skips_short_transcripts(supabase):
+    near_dup = detector(supabase)
+    assert near_dup.sketch("too short to compare") is None
+    assert near_dup.sketch(transcript(1))["shingle_count"] >= MIN_SHINGLES
+
+
+def test_find_matches_in_run_and_against_the_index(supabase):
+    near_dup = detector(supabase)
+    original = near_dup.sketch(transcript(1))
+    near_dup.index({"cached": original}, batch_size=10)
+    assert supabase.tables[INDEX_TABLE][0]["transcript_hash"] == "cached"
+
+    copy = transcript(1).replace("account", "acount", 1)
+    sketches = {
+        "retimed": near_dup.sketch("00:01 " + copy),
+        "other": near_dup.sketch(transcript(2)),
+        "other_again": near_dup.sketch(transcript(2)),
+    }
+    matches = near_dup.find_matches(sketches)
+
+    assert matches["retimed"]["match"] == "cached"
+    assert matches["retimed"]["in_run"] is False
+    assert "other" not in matches
+    assert matches["other_again"] == {"match": "other", "similarity": 1.0, "in_run": True}
+    assert near_dup.stats()["gemini_calls_saveable"] == 2
+
+
+def test_index_is_scoped_to_model_and_criteria(supabase):
+    detector(supabase).index({"cached": detector(supabase).sketch(transcript(1))}, batch_size=10)
+    other_criteria = NearDuplicateDetector(supabase, "gemini-2.0-flash", "new-criteria", threshold=0.8)
+    assert other_criteria.find_matches({"new": other_criteria.sketch(transcript(1))}) == {}
@@ -0,0 +1,155 @@
+import pytest
+
+from call_sync.prescorer import (
+    FULL_CALL_AGENT_WORDS,
+    UNLABELLED_PENALTY,
+    PhraseMatcher,
+    PreScorer,
+    agreement,
+    build_rules,
+    full_result,
+    merge_result,
+)
+
+
+@pytest.mark.parametrize(
+    "phrases, text, found",
+    [
+        (["verify", "date of birth"], "can you verify your date of birth", {"verify", "date of birth"}),
+        # Whole words only
+        (["verify"], "i am verifying that now", set()),
+        # Overlapping phrases, one inside another
+        (["are you currently employed", "currently employed"], "are you currently employed", {
+            "are you currently employed",
+            "currently employed",
+        }),
+        # A failed partial match falls back to the phrase it already started
+        (["a b c", "b d"], "a b d", {"b d"}),
+        (["a b c", "b c d"], "x a b c d", {"a b c", "b c d"}),
+        (["direct deposit"], "direct direct deposit", {"direct deposit"}),
+        ([], "anything at all", set()),
+    ],
+)
+def test_phrase_matcher(phrases, text, found):
+    assert PhraseMatcher(phrases).find(text.split()) == found
+
+
+def test_phrase_matcher_agrees_with_a_naive_scan():
+    phrases = ["a b", "b a b", "a a", "b b a", "a b a b"]
+    matcher = PhraseMatcher(phrases)
+    words = "a b a b b a a b".split()
+    naive = {p for p in phrases if f" {p} " in f" {' '.join(words)} "}
+    assert matcher.find(words) == naive
+
+
+def scorer(phrases, min_hits=1, prohibited=(), min_confidence=0.9):
+    criteria = [{"id": "X", "name": "X", "phrases": phrases, "min_hits": min_hits}]
+    sources = {"libraries": [{"category": "prohibited", "keywords": [{"phrase": p} for p in prohibited]}]}
+    return PreScorer(build_rules(criteria, sources), min_confidence)
+
+
+def call(agent, customer="okay sure", filler=0):
+    agent_turn = " ".join([agent, *["thanks"] * filler])
+    return f"Agent: {agent_turn}\nCustomer: {customer}"
+
+
+REQUIRED = [{"phrase": "verify", "required": True}, {"phrase": "date of birth"}, {"phrase": "last four"}]
+
+
+def test_required_phrases_said_pass_more_confidently_with_optional_ones():
+    prescorer = scorer(REQUIRED)
+    some = prescorer.decide(call("let me verify your date of birth"))["X"]
+    assert some["result"] == "PASS"
+    assert some["confidence"] == pytest.approx(0.95)
+    every = prescorer.decide(call("let me verify your date of birth and last four"))["X"]
+    assert every["confidence"] == pytest.approx(1.0)
+
+
+def test_min_hits_without_required_phrases():
+    prescorer = scorer([{"phrase": "employer"}, {"phrase": "payday"}, {"phrase": "income"}], min_hits=2)
+    assert prescorer.decide(call("who is your employer and when is payday"))["X"]["confidence"] == pytest.approx(0.9)
+    assert prescorer.decide(call("employer payday income"))["X"]["confidence"] == pytest.approx(0.95)
+
+    partial = prescorer.decide(call("who is your employer"))["X"]
+    assert partial["result"] == "PARTIAL"
+    assert prescorer.confident({"X": partial}) == {}
+
+
+def test_missing_script_fails_confidently_only_on_a_full_length_call():
+    prescorer = scorer(REQUIRED)
+    short = prescorer.decide(call("hello there", filler=FULL_CALL_AGENT_WORDS // 2 - 2))["X"]
+    assert short["result"] == "FAIL"
+    assert short["confidence"] == pytest.approx(0.475)
+    assert prescorer.confident({"X": short}) == {}
+
+    full = prescorer.decide(call("hello there", filler=FULL_CALL_AGENT_WORDS))["X"]
+    assert full["confidence"] == pytest.approx(0.95)
+    assert full["recommendation"] == "Say: verify"
+    assert prescorer.confident({"X": full}) == {"X": full}
+
+
+def test_required_phrase_missing_with_other_hits_is_left_to_gemini():
+    decision = scorer(REQUIRED).decide(call("what is your date of birth"))["X"]
+    assert decision["result"] == "PARTIAL"
+    assert decision["recommendation"] == "Say: verify"
+
+
+def test_only_agent_turns_count_when_speakers_are_labelled():
+    decision = scorer(REQUIRED).decide(call("hello", customer="i can verify my date of birth"))["X"]
+    assert decision["result"] != "PASS"
+
+
+def test_unlabelled_transcripts_are_less_confident():
+    decision = scorer(REQUIRED).decide("let me verify your date of birth")["X"]
+    assert decision["result"] == "PASS"
+    assert decision["confidence"] == pytest.approx(0.95 * UNLABELLED_PENALTY)
+
+
+def test_prohibited_language_leaves_the_call_to_gemini():
+    prescorer = scorer(REQUIRED, prohibited=["we will sue you"])
+    assert prescorer.decide(call("let me verify your date of birth or we will sue you")) == {}
+
+
+def test_build_rules_merges_sources_and_keeps_required_flags():
+    criteria = [
+        {"id": "VCI", "name": "Verify", "phrases": [{"phrase": "Date of Birth", "required": True}]},
+        {"id": "TONE", "name": "Tone"},
+    ]
+    sources = {
+        "scripts": [{"category": "verification", "required_phrases": [{"phrase": "Account Number"}]}],
+        "libraries": [
+            {"category": "prohibited", "keywords": [{"phrase": "Shut up"}, {"phrase": "you must", "weight": 0.5}]},
+        ],
+    }
+    rule_set = build_rules(criteria, sources)
+    assert list(rule_set["rules"]) == ["VCI"]
+    phrases = {e["phrase"]: e["required"] for e in rule_set["rules"]["VCI"]["phrases"]}
+    # Defaults, the criterion's own phrases and the script's, deduped
+    assert {"account number": False, "date of birth": True, "verify": True}.items() <= phrases.items()
+    assert rule_set["prohibited"] == ["shut up"]
+
+    changed = build_rules(criteria, {**sources, "scripts": []})
+    assert changed["fingerprint"] != rule_set["fingerprint"]
+    assert build_rules(criteria, sources)["fingerprint"] == rule_set["fingerprint"]
+
+
+def test_full_result_merge_and_agreement():
+    criteria = [
+        {"id": "A", "name": "Alpha", "dimension": "compliance"},
+        {"id": "B", "name": "Beta", "dimension": "communication"},
+    ]
+    decided = {
+        "A": {"id": "A", "result": "PASS", "score": 100, "recommendation": ""},
+        "B": {"id": "B", "result": "FAIL", "score": 0, "recommendation": "Say: hello"},
+    }
+    result = full_result(criteria, decided)
+    assert result["overall_score"] == 50
+    assert result["compliance_score"] == 100
+    assert result["communication_score"] == 0
+    assert result["tone_score"] == 50
+    assert result["strengths"] == ["Alpha"]
+    assert result["recommendations"] == ["Say: hello"]
+
+    gemini = {"overall_score": 70, "criteria": [{"id": "A", "result": "fail"}, {"id": "C", "result": "PASS"}]}
+    assert [c["id"] for c in merge_result(gemini, {"A": decided["A"]})["criteria"]] == ["C", "A"]
+    assert agreement(decided, gemini) == {"A": False}
@@ -0,0 +1,184 @@
+import pytest
+
+from call_sync.prompts import missing_criteria_prompt
+from call_sync.responses import (
+    SCORE_FIELDS,
+    extract_json,
+    parse_audit,
+    repair_json,
+    salvage_audit,
+    salvage_criteria,
+    salvage_scores,
+)
+
+FULL_SCORES = {field: 80 for field in SCORE_FIELDS}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('```json\n{"a": 1}\n```', '{"a": 1}'),
+        ('```\n[1, 2]\n```', "[1, 2]"),
+        ('Sure, here is the audit: {"a": 1}', '{"a": 1}'),
+        ('Result:\n[{"a": 1}]', '[{"a": 1}]'),
+        ("no json", "no json"),
+    ],
+)
+def test_extract_json(text, expected):
+    assert extract_json(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, value, repairs",
+    [
+        ('{"a": 1}', {"a": 1}, []),
+        ('```json\n{"a": 1}\n```', {"a": 1}, []),
+        ('Here you go: {"a": 1}', {"a": 1}, []),
+        ('{"a": [1, 2,], }', {"a": [1, 2]}, ["trailing_comma"]),
+        ('[{"a": 1} {"b": 2}]', [{"a": 1}, {"b": 2}], ["missing_comma"]),
+        ('{"a": [1] "b": 2}', {"a": [1], "b": 2}, ["missing_comma"]),
+        ('{"a": 1}}]', {"a": 1}, ["stray_closer"]),
+        ('{"a": [1, 2}', {"a": [1, 2]}, ["unclosed_bracket"]),
+        # Truncated inside a string: the partial value is dropped, not closed
+        ('{"a": 1, "b": "hel', {"a": 1}, ["dropped_partial_element", "truncated"]),
+        # Truncated inside a number: 12 might have been 120, so it goes too
+        ('{"a": 1, "b": 12', {"a": 1}, ["dropped_partial_element", "truncated"]),
+        # Truncated after a complete value: closed as-is
+        ('{"a": 1, "b": "x"', {"a": 1, "b": "x"}, ["truncated"]),
+        ('{"a": {"b": [1, 2]', {"a": {"b": [1, 2]}}, ["truncated"]),
+    ],
+)
+def test_repair_json(text, value, repairs):
+    assert repair_json(text) == (value, repairs)
+
+
+def test_repair_json_drops_a_criterion_cut_off_midway():
+    text = (
+        '{"overall_score": 80, "criteria": [{"id": "A", "result": "PASS"}, '
+        '{"id": "B", "result": "FAIL", "explanation": "Did not ver'
+    )
+    value, repairs = repair_json(text)
+    assert value == {"overall_score": 80, "criteria": [{"id": "A", "result": "PASS"}]}
+    assert "truncated" in repairs
+
+
+def test_repair_json_keeps_complete_elements_of_a_truncated_array():
+    value, repairs = repair_json('[{"call_id": "1", "overall_score": 70}, {"call_id": "2", "overall_')
+    assert value == [{"call_id": "1", "overall_score": 70}]
+    assert "truncated" in repairs
+
+
+@pytest.mark.parametrize("text", ["", "   ", "no json here", "```json\n```"])
+def test_repair_json_gives_up(text):
+    with pytest.raises(ValueError):
+        repair_json(text)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ({"overall_score": 80}, {"overall_score": 80}),
+        ({"overall_score": "75%"}, {"overall_score": 75.0}),
+        ({"overall_score": " 60 "}, {"overall_score": 60.0}),
+        ({"overall_score": 101}, {}),
+        ({"overall_score": -1}, {}),
+        ({"overall_score": True}, {}),
+        ({"overall_score": "high"}, {}),
+        ([], {}),
+    ],
+)
+def test_salvage_scores(value, expected):
+    assert salvage_scores(value, ["overall_score"]) == expected
+
+
+def test_salvage_criteria_normalizes_and_dedupes():
+    value = {
+        "criteria": [
+            {"id": " A ", "result": "passed", "score": "90"},
+            {"id": "A", "result": "FAIL"},
+            {"id": "B", "result": "not applicable"},
+            {"id": "C", "result": "MAYBE"},
+            {"id": "", "result": "PASS"},
+            "junk",
+        ]
+    }
+    assert salvage_criteria(value) == [
+        {"id": "A", "result": "PASS", "explanation": "", "recommendation": "", "score": 90.0},
+        {"id": "B", "result": "N/A", "explanation": "", "recommendation": ""},
+    ]
+    assert [c["id"] for c in salvage_criteria(value, ["B"])] == ["B"]
+
+
+def test_salvage_criteria_accepts_a_bare_array():
+    assert [c["id"] for c in salvage_criteria([{"id": "A", "result": "PASS"}])] == ["A"]
+
+
+def test_salvage_audit_complete():
+    value = {**FULL_SCORES, "summary": "ok", "strengths": ["x", ""], "criteria": [{"id": "A", "result": "PASS"}]}
+    salvaged = salvage_audit(value, ["A"])
+    assert salvaged["reason"] is None
+    assert salvaged["missing"] == []
+    assert salvaged["missing_scores"] == []
+    assert salvaged["result"]["strengths"] == ["x"]
+    assert salvaged["result"]["areas_for_improvement"] == []
+
+
+def test_salvage_audit_unwraps_a_single_element_array():
+    salvaged = salvage_audit([{**FULL_SCORES, "criteria": []}], ["A"])
+    assert salvaged["result"]["overall_score"] == 80
+    assert salvaged["missing"] == ["A"]
+
+
+def test_salvage_audit_lists_missing_dimension_scores():
+    salvaged = salvage_audit({"overall_score": 80, "tone_score": 70}, [])
+    assert salvaged["result"] is not None
+    assert salvaged["missing_scores"] == [f for f in SCORE_FIELDS if f not in ("overall_score", "tone_score")]
+
+
+@pytest.mark.parametrize(
+    "value, reason",
+    [
+        ("text", "not_an_object"),
+        ([{"overall_score": 1}, {"overall_score": 2}], "not_an_object"),
+        ({"communication_score": 80}, "no_overall_score"),
+        ({"overall_score": "n/a"}, "no_overall_score"),
+    ],
+)
+def test_salvage_audit_failures(value, reason):
+    salvaged = salvage_audit(value, ["A"])
+    assert salvaged["result"] is None
+    assert salvaged["reason"] == reason
+    assert salvaged["missing"] == ["A"]
+
+
+def test_parse_audit_truncated_before_overall_score():
+    parsed = parse_audit('{"summary": "The agent gree', ["A"])
+    assert parsed["result"] is None
+    assert parsed["reason"] == "truncated"
+
+
+def test_parse_audit_unparseable():
+    parsed = parse_audit("I can't help with that.", ["A"])
+    assert parsed["reason"] == "unparseable"
+    assert parsed["repairs"] == []
+
+
+def test_parse_audit_keeps_what_a_truncated_response_answered():
+    text = '{"overall_score": 80, "communication_score": "75%", "criteria": [{"id": "A", "result": "passed"}, {"id": "B'
+    parsed = parse_audit(text, ["A", "B"])
+    assert parsed["result"]["communication_score"] == 75.0
+    assert [c["id"] for c in parsed["result"]["criteria"]] == ["A"]
+    assert parsed["missing"] == ["B"]
+    assert "compliance_score" in parsed["missing_scores"]
+    assert "truncated" in parsed["repairs"]
+
+
+def test_missing_criteria_prompt_asks_only_for_what_is_missing():
+    prompt = missing_criteria_prompt("TRANSCRIPT BODY", ["A", "B"], ["tone_score"])
+    assert '"criteria": one element for each of A, B' in prompt
+    assert '"tone_score": 0-100' in prompt
+    assert "overall_score" not in prompt
+    assert prompt.endswith("TRANSCRIPT BODY")
+
+    scores_only = missing_criteria_prompt("T", [], ["tone_score"])
+    assert '"criteria"' not in scores_only
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from call_sync.checkpoints import DEFERRALS_KEY
+from call_sync.scheduling import (
+    SPEND_TABLE,
+    BudgetAdmission,
+    budget_limits,
+    call_priority,
+    cost_usd,
+    daily_budget_left,
+    estimate_cost,
+    priority_config,
+)
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def budget(run_tokens=0, daily_tokens=0, daily_usd=0.0):
+    return {
+        "run_tokens": run_tokens,
+        "daily_tokens": daily_tokens,
+        "daily_usd": daily_usd,
+        "input_usd_per_mtok": 0.10,
+        "output_usd_per_mtok": 0.40,
+    }
+
+
+def priorities(**overrides):
+    return priority_config({
+        "priority": {
+            "recency_half_life_hours": 24,
+            "campaign_weights": "{}",
+            "risk_dispositions": "dispute|attorney",
+            "risk_weight": 2,
+            "coaching_weight": 1.5,
+            "coaching_days": 14,
+            "agent_daily_target": 0,
+            **overrides,
+        }
+    })
+
+
+@pytest.mark.parametrize(
+    "settings, spent, expected",
+    [
+        (budget(), None, {}),
+        (budget(run_tokens=1000), None, {"tokens": 1000}),
+        (budget(run_tokens=1000, daily_tokens=5000), {"prompt_tokens": 4500, "output_tokens": 200}, {"tokens": 300}),
+        (budget(daily_tokens=5000), {"prompt_tokens": 6000, "output_tokens": 0}, {"tokens": 0}),
+        (budget(daily_usd=2.0), {"cost_usd": 0.5}, {"usd": 1.5}),
+    ],
+)
+def test_budget_limits(settings, spent, expected):
+    assert budget_limits({"budget": settings}, spent) == expected
+
+
+def test_cost_and_estimate():
+    assert cost_usd(1_000_000, 1_000_000, budget()) == pytest.approx(0.50)
+
+    config = {"budget": budget(), "transcripts": {"max_tokens": 6000}}
+    assert estimate_cost({"length_seconds": 100}, config)["tokens"] == pytest.approx(350 + 800)
+    # Long calls are capped at the transcript budget; unknown lengths count as half of it
+    assert estimate_cost({"length_seconds": 100_000}, config)["tokens"] == 6000 + 800
+    assert estimate_cost({"length_seconds": None}, config)["tokens"] == 3000 + 800
+
+
+def test_daily_budget_left(supabase):
+    config = {"budget": budget(daily_tokens=1000)}
+    assert daily_budget_left(supabase, config)
+
+    supabase.tables[SPEND_TABLE] = [
+        {"day": datetime.now(timezone.utc).date().isoformat(), "prompt_tokens": 900, "output_tokens": 100, "cost_usd": 0},
+    ]
+    assert not daily_budget_left(supabase, config)
+    assert daily_budget_left(supabase, {"budget": budget(run_tokens=10)})
+
+
+def test_recency_boost_halves_every_half_life():
+    fresh = call_priority({"call_timestamp": NOW.isoformat()}, priorities(), {}, now=NOW)
+    day_old = call_priority({"call_timestamp": (NOW - timedelta(hours=24)).isoformat()}, priorities(), {}, now=NOW)
+    undated = call_priority({}, priorities(), {}, now=NOW)
+    assert fresh == pytest.approx(2.0)
+    assert day_old == pytest.approx(1.5)
+    assert undated == 1.0
+
+
+def test_campaign_risk_coaching_and_deferral_weights():
+    settings = priorities(campaign_weights='{"Collections": 2}')
+    agents = {"agent@example.com": {"in_coaching": True}}
+    call = {"campaign": "Collections", "disposition": "Customer DISPUTE", "agent_email": "Agent@Example.com"}
+    assert call_priority(call, settings, agents, now=NOW) == pytest.approx(2 * 2 * 1.5)
+    assert call_priority({**call, DEFERRALS_KEY: 2}, settings, agents, now=NOW) == pytest.approx(2 * 2 * 1.5 * 2)
+
+
+def test_sampling_boosts_agents_below_their_daily_target():
+    settings = priorities(agent_daily_target=4)
+    call = {"agent_email": "a@example.com"}
+    assert call_priority(call, settings, {"a@example.com": {"audits_today": 0}}, now=NOW) == pytest.approx(2.0)
+    assert call_priority(call, settings, {"a@example.com": {"audits_today": 3}}, now=NOW) == pytest.approx(1.25)
+    assert call_priority(call, settings, {"a@example.com": {"audits_today": 4}}, now=NOW) == pytest.approx(0.5)
+
+
+def test_budget_admission_keeps_the_highest_priority_calls_that_fit():
+    admission = BudgetAdmission({"tokens": 250})
+    assert admission.offer({"id": "a"}, 1.0, {"tokens": 100}) == []
+    assert admission.offer({"id": "b"}, 3.0, {"tokens": 100}) == []
+    assert admission.offer({"id": "c"}, 2.0, {"tokens": 100}) == [{"id": "a"}]
+    # Offered and immediately pushed out again
+    assert admission.offer({"id": "d"}, 0.5, {"tokens": 100}) == [{"id": "d"}]
+    assert admission.admitted() == [{"id": "b"}, {"id": "c"}]
+    assert admission.totals == {"tokens": 200}
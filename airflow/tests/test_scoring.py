@@ -0,0 +1,186 @@
+import json
+
+import pytest
+
+from call_sync.compaction import fit_transcripts
+from call_sync.metrics import TaskMetrics
+from call_sync.prompts import read_batch_outcome, read_followup_outcome, read_single_outcome
+from call_sync.responses import FAILURE_REASONS, SCORE_FIELDS
+from call_sync.scoring import combine_outcomes, score_chunk, split_cache_hits, spread_result
+
+SCORES = {field: 80 for field in SCORE_FIELDS}
+
+
+def outcome(text=None, error=None, finish_reason="STOP", prompt_tokens=100, output_tokens=50):
+    return {
+        "text": text,
+        "error": error,
+        "attempts": 1,
+        "latency_s": 0.5,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "cached_tokens": 0,
+        "finish_reason": finish_reason,
+    }
+
+
+def audit(*criteria_ids, **overrides):
+    return {
+        **SCORES,
+        "summary": "ok",
+        "criteria": [{"id": c, "result": "PASS"} for c in criteria_ids],
+        **overrides,
+    }
+
+
+class FakeEngine:
+    """Answers each prompt with the next scripted response for it."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.prompts = []
+
+    def score_all(self, prompts):
+        self.prompts.extend(prompts)
+        return [self.respond(prompt) for prompt in prompts]
+
+
+def test_split_cache_hits_dedupes_pending_transcripts():
+    keyed = [(0, "h1", "k1"), (1, "h2", "k2"), (2, "h1", "k1"), (4, "h3", "k3")]
+    results, pending = split_cache_hits(keyed, {"k2": {"overall_score": 90}})
+    assert results == {1: {"overall_score": 90, "from_cache": True}}
+    assert pending == {"k1": ("h1", [0, 2]), "k3": ("h3", [4])}
+
+
+def test_spread_result_marks_duplicates_as_cache_hits():
+    spread = spread_result({"overall_score": 70}, [3, 5], outcome())
+    assert spread[3]["from_cache"] is False
+    assert spread[5]["from_cache"] is True
+    assert spread[3]["processing_time_ms"] == 500
+    assert spread[3]["prompt_tokens"] == 100
+
+    assert spread_result({"overall_score": 70}, [1]) == {
+        1: {"overall_score": 70, "from_cache": False, "processing_time_ms": 0}
+    }
+
+
+def test_combine_outcomes_adds_usage():
+    combined = combine_outcomes(outcome(), outcome(prompt_tokens=10, output_tokens=5))
+    assert combined["prompt_tokens"] == 110
+    assert combined["output_tokens"] == 55
+    assert combined["latency_s"] == 1.0
+
+
+def test_fit_transcripts_cuts_without_compaction():
+    fitted, totals = fit_transcripts({"a": "x" * 100}, max_tokens=10, compact=False)
+    assert fitted == {"a": "x" * 40}
+    assert totals["tokens_in"] == 25
+    assert totals["tokens_out"] == 10
+
+
+@pytest.mark.parametrize(
+    "result, reason, error",
+    [
+        (outcome(error="No response text: blocked"), "no_text", "No response text: blocked"),
+        (outcome(error="503 unavailable"), "request_error", "503 unavailable"),
+        (outcome(text="nope"), "unparseable", FAILURE_REASONS["unparseable"]),
+        (outcome(text='{"summary": "x"}', finish_reason="MAX_TOKENS"), "truncated", FAILURE_REASONS["truncated"]),
+    ],
+)
+def test_read_single_outcome_failures(result, reason, error):
+    parsed = read_single_outcome(result, ["A"])
+    assert parsed["result"] is None
+    assert parsed["reason"] == reason
+    assert parsed["error"] == error
+
+
+def test_read_batch_outcome_keeps_only_usable_elements():
+    text = json.dumps([
+        {"call_id": "1", **audit("A")},
+        {"call_id": "2", "summary": "no scores"},
+        {"call_id": "9", **audit("A")},
+    ])
+    answered = read_batch_outcome(outcome(text), ["k1", "k2"], {"k1": "1", "k2": "2"}, {"k1": ["A"], "k2": ["A"]})
+    assert list(answered) == ["k1"]
+    assert read_batch_outcome(outcome(error="boom"), ["k1"], {"k1": "1"}, {"k1": ["A"]}) == {}
+
+
+def test_read_followup_outcome():
+    text = json.dumps({"criteria": [{"id": "B", "result": "FAIL"}, {"id": "Z", "result": "PASS"}], "tone_score": 60})
+    criteria, scores = read_followup_outcome(outcome(text), ["B"], ["tone_score"])
+    assert [c["id"] for c in criteria] == ["B"]
+    assert scores == {"tone_score": 60.0}
+    assert read_followup_outcome(outcome(text="garbage"), ["B"], []) == ([], {})
+
+
+def chunk_inputs(keys, criteria=("A", "B")):
+    return {
+        "transcripts": {key: f"Agent: hello from {key}" for key in keys},
+        "call_ids": {key: key.upper() for key in keys},
+        "expected": {key: list(criteria) for key in keys},
+    }
+
+
+def test_score_chunk_follows_up_on_missing_criteria():
+    def respond(prompt):
+        if prompt.startswith("Return ONLY a JSON object with:"):
+            return outcome(json.dumps({"criteria": [{"id": "B", "result": "FAIL"}]}), prompt_tokens=10, output_tokens=5)
+        return outcome(json.dumps(audit("A")))
+
+    engine = FakeEngine(respond)
+    metrics = TaskMetrics("test")
+    scored = score_chunk(["k1"], decided={}, engine=engine, metrics=metrics, **chunk_inputs(["k1"]))
+
+    entry = scored["k1"]
+    assert entry["error"] is None
+    assert entry["complete"] is True
+    assert [c["id"] for c in entry["result"]["criteria"]] == ["A", "B"]
+    assert entry["outcome"]["prompt_tokens"] == 110
+    assert metrics.counters["parse.criteria_recovered"] == 1
+    assert metrics.counters["parse.followup_requests"] == 1
+
+
+def test_score_chunk_saves_but_flags_unresolved_criteria():
+    engine = FakeEngine(lambda prompt: outcome(json.dumps(audit("A"))))
+    scored = score_chunk(["k1"], decided={}, engine=engine, metrics=TaskMetrics("test"), **chunk_inputs(["k1"]))
+    assert scored["k1"]["result"] is not None
+    assert scored["k1"]["complete"] is False
+
+
+def test_score_chunk_fails_calls_still_missing_dimension_scores():
+    only_overall = {"overall_score": 80, "criteria": [{"id": "A", "result": "PASS"}, {"id": "B", "result": "PASS"}]}
+    engine = FakeEngine(lambda prompt: outcome(json.dumps(only_overall)))
+    scored = score_chunk(["k1"], decided={}, engine=engine, metrics=TaskMetrics("test"), **chunk_inputs(["k1"]))
+    assert scored["k1"]["result"] is None
+    assert scored["k1"]["reason"] == "missing_scores"
+    assert scored["k1"]["error"] == FAILURE_REASONS["missing_scores"]
+    assert len(engine.prompts) == 2
+
+
+def test_score_chunk_batches_and_falls_back_to_single_calls():
+    keys = ["k1", "k2", "k3"]
+
+    def respond_batch(prompt):
+        # The batch answers k1 and k2 but leaves k3 out
+        return outcome(json.dumps([{"call_id": "K1", **audit("A", "B")}, {"call_id": "K2", **audit("A", "B")}]))
+
+    batch_engine = FakeEngine(respond_batch)
+    engine = FakeEngine(lambda prompt: outcome(json.dumps(audit("A", "B"))))
+    metrics = TaskMetrics("test")
+    scored = score_chunk(
+        keys,
+        decided={"k2": {"B": {"result": "PASS"}}},
+        engine=engine,
+        metrics=metrics,
+        batch_engine=batch_engine,
+        batch_config={"batch_size": 4, "batch_token_budget": 10_000, "batch_max_transcript_tokens": 1_000},
+        **chunk_inputs(keys),
+    )
+
+    assert all(scored[key]["result"] is not None for key in keys)
+    assert len(batch_engine.prompts) == 1
+    assert "ALREADY SCORED" in batch_engine.prompts[0]
+    assert engine.prompts == ["TRANSCRIPT:\nAgent: hello from k3"]
+    # Batch calls are billed an equal share of the request
+    assert scored["k1"]["outcome"]["prompt_tokens"] == 33
+    assert metrics.counters["gemini.batch_fallbacks"] == 1
@@ -0,0 +1,96 @@
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from call_sync.staging import (
+    build_manifest,
+    cursor_pages,
+    iter_staged_batches,
+    iter_staged_rows,
+    prune_staging,
+    read_batch,
+    remove_run_dir,
+    run_staging_dir,
+    shard_manifest,
+    write_batch,
+)
+
+
+class PagedCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def fetchmany(self, size):
+        page, self.rows = self.rows[:size], self.rows[size:]
+        return page
+
+
+def test_run_staging_dir_is_filesystem_safe(tmp_path):
+    run_dir = run_staging_dir(str(tmp_path), "scheduled__2026-10-17T12:00:00+00:00")
+    assert run_dir == tmp_path / "scheduled__2026-10-17T12_00_00_00_00"
+    assert run_dir.is_dir()
+
+    partition = run_staging_dir(str(tmp_path), None, "2026-10-01/2026-10-02")
+    assert partition == tmp_path / "manual" / "2026-10-01_2026-10-02"
+
+
+def test_cursor_pages():
+    assert list(cursor_pages(PagedCursor(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_batches_round_trip_with_sql_server_types(tmp_path):
+    rows = [
+        {
+            "upload_timestamp": datetime(2026, 10, 17, 11, 30),
+            "call_date": date(2026, 10, 17),
+            "length_seconds": Decimal("61.5"),
+            "notes": b"caf\xc3\xa9",
+        }
+    ]
+    entry = write_batch(tmp_path, "fetch_00000", rows)
+    assert entry == {"path": str(tmp_path / "fetch_00000.jsonl.gz"), "rows": 1}
+    assert read_batch(entry) == [
+        {
+            "upload_timestamp": "2026-10-17T11:30:00",
+            "call_date": "2026-10-17",
+            "length_seconds": 61.5,
+            "notes": "café",
+        }
+    ]
+
+
+def test_write_batch_rejects_unknown_types(tmp_path):
+    with pytest.raises(TypeError):
+        write_batch(tmp_path, "bad", [{"value": object()}])
+
+
+def test_manifests_stream_every_row_in_order(tmp_path):
+    batches = [write_batch(tmp_path, f"b{i}", [{"n": i * 2}, {"n": i * 2 + 1}]) for i in range(3)]
+    manifest = build_manifest(tmp_path, batches, "fetch")
+    assert manifest["rows"] == 6
+    assert [row["n"] for row in iter_staged_rows(manifest)] == list(range(6))
+    assert len(list(iter_staged_batches(manifest))) == 3
+
+    shard = shard_manifest(tmp_path, batches[1])
+    assert shard["rows"] == 2
+    assert [row["n"] for row in iter_staged_rows(shard)] == [2, 3]
+
+
+def test_remove_and_prune_run_dirs(tmp_path):
+    current = run_staging_dir(str(tmp_path), "current")
+    stale = run_staging_dir(str(tmp_path), "stale")
+    old = time.time() - 3 * 3600
+    os.utime(stale, (old, old))
+
+    prune_staging(str(tmp_path), max_age_hours=2)
+    assert current.exists()
+    assert not stale.exists()
+
+    remove_run_dir(str(tmp_path), "current")
+    assert not current.exists()
+    # Missing roots and directories are fine
+    remove_run_dir(str(tmp_path), "current")
+    prune_staging(str(tmp_path / "missing"), max_age_hours=2)
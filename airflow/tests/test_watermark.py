@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+from call_sync.watermark import (
+    WATERMARK_TABLE,
+    advance_watermark,
+    build_sync_window,
+    later_watermark,
+    load_watermark,
+    max_watermark,
+    window_predicate,
+)
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def mark(upload_timestamp, recording_id="", reconciled_hours_ago=1):
+    return {
+        "source": "five9_call_recording_logs",
+        "upload_timestamp": upload_timestamp,
+        "recording_id": recording_id,
+        "last_reconciled_at": (NOW - timedelta(hours=reconciled_hours_ago)).isoformat(),
+    }
+
+
+def window(watermark):
+    return build_sync_window(watermark, lookback_hours=48, overlap_minutes=5, reconcile_interval_hours=24, now=NOW)
+
+
+def test_first_run_sweeps_the_full_lookback():
+    assert window(None) == {"mode": "reconcile", "lookback_hours": 48, "reason": "no watermark"}
+
+
+def test_never_reconciled_watermark_sweeps():
+    watermark = {**mark("2026-10-17T11:00:00"), "last_reconciled_at": None}
+    assert window(watermark)["reason"] == "never reconciled"
+
+
+def test_reconcile_interval_elapsed_sweeps():
+    assert window(mark("2026-10-17T11:00:00", reconciled_hours_ago=24))["reason"] == "interval elapsed"
+    assert window(mark("2026-10-17T11:00:00", reconciled_hours_ago=23))["mode"] == "incremental"
+
+
+def test_incremental_window_starts_at_the_watermark():
+    assert window(mark("2026-10-17T11:00:00", "1234")) == {
+        "mode": "incremental",
+        "since": "2026-10-17T11:00:00",
+        "after_recording_id": "1234",
+        "overlap_minutes": 5,
+    }
+
+
+def test_incremental_predicate_keys_on_timestamp_and_recording_id():
+    predicate, params = window_predicate(window(mark("2026-10-17T11:00:00", "1234")))
+    assert "DATEADD(MINUTE, -%(overlap_minutes)s, %(since)s)" in predicate
+    assert "upload_timestamp = %(since)s AND recording_id > %(after_recording_id)s" in predicate
+    assert params == {
+        "since": datetime(2026, 10, 17, 11, 0),
+        "after_recording_id": "1234",
+        "overlap_minutes": 5,
+    }
+
+
+def test_reconcile_and_range_predicates():
+    predicate, params = window_predicate(window(None))
+    assert "DATEADD(HOUR, -%(lookback_hours)s, GETDATE())" in predicate
+    assert params == {"lookback_hours": 48}
+
+    predicate, params = window_predicate({"mode": "range", "start": "2026-10-01T00:00:00", "end": "2026-10-02T00:00:00"})
+    assert predicate == "upload_timestamp >= %(start)s AND upload_timestamp < %(end)s"
+    assert params["end"] - params["start"] == timedelta(days=1)
+
+
+def test_max_watermark_breaks_timestamp_ties_on_numeric_recording_id():
+    ts = datetime(2026, 10, 17, 11, 0)
+    calls = [
+        {"upload_timestamp": ts, "recording_id": "9"},
+        {"upload_timestamp": ts, "recording_id": "10"},
+        {"upload_timestamp": ts - timedelta(minutes=1), "recording_id": "99"},
+        {"upload_timestamp": None, "recording_id": "100"},
+    ]
+    assert max_watermark(calls) == {"upload_timestamp": "2026-10-17T11:00:00", "recording_id": "10"}
+    assert max_watermark([{"upload_timestamp": None}]) is None
+
+
+def test_later_watermark():
+    a = {"upload_timestamp": "2026-10-17T11:00:00", "recording_id": "9"}
+    b = {"upload_timestamp": "2026-10-17T11:00:00", "recording_id": "10"}
+    assert later_watermark(a, b) is b
+    assert later_watermark(None, a) is a
+    assert later_watermark(a, None) is a
+
+
+def test_advance_watermark_waits_for_data(supabase):
+    assert advance_watermark(supabase, {"mode": "reconcile"}, None) is None
+    assert load_watermark(supabase) is None
+
+
+def test_advance_watermark_never_moves_backwards(supabase):
+    latest = {"upload_timestamp": "2026-10-17T11:00:00", "recording_id": "10"}
+    advance_watermark(supabase, {"mode": "incremental"}, latest)
+
+    # A late row with a smaller recording id at the same timestamp
+    advance_watermark(supabase, {"mode": "incremental"}, {**latest, "recording_id": "9"})
+    stored = load_watermark(supabase)
+    assert (stored["upload_timestamp"], stored["recording_id"]) == ("2026-10-17T11:00:00", "10")
+
+    advance_watermark(supabase, {"mode": "incremental"}, {**latest, "recording_id": "11"})
+    assert load_watermark(supabase)["recording_id"] == "11"
+    assert len(supabase.tables[WATERMARK_TABLE]) == 1
+
+
+def test_only_reconcile_runs_stamp_last_reconciled_at(supabase):
+    latest = {"upload_timestamp": "2026-10-17T11:00:00", "recording_id": "10"}
+    advance_watermark(supabase, {"mode": "incremental"}, latest)
+    assert "last_reconciled_at" not in load_watermark(supabase)
+
+    # A sweep with nothing new still records that it ran
+    advance_watermark(supabase, {"mode": "reconcile"}, None)
+    stored = load_watermark(supabase)
+    assert stored["last_reconciled_at"]
+    assert stored["recording_id"] == "10"
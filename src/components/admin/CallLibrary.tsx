@@ -65,7 +65,9 @@ interface Call {
   customer_name?: string;
   status: string;
   recording_url?: string;
-  transcript_text?: string;
+  // The transcript itself is in call_texts; load it with select('transcript')
+  has_transcript?: boolean;
+  transcript_length?: number;
   user_id: string;
   created_at: string;
   report_cards?: { id: string; overall_score: number; compliance_score: number }[];
@@ -129,6 +131,7 @@ export const CallLibrary = () => {
   const [tags, setTags] = useState<CallTag[]>([]);
   const [collections, setCollections] = useState<CallCollection[]>([]);
   const [searchTerm, setSearchTerm] = useState('');
+  const [transcriptMatches, setTranscriptMatches] = useState<Set<string>>(new Set());
   const [filterAgent, setFilterAgent] = useState<string>('all');
   const [filterDisposition, setFilterDisposition] = useState<string>('all');
   const [filterScore, setFilterScore] = useState<string>('all');
@@ -264,10 +267,37 @@ export const CallLibrary = () => {
     fetchData();
   }, [fetchData]);
 
+  // Transcripts aren't loaded with the list (they live in call_texts), so
+  // search them server-side once the user stops typing
+  useEffect(() => {
+    const query = searchTerm.trim();
+    if (query.length < 3) {
+      setTranscriptMatches(new Set());
+      return;
+    }
+
+    let cancelled = false;
+    const timeout = setTimeout(async () => {
+      const { data, error } = await supabase.rpc('search_call_transcripts', { query });
+      if (cancelled) return;
+      if (error) {
+        console.error('Transcript search error:', error);
+        setTranscriptMatches(new Set());
+        return;
+      }
+      setTranscriptMatches(new Set((data || []).map((row: { call_id: string }) => row.call_id)));
+    }, 300);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timeout);
+    };
+  }, [searchTerm]);
+
   // Process a single call with AI audit
   const processCall = async (callId: string) => {
     const call = calls.find(c => c.id === callId);
-    if (!call || !call.transcript_text) {
+    if (!call || !call.has_transcript) {
       toast({
         title: 'Cannot Process',
         description: 'Call has no transcript to audit',
@@ -372,7 +402,7 @@ export const CallLibrary = () => {
 
   // Process all pending calls
   const processPendingCalls = async () => {
-    const pending = calls.filter(c => c.status !== 'audited' && c.transcript_text);
+    const pending = calls.filter(c => c.status !== 'audited' && c.has_transcript);
     if (pending.length === 0) {
       toast({
         title: 'No Pending Calls',
@@ -555,7 +585,7 @@ export const CallLibrary = () => {
         call.customer_name?.toLowerCase().includes(search) ||
         call.disposition?.toLowerCase().includes(search) ||
         call.call_id?.toLowerCase().includes(search) ||
-        call.transcript_text?.toLowerCase().includes(search)
+        transcriptMatches.has(call.id)
       );
     }
 
@@ -1062,7 +1092,7 @@ export const CallLibrary = () => {
                 </div>
 
                 {/* Process Button - Show if call has transcript but no report card */}
-                {selectedCall.transcript_text && !selectedCall.report_cards?.[0] && (
+                {selectedCall.has_transcript && !selectedCall.report_cards?.[0] && (
                   <div className="pt-4 border-t border-[var(--color-border)]">
                     <Button
                       className="w-full bg-[var(--color-accent)] hover:bg-[var(--color-accent-hover)] text-white"
@@ -1186,14 +1216,19 @@ export const CallLibrary = () => {
                       Download
                     </Button>
                   )}
-                  {selectedCall.transcript_text && (
+                  {selectedCall.has_transcript && (
                     <Button
                       size="sm"
                       variant="outline"
-                      onClick={() => {
+                      onClick={async () => {
+                        const { data } = await supabase
+                          .from('calls')
+                          .select('transcript')
+                          .eq('id', selectedCall.id)
+                          .single();
                         toast({
                           title: 'Transcript',
-                          description: selectedCall.transcript_text?.substring(0, 200) + '...',
+                          description: (data?.transcript || '').substring(0, 200) + '...',
                         });
                       }}
                     >
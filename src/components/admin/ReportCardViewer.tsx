@@ -124,7 +124,7 @@ export const ReportCardViewer = ({
             customer_name,
             disposition,
             recording_url,
-            transcript_text
+            transcript_text:transcript
           )
         `);
 
@@ -153,7 +153,7 @@ export const Five9ConfigPage: React.FC = () => {
           title: 'Transcription Started',
           description: 'Call transcription has been queued',
         });
-      } else if (call.status === 'transcribed' && call.transcript_text) {
+      } else if (call.status === 'transcribed' && call.has_transcript) {
         // Trigger audit
         const { error: invokeError } = await supabase.functions.invoke('audit-call', {
           body: { callId: call.id },
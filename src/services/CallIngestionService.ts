@@ -274,7 +274,7 @@ class CallIngestionService {
       // Get call data
       const { data: call, error: callError } = await supabase
         .from("calls")
-        .select("*, profiles:user_id(id, full_name, email)")
+        .select("*, transcript, profiles:user_id(id, full_name, email)")
         .eq("id", callId)
         .single();
 
@@ -284,7 +284,7 @@ class CallIngestionService {
         return { success: false, error };
       }
 
-      if (!call.transcript_text) {
+      if (!call.transcript) {
         console.log("No transcript available for audit");
         return { success: false, error: 'No transcript available' };
       }
@@ -349,7 +349,7 @@ class CallIngestionService {
 
       // Perform audit using centralized service (has retries, validation, etc.)
       const auditResult = await performAudit(
-        call.transcript_text,
+        call.transcript,
         aiProvider,
         template?.criteria || this.getDefaultCriteria(),
         {
@@ -601,11 +601,11 @@ Provide accurate, constructive feedback focused on helping the agent improve.`;
     try {
       const { data: call } = await supabase
         .from("calls")
-        .select("*")
+        .select("*, transcript")
         .eq("id", callId)
         .single();
 
-      if (!call || !call.transcript_text) return;
+      if (!call || !call.transcript) return;
 
       // Get keywords library
       const { data: keywords } = await supabase
@@ -614,7 +614,7 @@ Provide accurate, constructive feedback focused on helping the agent improve.`;
         .eq("is_active", true);
 
       // Analyze the transcript
-      const analysis = this.analyzeTranscript(call.transcript_text, keywords || []);
+      const analysis = this.analyzeTranscript(call.transcript, keywords || []);
 
       // Store analysis
       await supabase.from("call_analytics").insert({
@@ -787,12 +787,11 @@ Provide accurate, constructive feedback focused on helping the agent improve.`;
       .from("calls")
       .select(`
         id,
-        transcript_text,
         status,
         report_cards(id)
       `)
       .in("status", ['transcribed', 'audit_failed'])
-      .not("transcript_text", "is", null)
+      .eq("has_transcript", true)
       .limit(batchSize);
 
     if (error) {
@@ -863,7 +862,7 @@ Provide accurate, constructive feedback focused on helping the agent improve.`;
       .from("calls")
       .select("id", { count: 'exact', head: true })
       .in("status", ['transcribed', 'audit_failed'])
-      .not("transcript_text", "is", null);
+      .eq("has_transcript", true);
 
     if (error) {
       console.error("Error counting pending calls:", error);
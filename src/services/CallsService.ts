@@ -10,7 +10,13 @@ export interface Call {
   call_end_time?: string;
   call_duration_seconds?: number;
   recording_url?: string;
+  // Write-only: the text is moved to call_texts on insert and reads back as NULL
   transcript_text?: string;
+  // Computed field over call_texts; only selected by CallsSelectById
+  transcript?: string | null;
+  transcript_hash?: string;
+  transcript_length?: number;
+  has_transcript?: boolean;
   transcript_url?: string;
   customer_phone?: string;
   customer_name?: string;
@@ -103,12 +109,13 @@ export const CallsUpdateStatus = async (
   return { call: data, error };
 };
 
-// Get call by ID
+// Get call by ID, with its transcript
 export const CallsSelectById = async (id: string) => {
   const { data, error } = await supabase
     .from("calls")
     .select(`
       *,
+      transcript,
       profiles:user_id (
         first_name,
         last_name,
@@ -109,11 +109,11 @@ serve(async (req) => {
     // Get call with transcript
     const { data: call, error: callError } = await supabase
       .from("calls")
-      .select("*")
+      .select("*, transcript")
       .eq("id", callId)
       .single();
 
-    if (callError || !call || !call.transcript_text) {
+    if (callError || !call || !call.transcript) {
       throw new Error("Call not found or missing transcript");
     }
 
@@ -136,7 +136,7 @@ serve(async (req) => {
       scriptTemplate = template;
     }
 
-    const transcript = call.transcript_text;
+    const transcript = call.transcript;
 
     // 1. Analyze keywords (no AI needed)
     const keywordResults = analyzeKeywords(transcript, keywordLibraries);
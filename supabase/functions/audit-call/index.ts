@@ -35,11 +35,11 @@ serve(async (req) => {
     // Get call with transcript
     const { data: call, error: callError } = await supabase
       .from("calls")
-      .select("*")
+      .select("*, transcript")
       .eq("id", callId)
       .single();
 
-    if (callError || !call || !call.transcript_text) {
+    if (callError || !call || !call.transcript) {
       throw new Error("Call not found or missing transcript");
     }
 
@@ -53,7 +53,7 @@ serve(async (req) => {
     const criteria = template?.criteria || [];
 
     // Build audit prompt
-    const prompt = buildAuditPrompt(call.transcript_text, criteria);
+    const prompt = buildAuditPrompt(call.transcript, criteria);
 
     // Call OpenAI for audit
     const startTime = Date.now();
@@ -1,8 +1,12 @@
 /**
  * Five9 Webhook Handler
  *
- * Receives call completion events from Five9 and stores them in the database.
- * Triggers automatic transcription and audit processing.
+ * Receives call completion events from Five9 and queues them in
+ * call_sync_events. The Airflow call_sync_events DAG drains the queue in
+ * micro-batches: it maps the agent, fetches the transcript and scores the call,
+ * invokes transcribe-call for recordings that arrive without a transcript and
+ * analyze-conversation once a call is scored.
+ * Redelivered events for a call that is already queued are ignored.
  *
  * Deploy: npx supabase functions deploy five9-webhook
  * URL: https://[project].supabase.co/functions/v1/five9-webhook
@@ -66,24 +70,15 @@ serve(async (req) => {
     // Parse Five9 webhook payload
     const payload: Five9CallEvent = await req.json();
 
-    console.log("Five9 webhook received:", payload.callId);
-
-    // Map Five9 agent to our user_id
-    // You can map by email, username, or external ID
-    const { data: profile, error: profileError } = await supabase
-      .from("profiles")
-      .select("id")
-      .eq("email", payload.agentEmail || payload.agentUsername)
-      .single();
-
-    if (profileError || !profile) {
-      console.error("Agent not found:", payload.agentEmail);
+    if (!payload.callId) {
       return new Response(
-        JSON.stringify({ error: "Agent not found in system" }),
-        { status: 404, headers: { ...corsHeaders, "Content-Type": "application/json" } }
+        JSON.stringify({ error: "callId is required" }),
+        { status: 400, headers: { ...corsHeaders, "Content-Type": "application/json" } }
       );
     }
 
+    console.log("Five9 webhook received:", payload.callId);
+
     // Calculate duration if not provided
     const duration =
       payload.callDuration ||
@@ -91,84 +86,30 @@ serve(async (req) => {
         (new Date(payload.callEndTime).getTime() - new Date(payload.callStartTime).getTime()) / 1000
       );
 
-    // Insert call record
-    const { data: call, error: insertError } = await supabase
-      .from("calls")
-      .insert({
-        user_id: profile.id,
-        call_id: payload.callId,
-        campaign_name: payload.campaignName,
-        call_type: payload.callType?.toLowerCase() || "inbound",
-        call_start_time: payload.callStartTime,
-        call_end_time: payload.callEndTime,
-        call_duration_seconds: duration,
-        recording_url: payload.recordingUrl,
-        transcript_text: payload.transcriptText,
-        transcript_url: payload.transcriptUrl,
-        customer_phone: payload.customerPhone || payload.ani,
-        customer_name: payload.customerName,
-        disposition: payload.disposition || payload.wrapUpCode,
-        status: payload.transcriptText ? "transcribed" : "pending",
-      })
-      .select()
-      .single();
-
-    if (insertError) {
-      console.error("Error inserting call:", insertError);
+    // Queue the event; agent mapping, transcription and scoring happen in Airflow
+    const { error: queueError } = await supabase
+      .from("call_sync_events")
+      .upsert(
+        { call_id: payload.callId, payload: { ...payload, callDuration: duration } },
+        { onConflict: "call_id", ignoreDuplicates: true }
+      );
+
+    if (queueError) {
+      console.error("Error queueing call event:", queueError);
       return new Response(
-        JSON.stringify({ error: "Failed to store call", details: insertError.message }),
+        JSON.stringify({ error: "Failed to queue call", details: queueError.message }),
         { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
       );
     }
 
-    console.log("Call stored successfully:", call.id);
-
-    // If we don't have a transcript yet, trigger transcription
-    if (!payload.transcriptText && payload.recordingUrl) {
-      console.log("Triggering transcription for call:", call.id);
-
-      // Invoke transcription edge function
-      const { error: transcribeError } = await supabase.functions.invoke("transcribe-call", {
-        body: { callId: call.id, recordingUrl: payload.recordingUrl },
-      });
-
-      if (transcribeError) {
-        console.error("Failed to trigger transcription:", transcribeError);
-      }
-    }
-
-    // If we have a transcript, trigger immediate audit and conversation analysis
-    if (payload.transcriptText) {
-      console.log("Triggering audit for call:", call.id);
-
-      const { error: auditError } = await supabase.functions.invoke("audit-call", {
-        body: { callId: call.id },
-      });
-
-      if (auditError) {
-        console.error("Failed to trigger audit:", auditError);
-      }
-
-      // Trigger conversation intelligence analysis
-      console.log("Triggering conversation analysis for call:", call.id);
-
-      const { error: analysisError } = await supabase.functions.invoke("analyze-conversation", {
-        body: { callId: call.id },
-      });
-
-      if (analysisError) {
-        console.error("Failed to trigger conversation analysis:", analysisError);
-      }
-    }
-
     return new Response(
       JSON.stringify({
         success: true,
-        callId: call.id,
-        status: call.status,
-        message: "Call received and processing initiated",
+        callId: payload.callId,
+        status: "queued",
+        message: "Call received and queued for processing",
       }),
-      { headers: { ...corsHeaders, "Content-Type": "application/json" } }
+      { status: 202, headers: { ...corsHeaders, "Content-Type": "application/json" } }
     );
   } catch (error) {
     console.error("Webhook error:", error);
@@ -36,7 +36,8 @@ interface AuditTemplate {
 interface CallToProcess {
   call_id: string;
   user_id: string;
-  transcript_text: string;
+  // Read from call_texts by get_calls_to_process; calls.transcript_text is always NULL
+  transcript_text: string | null;
   call_start_time: string;
   call_duration_seconds: number;
   campaign_name: string;
@@ -140,6 +141,10 @@ serve(async (req) => {
 
         console.log(`Processing call: ${call.call_id}`);
 
+        if (!call.transcript_text) {
+          throw new Error("Call has no transcript");
+        }
+
         // Run AI audit
         const auditResult = await runAIAudit(call.transcript_text, criteria, settings);
 
@@ -325,8 +330,9 @@ async function runConversationAnalysis(supabase: any, call: CallToProcess) {
       .select("*")
       .eq("is_active", true);
 
-    const transcript = call.transcript_text.toLowerCase();
-    const words = call.transcript_text.split(/\s+/);
+    const text = call.transcript_text || "";
+    const transcript = text.toLowerCase();
+    const words = text.split(/\s+/);
 
     // Keyword detection
     const keywordsFound: any[] = [];
@@ -0,0 +1,28 @@
+-- Call Sync Watermarks
+-- Persisted high-water mark for incremental Five9 extraction (Airflow call_sync_and_audit DAG)
+
+CREATE TABLE IF NOT EXISTS public.call_sync_watermarks (
+    source TEXT PRIMARY KEY,
+    -- Five9 upload_timestamp is server-local without a zone, so keep it naive
+    upload_timestamp TIMESTAMP NOT NULL,
+    recording_id TEXT NOT NULL DEFAULT '',
+    last_reconciled_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE public.call_sync_watermarks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view sync watermarks" ON public.call_sync_watermarks
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE profiles.id = auth.uid()
+            AND profiles.role IN ('admin', 'manager')
+        )
+    );
+
+CREATE POLICY "Service role full access sync_watermarks" ON public.call_sync_watermarks
+    FOR ALL USING (auth.role() = 'service_role');
+
+GRANT SELECT ON public.call_sync_watermarks TO authenticated;
+GRANT ALL ON public.call_sync_watermarks TO service_role;
@@ -0,0 +1,88 @@
+-- Save Report Cards Processing Time
+-- save_report_cards_batch also stores processing_time_ms, the Gemini scoring time per card.
+-- Changed from 20261017110000_save_report_cards_batch.sql: processing_time_ms is
+-- added to the insert column list, the select list and the record definition.
+-- Nothing else changed.
+
+CREATE OR REPLACE FUNCTION public.save_report_cards_batch(cards JSONB)
+RETURNS TABLE (report_card_id UUID, audited_call_id UUID)
+LANGUAGE sql
+SET search_path = ''
+AS $$
+    WITH inserted AS (
+        INSERT INTO public.report_cards (
+            user_id,
+            call_id,
+            source_file,
+            source_type,
+            overall_score,
+            communication_score,
+            compliance_score,
+            accuracy_score,
+            tone_score,
+            empathy_score,
+            resolution_score,
+            feedback,
+            strengths,
+            areas_for_improvement,
+            recommendations,
+            criteria_results,
+            ai_model,
+            ai_provider,
+            processing_time_ms
+        )
+        SELECT
+            r.user_id,
+            r.call_id,
+            r.source_file,
+            COALESCE(r.source_type, 'call'),
+            r.overall_score,
+            r.communication_score,
+            r.compliance_score,
+            r.accuracy_score,
+            r.tone_score,
+            r.empathy_score,
+            r.resolution_score,
+            r.feedback,
+            r.strengths,
+            r.areas_for_improvement,
+            r.recommendations,
+            r.criteria_results,
+            r.ai_model,
+            r.ai_provider,
+            r.processing_time_ms
+        FROM jsonb_to_recordset(cards) AS r(
+            user_id UUID,
+            call_id UUID,
+            source_file TEXT,
+            source_type TEXT,
+            overall_score NUMERIC,
+            communication_score NUMERIC,
+            compliance_score NUMERIC,
+            accuracy_score NUMERIC,
+            tone_score NUMERIC,
+            empathy_score NUMERIC,
+            resolution_score NUMERIC,
+            feedback TEXT,
+            strengths TEXT[],
+            areas_for_improvement TEXT[],
+            recommendations TEXT[],
+            criteria_results JSONB,
+            ai_model TEXT,
+            ai_provider TEXT,
+            processing_time_ms INTEGER
+        )
+        RETURNING id, call_id
+    ),
+    audited AS (
+        UPDATE public.calls c
+        SET status = 'audited', updated_at = NOW()
+        FROM inserted
+        WHERE c.id = inserted.call_id
+        RETURNING c.id
+    )
+    SELECT inserted.id, inserted.call_id FROM inserted;
+$$;
+
+REVOKE ALL ON FUNCTION public.save_report_cards_batch(JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.save_report_cards_batch(JSONB) TO service_role;
@@ -0,0 +1,27 @@
+-- Audit cache keys and hit counting
+-- transcript_hash now holds a key derived from the transcript hash, the AI model
+-- and a hash of the audit criteria, so changing either misses instead of serving
+-- stale results. The raw parts are kept alongside for inspection.
+
+ALTER TABLE public.audit_cache ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE public.audit_cache ADD COLUMN IF NOT EXISTS criteria_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS audit_cache_content_hash_idx ON public.audit_cache(content_hash);
+
+-- Batched hit-count increments from the Airflow call_sync_and_audit DAG
+-- hits: [{"transcript_hash": "...", "hits": 3}, ...]
+CREATE OR REPLACE FUNCTION public.increment_audit_cache_hits(hits JSONB)
+RETURNS TABLE (transcript_hash TEXT, hit_count INTEGER)
+LANGUAGE sql
+SET search_path = ''
+AS $$
+    UPDATE public.audit_cache c
+    SET hit_count = COALESCE(c.hit_count, 0) + h.hits,
+        last_accessed_at = NOW()
+    FROM jsonb_to_recordset(hits) AS h(transcript_hash TEXT, hits INTEGER)
+    WHERE c.transcript_hash = h.transcript_hash
+    RETURNING c.transcript_hash, c.hit_count;
+$$;
+
+REVOKE ALL ON FUNCTION public.increment_audit_cache_hits(JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.increment_audit_cache_hits(JSONB) TO service_role;
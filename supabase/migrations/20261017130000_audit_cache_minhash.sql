@@ -0,0 +1,23 @@
+-- Near-duplicate index for the audit cache
+-- MinHash signatures and LSH band keys for cached audits, written by the Airflow
+-- call_sync_and_audit DAG. A new transcript's candidates are the rows sharing
+-- any band key (array overlap on the GIN index) for the same model and criteria.
+
+CREATE TABLE IF NOT EXISTS public.audit_cache_minhash (
+    transcript_hash TEXT PRIMARY KEY REFERENCES public.audit_cache (transcript_hash) ON DELETE CASCADE,
+    ai_model TEXT NOT NULL,
+    criteria_hash TEXT NOT NULL,
+    bands TEXT[] NOT NULL,
+    signature BIGINT[] NOT NULL,
+    shingle_count INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS audit_cache_minhash_bands_idx ON public.audit_cache_minhash USING GIN (bands);
+CREATE INDEX IF NOT EXISTS audit_cache_minhash_model_criteria_idx ON public.audit_cache_minhash(ai_model, criteria_hash);
+
+ALTER TABLE public.audit_cache_minhash ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "System can manage audit cache minhash" ON public.audit_cache_minhash FOR ALL USING (true);
+
+GRANT ALL ON public.audit_cache_minhash TO service_role;
@@ -0,0 +1,9 @@
+-- Profiles updated_at
+-- Keeps profiles.updated_at current so the Airflow agent index can refresh incrementally
+
+DROP TRIGGER IF EXISTS update_profiles_updated_at ON profiles;
+CREATE TRIGGER update_profiles_updated_at
+    BEFORE UPDATE ON public.profiles
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE INDEX IF NOT EXISTS idx_profiles_updated_at ON public.profiles(updated_at);
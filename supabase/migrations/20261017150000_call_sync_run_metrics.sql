@@ -0,0 +1,13 @@
+-- Call Sync Run Metrics
+-- Ties call_sync_runs/call_sync_logs to Airflow DAG runs and stores per-stage metrics
+
+ALTER TABLE public.call_sync_runs
+    ADD COLUMN IF NOT EXISTS dag_run_id TEXT UNIQUE,
+    ADD COLUMN IF NOT EXISTS duration_ms INTEGER,
+    -- Per-task timings, counters and latency percentiles (see airflow/dags/call_sync/metrics.py)
+    ADD COLUMN IF NOT EXISTS metrics JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+ALTER TABLE public.call_sync_logs
+    ADD COLUMN IF NOT EXISTS dag_run_id TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_call_sync_logs_dag_run_id ON call_sync_logs(dag_run_id);
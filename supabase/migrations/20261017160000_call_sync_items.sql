@@ -0,0 +1,173 @@
+-- Call Sync Items
+-- Per-call progress checkpoints so retries and later runs of the call_sync_and_audit DAG resume unfinished calls
+-- save_report_cards_batch changed from 20261017113000_save_report_cards_processing_time.sql:
+-- - the insert joins calls and skips any call that is already audited
+-- - it calls mark_call_sync_items_saved (new, below) for the whole batch
+-- - it is plpgsql now, so the checkpoint step runs even when nothing new is inserted
+-- The insert columns and the calls update are unchanged.
+
+CREATE TABLE IF NOT EXISTS public.call_sync_items (
+    -- Five9 call id, same as calls.call_id
+    call_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL CHECK (state IN ('fetched', 'inserted', 'scored', 'saved')),
+    -- The call as it travels between tasks (see airflow/dags/call_sync/checkpoints.py)
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    dag_run_id TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Resume scan: unfinished items, oldest first
+CREATE INDEX IF NOT EXISTS idx_call_sync_items_unfinished
+    ON public.call_sync_items(updated_at)
+    WHERE state <> 'saved';
+
+ALTER TABLE public.call_sync_items ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view sync items" ON public.call_sync_items
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE profiles.id = auth.uid()
+            AND profiles.role IN ('admin', 'manager')
+        )
+    );
+
+CREATE POLICY "Service role full access sync_items" ON public.call_sync_items
+    FOR ALL USING (auth.role() = 'service_role');
+
+GRANT SELECT ON public.call_sync_items TO authenticated;
+GRANT ALL ON public.call_sync_items TO service_role;
+
+-- Calls left pending/transcribed before checkpoints existed resume from 'inserted'
+INSERT INTO public.call_sync_items (call_id, state, payload)
+SELECT
+    c.call_id,
+    'inserted',
+    jsonb_build_object(
+        'id', c.id,
+        'call_id', c.call_id,
+        'user_id', c.user_id,
+        'status', c.status,
+        'customer_name', c.customer_name,
+        'recording_link', c.recording_url,
+        'transcript_link', COALESCE(c.transcript_url, ''),
+        'summary_link', COALESCE(c.summary_url, '')
+    )
+FROM public.calls c
+WHERE c.status IN ('pending', 'transcribed')
+AND c.call_id IS NOT NULL
+ON CONFLICT (call_id) DO NOTHING;
+
+-- Mark the call_sync_items of a batch of report cards (JSON rows with
+-- call_id = calls.id) saved. Returns the number of items updated.
+CREATE OR REPLACE FUNCTION public.mark_call_sync_items_saved(cards JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+SET search_path = ''
+AS $$
+    WITH saved AS (
+        UPDATE public.call_sync_items i
+        SET state = 'saved', updated_at = NOW()
+        FROM jsonb_to_recordset(COALESCE(cards, '[]'::jsonb)) AS r(call_id UUID)
+        JOIN public.calls c ON c.id = r.call_id
+        WHERE i.call_id = c.call_id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM saved;
+$$;
+
+-- Report cards are saved once per call, and their items marked saved in the same transaction
+CREATE OR REPLACE FUNCTION public.save_report_cards_batch(cards JSONB)
+RETURNS TABLE (report_card_id UUID, audited_call_id UUID)
+LANGUAGE plpgsql
+SET search_path = ''
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH inserted AS (
+        INSERT INTO public.report_cards (
+            user_id,
+            call_id,
+            source_file,
+            source_type,
+            overall_score,
+            communication_score,
+            compliance_score,
+            accuracy_score,
+            tone_score,
+            empathy_score,
+            resolution_score,
+            feedback,
+            strengths,
+            areas_for_improvement,
+            recommendations,
+            criteria_results,
+            ai_model,
+            ai_provider,
+            processing_time_ms
+        )
+        SELECT
+            r.user_id,
+            r.call_id,
+            r.source_file,
+            COALESCE(r.source_type, 'call'),
+            r.overall_score,
+            r.communication_score,
+            r.compliance_score,
+            r.accuracy_score,
+            r.tone_score,
+            r.empathy_score,
+            r.resolution_score,
+            r.feedback,
+            r.strengths,
+            r.areas_for_improvement,
+            r.recommendations,
+            r.criteria_results,
+            r.ai_model,
+            r.ai_provider,
+            r.processing_time_ms
+        FROM jsonb_to_recordset(cards) AS r(
+            user_id UUID,
+            call_id UUID,
+            source_file TEXT,
+            source_type TEXT,
+            overall_score NUMERIC,
+            communication_score NUMERIC,
+            compliance_score NUMERIC,
+            accuracy_score NUMERIC,
+            tone_score NUMERIC,
+            empathy_score NUMERIC,
+            resolution_score NUMERIC,
+            feedback TEXT,
+            strengths TEXT[],
+            areas_for_improvement TEXT[],
+            recommendations TEXT[],
+            criteria_results JSONB,
+            ai_model TEXT,
+            ai_provider TEXT,
+            processing_time_ms INTEGER
+        )
+        -- A retried save must not duplicate cards for calls it already audited
+        JOIN public.calls c ON c.id = r.call_id AND c.status IS DISTINCT FROM 'audited'
+        RETURNING id, call_id
+    ),
+    audited AS (
+        UPDATE public.calls c
+        SET status = 'audited', updated_at = NOW()
+        FROM inserted
+        WHERE c.id = inserted.call_id
+        RETURNING c.id
+    )
+    SELECT inserted.id, inserted.call_id FROM inserted;
+
+    -- Every call in the batch is audited now, whether by this call or an earlier one
+    PERFORM public.mark_call_sync_items_saved(cards);
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.save_report_cards_batch(JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.save_report_cards_batch(JSONB) TO service_role;
+REVOKE ALL ON FUNCTION public.mark_call_sync_items_saved(JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.mark_call_sync_items_saved(JSONB) TO service_role;
@@ -0,0 +1,37 @@
+-- Call Sync Backfill Partitions
+-- Progress ledger for the call_sync_backfill DAG so re-triggering a date range only reruns unfinished partitions
+
+CREATE TABLE IF NOT EXISTS public.call_sync_backfill_partitions (
+    -- e.g. 20261001T0000-hour (see airflow/dags/call_sync/backfill.py)
+    partition_key TEXT PRIMARY KEY,
+    -- Five9 upload_timestamp range [partition_start, partition_end), server local time
+    partition_start TIMESTAMP NOT NULL,
+    partition_end TIMESTAMP NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'done', 'failed')),
+    calls INTEGER NOT NULL DEFAULT 0,
+    saved INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    dag_run_id TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_call_sync_backfill_partitions_start
+    ON public.call_sync_backfill_partitions(partition_start);
+
+ALTER TABLE public.call_sync_backfill_partitions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view backfill partitions" ON public.call_sync_backfill_partitions
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE profiles.id = auth.uid()
+            AND profiles.role IN ('admin', 'manager')
+        )
+    );
+
+CREATE POLICY "Service role full access backfill_partitions" ON public.call_sync_backfill_partitions
+    FOR ALL USING (auth.role() = 'service_role');
+
+GRANT SELECT ON public.call_sync_backfill_partitions TO authenticated;
+GRANT ALL ON public.call_sync_backfill_partitions TO service_role;
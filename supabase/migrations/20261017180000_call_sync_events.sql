@@ -0,0 +1,123 @@
+-- Call Sync Events
+-- Durable queue of five9-webhook recording events, drained in micro-batches by the call_sync_events DAG
+
+CREATE TABLE IF NOT EXISTS public.call_sync_events (
+    id BIGSERIAL PRIMARY KEY,
+    -- Five9 call id; a redelivered webhook for the same call is ignored
+    call_id TEXT NOT NULL UNIQUE,
+    -- The webhook body as received (see airflow/dags/call_sync/events.py)
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'claimed', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    dag_run_id TEXT,
+    received_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ
+);
+
+-- Claim scan: open events, oldest first
+CREATE INDEX IF NOT EXISTS idx_call_sync_events_open
+    ON public.call_sync_events(received_at)
+    WHERE status IN ('queued', 'claimed');
+
+ALTER TABLE public.call_sync_events ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view call sync events" ON public.call_sync_events
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE profiles.id = auth.uid()
+            AND profiles.role IN ('admin', 'manager')
+        )
+    );
+
+CREATE POLICY "Service role full access call_sync_events" ON public.call_sync_events
+    FOR ALL USING (auth.role() = 'service_role');
+
+GRANT SELECT ON public.call_sync_events TO authenticated;
+GRANT ALL ON public.call_sync_events TO service_role;
+
+-- Claimable events: queued, or claimed by a run whose lease has run out
+CREATE OR REPLACE FUNCTION public.call_sync_event_backlog(lease_seconds INTEGER, max_attempts INTEGER)
+RETURNS TABLE (ready BIGINT, oldest_received_at TIMESTAMPTZ)
+LANGUAGE sql
+STABLE
+SET search_path = ''
+AS $$
+    SELECT COUNT(*), MIN(e.received_at)
+    FROM public.call_sync_events e
+    WHERE e.attempts < max_attempts
+    AND (
+        e.status = 'queued'
+        OR (e.status = 'claimed' AND e.claimed_at < NOW() - make_interval(secs => lease_seconds))
+    );
+$$;
+
+-- Lease up to max_events claimable events to a DAG run, oldest first. Concurrent
+-- claims skip each other's rows; expired claims out of attempts are failed instead.
+CREATE OR REPLACE FUNCTION public.claim_call_sync_events(
+    max_events INTEGER,
+    run_id TEXT,
+    lease_seconds INTEGER,
+    max_attempts INTEGER
+)
+RETURNS TABLE (id BIGINT, call_id TEXT, payload JSONB, attempts INTEGER, received_at TIMESTAMPTZ)
+LANGUAGE sql
+SET search_path = ''
+AS $$
+    UPDATE public.call_sync_events e
+    SET status = 'failed', completed_at = NOW()
+    WHERE e.status = 'claimed'
+    AND e.attempts >= max_attempts
+    AND e.claimed_at < NOW() - make_interval(secs => lease_seconds);
+
+    WITH next AS (
+        SELECT e.id
+        FROM public.call_sync_events e
+        WHERE e.attempts < max_attempts
+        AND (
+            e.status = 'queued'
+            OR (e.status = 'claimed' AND e.claimed_at < NOW() - make_interval(secs => lease_seconds))
+        )
+        ORDER BY e.received_at
+        LIMIT max_events
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE public.call_sync_events e
+    SET status = 'claimed',
+        attempts = e.attempts + 1,
+        dag_run_id = run_id,
+        claimed_at = NOW()
+    FROM next
+    WHERE e.id = next.id
+    RETURNING e.id, e.call_id, e.payload, e.attempts, e.received_at;
+$$;
+
+-- Mark a run's events done: the ones it skipped as unscorable, and the ones whose
+-- call now has a checkpoint or a calls row. Returns how many were acknowledged.
+CREATE OR REPLACE FUNCTION public.ack_call_sync_events(run_id TEXT, skipped TEXT[])
+RETURNS INTEGER
+LANGUAGE sql
+SET search_path = ''
+AS $$
+    WITH acked AS (
+        UPDATE public.call_sync_events e
+        SET status = 'done', completed_at = NOW()
+        WHERE e.dag_run_id = run_id
+        AND e.status = 'claimed'
+        AND (
+            e.call_id = ANY(skipped)
+            OR EXISTS (SELECT 1 FROM public.call_sync_items i WHERE i.call_id = e.call_id)
+            OR EXISTS (SELECT 1 FROM public.calls c WHERE c.call_id = e.call_id)
+        )
+        RETURNING e.id
+    )
+    SELECT COUNT(*)::INTEGER FROM acked;
+$$;
+
+REVOKE ALL ON FUNCTION public.call_sync_event_backlog(INTEGER, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.call_sync_event_backlog(INTEGER, INTEGER) TO service_role;
+REVOKE ALL ON FUNCTION public.claim_call_sync_events(INTEGER, TEXT, INTEGER, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.claim_call_sync_events(INTEGER, TEXT, INTEGER, INTEGER) TO service_role;
+REVOKE ALL ON FUNCTION public.ack_call_sync_events(TEXT, TEXT[]) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.ack_call_sync_events(TEXT, TEXT[]) TO service_role;
@@ -0,0 +1,92 @@
+-- Scoring Budget
+-- Call priorities for the resume scan, a daily Gemini spend ledger, and the agent context the call_sync DAG prioritizes by
+
+ALTER TABLE public.call_sync_items
+    ADD COLUMN IF NOT EXISTS priority REAL NOT NULL DEFAULT 0;
+
+-- Resume scan: unfinished items, highest priority and then oldest first
+CREATE INDEX IF NOT EXISTS idx_call_sync_items_priority
+    ON public.call_sync_items(priority DESC, updated_at)
+    WHERE state <> 'saved';
+
+CREATE TABLE IF NOT EXISTS public.gemini_daily_spend (
+    -- UTC day
+    day DATE PRIMARY KEY,
+    prompt_tokens BIGINT NOT NULL DEFAULT 0,
+    output_tokens BIGINT NOT NULL DEFAULT 0,
+    -- From GEMINI_INPUT_USD_PER_MTOK / GEMINI_OUTPUT_USD_PER_MTOK at the time of the request
+    cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+    calls INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE public.gemini_daily_spend ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view Gemini spend" ON public.gemini_daily_spend
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE profiles.id = auth.uid()
+            AND profiles.role IN ('admin', 'manager')
+        )
+    );
+
+CREATE POLICY "Service role full access gemini_daily_spend" ON public.gemini_daily_spend
+    FOR ALL USING (auth.role() = 'service_role');
+
+GRANT SELECT ON public.gemini_daily_spend TO authenticated;
+GRANT ALL ON public.gemini_daily_spend TO service_role;
+
+-- Add one scoring chunk's usage to a day; concurrent shards increment the same row
+CREATE OR REPLACE FUNCTION public.record_gemini_spend(
+    spend_day DATE,
+    prompt_tokens BIGINT,
+    output_tokens BIGINT,
+    cost_usd NUMERIC,
+    calls INTEGER
+)
+RETURNS VOID
+LANGUAGE sql
+SET search_path = ''
+AS $$
+    INSERT INTO public.gemini_daily_spend AS s (day, prompt_tokens, output_tokens, cost_usd, calls)
+    VALUES (spend_day, prompt_tokens, output_tokens, cost_usd, calls)
+    ON CONFLICT (day) DO UPDATE
+    SET prompt_tokens = s.prompt_tokens + EXCLUDED.prompt_tokens,
+        output_tokens = s.output_tokens + EXCLUDED.output_tokens,
+        cost_usd = s.cost_usd + EXCLUDED.cost_usd,
+        calls = s.calls + EXCLUDED.calls,
+        updated_at = NOW();
+$$;
+
+-- Per agent: report cards created today (UTC) and whether they have an open
+-- coaching session or one completed in the last coaching_days days
+CREATE OR REPLACE FUNCTION public.scoring_priority_context(coaching_days INTEGER)
+RETURNS TABLE (email TEXT, audits_today INTEGER, in_coaching BOOLEAN)
+LANGUAGE sql
+STABLE
+SET search_path = ''
+AS $$
+    WITH audits AS (
+        SELECT r.user_id, COUNT(*)::INTEGER AS audits_today
+        FROM public.report_cards r
+        WHERE r.created_at >= date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+        GROUP BY r.user_id
+    ),
+    coaching AS (
+        SELECT DISTINCT c.agent_id
+        FROM public.coaching_sessions c
+        WHERE c.status IN ('scheduled', 'in_progress')
+        OR (c.status = 'completed' AND c.completed_at >= NOW() - make_interval(days => coaching_days))
+    )
+    SELECT p.email, COALESCE(a.audits_today, 0), co.agent_id IS NOT NULL
+    FROM public.profiles p
+    LEFT JOIN audits a ON a.user_id = p.id
+    LEFT JOIN coaching co ON co.agent_id = p.id
+    WHERE a.user_id IS NOT NULL OR co.agent_id IS NOT NULL;
+$$;
+
+REVOKE ALL ON FUNCTION public.record_gemini_spend(DATE, BIGINT, BIGINT, NUMERIC, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.record_gemini_spend(DATE, BIGINT, BIGINT, NUMERIC, INTEGER) TO service_role;
+REVOKE ALL ON FUNCTION public.scoring_priority_context(INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.scoring_priority_context(INTEGER) TO service_role;
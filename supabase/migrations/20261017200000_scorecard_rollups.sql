@@ -0,0 +1,360 @@
+-- Scorecard Rollups
+-- Per-agent and per-team score and criterion totals by day, week and pay period, kept up to date as report cards are saved
+-- save_report_cards_batch changed from 20261017160000_call_sync_items.sql:
+-- - the insert also returns user_id, created_at, the score columns and criteria_results
+-- - the new cards are passed to apply_scorecard_rollups (new, below)
+-- The insert columns, the calls update and mark_call_sync_items_saved are unchanged.
+
+CREATE TABLE IF NOT EXISTS public.scorecard_rollups (
+    -- 'agent' (scope_key = profiles.id) or 'team' (scope_key = profiles.team)
+    scope TEXT NOT NULL CHECK (scope IN ('agent', 'team')),
+    scope_key TEXT NOT NULL,
+    period TEXT NOT NULL CHECK (period IN ('day', 'week', 'pay_period')),
+    -- UTC day, Monday of the week, or pay_periods.start_date
+    period_start DATE NOT NULL,
+    -- overall, communication, compliance, accuracy, tone, empathy, resolution
+    dimension TEXT NOT NULL,
+    -- Cards with a score for this dimension; mean = total / n,
+    -- variance = (total_sq - total * total / n) / (n - 1)
+    n INTEGER NOT NULL DEFAULT 0,
+    total NUMERIC NOT NULL DEFAULT 0,
+    total_sq NUMERIC NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (scope, scope_key, period, period_start, dimension)
+);
+
+CREATE TABLE IF NOT EXISTS public.scorecard_criteria_rollups (
+    scope TEXT NOT NULL CHECK (scope IN ('agent', 'team')),
+    scope_key TEXT NOT NULL,
+    period TEXT NOT NULL CHECK (period IN ('day', 'week', 'pay_period')),
+    period_start DATE NOT NULL,
+    -- criteria_results[].id, e.g. QQ or VCI
+    criterion_id TEXT NOT NULL,
+    passed INTEGER NOT NULL DEFAULT 0,
+    partial INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    not_applicable INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (scope, scope_key, period, period_start, criterion_id)
+);
+
+-- Team comparisons: every team for one period
+CREATE INDEX IF NOT EXISTS idx_scorecard_rollups_period
+    ON public.scorecard_rollups(period, period_start, scope);
+
+CREATE INDEX IF NOT EXISTS idx_scorecard_criteria_rollups_period
+    ON public.scorecard_criteria_rollups(period, period_start, scope);
+
+ALTER TABLE public.scorecard_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.scorecard_criteria_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view scorecard rollups" ON public.scorecard_rollups
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE profiles.id = auth.uid()
+            AND profiles.role IN ('admin', 'manager')
+        )
+    );
+
+CREATE POLICY "Agents can view own scorecard rollups" ON public.scorecard_rollups
+    FOR SELECT USING (scope = 'agent' AND scope_key = auth.uid()::text);
+
+CREATE POLICY "Service role full access scorecard_rollups" ON public.scorecard_rollups
+    FOR ALL USING (auth.role() = 'service_role');
+
+CREATE POLICY "Admins can view scorecard criteria rollups" ON public.scorecard_criteria_rollups
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE profiles.id = auth.uid()
+            AND profiles.role IN ('admin', 'manager')
+        )
+    );
+
+CREATE POLICY "Agents can view own scorecard criteria rollups" ON public.scorecard_criteria_rollups
+    FOR SELECT USING (scope = 'agent' AND scope_key = auth.uid()::text);
+
+CREATE POLICY "Service role full access scorecard_criteria_rollups" ON public.scorecard_criteria_rollups
+    FOR ALL USING (auth.role() = 'service_role');
+
+GRANT SELECT ON public.scorecard_rollups TO authenticated;
+GRANT ALL ON public.scorecard_rollups TO service_role;
+GRANT SELECT ON public.scorecard_criteria_rollups TO authenticated;
+GRANT ALL ON public.scorecard_criteria_rollups TO service_role;
+
+-- Add a set of report cards (JSON rows with user_id, created_at, the score
+-- columns and criteria_results) to the rollups of the given periods. Cards are
+-- grouped first, so each rollup row gets one upsert per call. The team is the
+-- agent's team when the card is added.
+CREATE OR REPLACE FUNCTION public.apply_scorecard_rollups(
+    cards JSONB,
+    periods TEXT[] DEFAULT ARRAY['day', 'week', 'pay_period']
+)
+RETURNS INTEGER
+LANGUAGE sql
+SET search_path = ''
+AS $$
+    WITH card AS (
+        SELECT c.*, p.team, (c.created_at AT TIME ZONE 'UTC')::date AS day
+        FROM jsonb_to_recordset(COALESCE(cards, '[]'::jsonb)) AS c(
+            user_id UUID,
+            created_at TIMESTAMPTZ,
+            overall_score NUMERIC,
+            communication_score NUMERIC,
+            compliance_score NUMERIC,
+            accuracy_score NUMERIC,
+            tone_score NUMERIC,
+            empathy_score NUMERIC,
+            resolution_score NUMERIC,
+            criteria_results JSONB
+        )
+        LEFT JOIN public.profiles p ON p.id = c.user_id
+    ),
+    -- One row per card, scope and period it counts toward
+    bucket AS (
+        SELECT c.*, s.scope, s.scope_key, g.period, g.period_start
+        FROM card c
+        CROSS JOIN LATERAL (VALUES ('agent', c.user_id::text), ('team', NULLIF(c.team, ''))) AS s(scope, scope_key)
+        CROSS JOIN LATERAL (VALUES
+            ('day', c.day),
+            ('week', date_trunc('week', c.day)::date),
+            ('pay_period', (
+                SELECT pp.start_date
+                FROM public.pay_periods pp
+                WHERE c.day BETWEEN pp.start_date AND pp.end_date
+                ORDER BY pp.start_date DESC
+                LIMIT 1
+            ))
+        ) AS g(period, period_start)
+        WHERE s.scope_key IS NOT NULL
+        AND g.period_start IS NOT NULL
+        AND g.period = ANY(periods)
+    ),
+    scores AS (
+        INSERT INTO public.scorecard_rollups AS r (scope, scope_key, period, period_start, dimension, n, total, total_sq)
+        SELECT b.scope, b.scope_key, b.period, b.period_start, d.dimension, COUNT(*), SUM(d.score), SUM(d.score * d.score)
+        FROM bucket b
+        CROSS JOIN LATERAL (VALUES
+            ('overall', b.overall_score),
+            ('communication', b.communication_score),
+            ('compliance', b.compliance_score),
+            ('accuracy', b.accuracy_score),
+            ('tone', b.tone_score),
+            ('empathy', b.empathy_score),
+            ('resolution', b.resolution_score)
+        ) AS d(dimension, score)
+        WHERE d.score IS NOT NULL
+        GROUP BY b.scope, b.scope_key, b.period, b.period_start, d.dimension
+        ON CONFLICT (scope, scope_key, period, period_start, dimension) DO UPDATE
+        SET n = r.n + EXCLUDED.n,
+            total = r.total + EXCLUDED.total,
+            total_sq = r.total_sq + EXCLUDED.total_sq,
+            updated_at = NOW()
+        RETURNING 1
+    ),
+    criteria AS (
+        INSERT INTO public.scorecard_criteria_rollups AS r (
+            scope, scope_key, period, period_start, criterion_id, passed, partial, failed, not_applicable
+        )
+        SELECT
+            b.scope,
+            b.scope_key,
+            b.period,
+            b.period_start,
+            cr.value->>'id',
+            COUNT(*) FILTER (WHERE upper(cr.value->>'result') = 'PASS'),
+            COUNT(*) FILTER (WHERE upper(cr.value->>'result') = 'PARTIAL'),
+            COUNT(*) FILTER (WHERE upper(cr.value->>'result') = 'FAIL'),
+            COUNT(*) FILTER (WHERE upper(COALESCE(cr.value->>'result', '')) NOT IN ('PASS', 'PARTIAL', 'FAIL'))
+        FROM bucket b
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(b.criteria_results) = 'array' THEN b.criteria_results ELSE '[]'::jsonb END
+        ) AS cr(value)
+        WHERE cr.value->>'id' IS NOT NULL
+        GROUP BY b.scope, b.scope_key, b.period, b.period_start, cr.value->>'id'
+        ON CONFLICT (scope, scope_key, period, period_start, criterion_id) DO UPDATE
+        SET passed = r.passed + EXCLUDED.passed,
+            partial = r.partial + EXCLUDED.partial,
+            failed = r.failed + EXCLUDED.failed,
+            not_applicable = r.not_applicable + EXCLUDED.not_applicable,
+            updated_at = NOW()
+        RETURNING 1
+    )
+    SELECT ((SELECT COUNT(*) FROM scores) + (SELECT COUNT(*) FROM criteria))::INTEGER;
+$$;
+
+-- Recompute every rollup period that overlaps [from_day, to_day) from
+-- report_cards. Whole periods are replaced, so overlapping or repeated
+-- rebuilds give the same totals. Saves wait while a rebuild holds the lock.
+CREATE OR REPLACE FUNCTION public.rebuild_scorecard_rollups(from_day DATE, to_day DATE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SET search_path = ''
+AS $$
+DECLARE
+    grain TEXT;
+    lo DATE;
+    hi DATE;
+    written INTEGER := 0;
+BEGIN
+    LOCK TABLE public.scorecard_rollups, public.scorecard_criteria_rollups IN SHARE ROW EXCLUSIVE MODE;
+
+    FOREACH grain IN ARRAY ARRAY['day', 'week', 'pay_period'] LOOP
+        IF grain = 'day' THEN
+            lo := from_day;
+            hi := to_day;
+        ELSIF grain = 'week' THEN
+            lo := date_trunc('week', from_day)::date;
+            hi := date_trunc('week', to_day - 1)::date + 7;
+        ELSE
+            SELECT MIN(pp.start_date), MAX(pp.end_date) + 1 INTO lo, hi
+            FROM public.pay_periods pp
+            WHERE pp.start_date < to_day AND pp.end_date >= from_day;
+            CONTINUE WHEN lo IS NULL;
+        END IF;
+
+        DELETE FROM public.scorecard_rollups
+        WHERE period = grain AND period_start >= lo AND period_start < hi;
+        DELETE FROM public.scorecard_criteria_rollups
+        WHERE period = grain AND period_start >= lo AND period_start < hi;
+
+        written := written + public.apply_scorecard_rollups(
+            (
+                SELECT jsonb_agg(jsonb_build_object(
+                    'user_id', r.user_id,
+                    'created_at', r.created_at,
+                    'overall_score', r.overall_score,
+                    'communication_score', r.communication_score,
+                    'compliance_score', r.compliance_score,
+                    'accuracy_score', r.accuracy_score,
+                    'tone_score', r.tone_score,
+                    'empathy_score', r.empathy_score,
+                    'resolution_score', r.resolution_score,
+                    'criteria_results', r.criteria_results
+                ))
+                FROM public.report_cards r
+                WHERE r.created_at >= lo::timestamp AT TIME ZONE 'UTC'
+                AND r.created_at < hi::timestamp AT TIME ZONE 'UTC'
+            ),
+            ARRAY[grain]
+        );
+    END LOOP;
+
+    RETURN written;
+END;
+$$;
+
+-- Report cards are saved once per call, their items marked saved and their
+-- scores added to the rollups in the same transaction
+CREATE OR REPLACE FUNCTION public.save_report_cards_batch(cards JSONB)
+RETURNS TABLE (report_card_id UUID, audited_call_id UUID)
+LANGUAGE plpgsql
+SET search_path = ''
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH inserted AS (
+        INSERT INTO public.report_cards (
+            user_id,
+            call_id,
+            source_file,
+            source_type,
+            overall_score,
+            communication_score,
+            compliance_score,
+            accuracy_score,
+            tone_score,
+            empathy_score,
+            resolution_score,
+            feedback,
+            strengths,
+            areas_for_improvement,
+            recommendations,
+            criteria_results,
+            ai_model,
+            ai_provider,
+            processing_time_ms
+        )
+        SELECT
+            r.user_id,
+            r.call_id,
+            r.source_file,
+            COALESCE(r.source_type, 'call'),
+            r.overall_score,
+            r.communication_score,
+            r.compliance_score,
+            r.accuracy_score,
+            r.tone_score,
+            r.empathy_score,
+            r.resolution_score,
+            r.feedback,
+            r.strengths,
+            r.areas_for_improvement,
+            r.recommendations,
+            r.criteria_results,
+            r.ai_model,
+            r.ai_provider,
+            r.processing_time_ms
+        FROM jsonb_to_recordset(cards) AS r(
+            user_id UUID,
+            call_id UUID,
+            source_file TEXT,
+            source_type TEXT,
+            overall_score NUMERIC,
+            communication_score NUMERIC,
+            compliance_score NUMERIC,
+            accuracy_score NUMERIC,
+            tone_score NUMERIC,
+            empathy_score NUMERIC,
+            resolution_score NUMERIC,
+            feedback TEXT,
+            strengths TEXT[],
+            areas_for_improvement TEXT[],
+            recommendations TEXT[],
+            criteria_results JSONB,
+            ai_model TEXT,
+            ai_provider TEXT,
+            processing_time_ms INTEGER
+        )
+        -- A retried save must not duplicate cards for calls it already audited
+        JOIN public.calls c ON c.id = r.call_id AND c.status IS DISTINCT FROM 'audited'
+        RETURNING
+            id,
+            call_id,
+            user_id,
+            created_at,
+            overall_score,
+            communication_score,
+            compliance_score,
+            accuracy_score,
+            tone_score,
+            empathy_score,
+            resolution_score,
+            criteria_results
+    ),
+    audited AS (
+        UPDATE public.calls c
+        SET status = 'audited', updated_at = NOW()
+        FROM inserted
+        WHERE c.id = inserted.call_id
+        RETURNING c.id
+    ),
+    -- Only newly inserted cards count, so a retried save doesn't add twice
+    rolled AS (
+        SELECT public.apply_scorecard_rollups(jsonb_agg(to_jsonb(inserted))) AS rows
+        FROM inserted
+    )
+    SELECT inserted.id, inserted.call_id FROM inserted CROSS JOIN rolled;
+
+    -- Every call in the batch is audited now, whether by this call or an earlier one
+    PERFORM public.mark_call_sync_items_saved(cards);
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.save_report_cards_batch(JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.save_report_cards_batch(JSONB) TO service_role;
+REVOKE ALL ON FUNCTION public.apply_scorecard_rollups(JSONB, TEXT[]) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.apply_scorecard_rollups(JSONB, TEXT[]) TO service_role;
+REVOKE ALL ON FUNCTION public.rebuild_scorecard_rollups(DATE, DATE) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.rebuild_scorecard_rollups(DATE, DATE) TO service_role;
@@ -0,0 +1,10 @@
+-- Call Sync Failure Reasons
+-- Why a call could not be scored (truncated, unparseable, request_error, ...), so failures can be grouped without parsing error_message
+
+ALTER TABLE public.call_sync_logs
+    ADD COLUMN IF NOT EXISTS failure_reason TEXT;
+
+-- Failure breakdowns per run and over time
+CREATE INDEX IF NOT EXISTS idx_call_sync_logs_failure_reason
+    ON public.call_sync_logs(failure_reason, synced_at DESC)
+    WHERE failure_reason IS NOT NULL;
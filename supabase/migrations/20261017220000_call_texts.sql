@@ -0,0 +1,160 @@
+-- Call Texts
+-- Transcript and summary bodies move out of calls into a hash-keyed, lz4-compressed side table; calls keeps a hash, a length and has_transcript
+--
+-- After this migration calls.transcript_text and summary_text always read back as NULL.
+-- Writers keep working unchanged, since calls_move_text_columns (below) moves what they write:
+-- - sync-service: sync.js, audio-audit.js, audio-audit-local.js, api-server.js, test-audit-local.js
+-- - edge function transcribe-call
+-- - CallIngestionService.ingestCall (CSV import through CallImport)
+-- The Airflow DAG writes call_texts itself and sets only the hash columns.
+-- Readers read the body through the transcript / summary computed fields (below), which also
+-- fall back to a body not moved yet:
+-- - edge functions audit-call and analyze-conversation
+-- - CallIngestionService.triggerAudit and triggerConversationAnalysis
+-- - CallsService, ReportCardViewer and CallLibrary (search goes through search_call_transcripts)
+-- - sync-service sync.js (local LM Studio audit)
+-- - process-call-queue through queue_pending_calls and get_calls_to_process (20261017233000)
+-- Checks for "has a transcript" use has_transcript: CallIngestionService.processPendingCalls,
+-- CallLibrary, Five9ConfigPage and the sync.js stats.
+
+CREATE TABLE IF NOT EXISTS public.call_texts (
+    -- SHA-256 hex of the UTF-8 body, the same key as the Airflow blob store
+    content_hash TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    -- Characters
+    length INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Transcripts are highly repetitive text; lz4 compresses and decompresses several
+-- times faster than pglz. Servers built without lz4 keep the default
+DO $$
+BEGIN
+    ALTER TABLE public.call_texts ALTER COLUMN body SET COMPRESSION lz4;
+EXCEPTION WHEN feature_not_supported THEN
+    RAISE NOTICE 'lz4 not available, call_texts.body uses the default compression';
+END;
+$$;
+
+ALTER TABLE public.call_texts ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view call texts" ON public.call_texts
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE profiles.id = auth.uid()
+            AND profiles.role IN ('admin', 'manager')
+        )
+    );
+
+CREATE POLICY "Service role full access call_texts" ON public.call_texts
+    FOR ALL USING (auth.role() = 'service_role');
+
+GRANT SELECT ON public.call_texts TO authenticated;
+GRANT ALL ON public.call_texts TO service_role;
+
+ALTER TABLE public.calls
+    ADD COLUMN IF NOT EXISTS transcript_hash TEXT,
+    ADD COLUMN IF NOT EXISTS transcript_length INTEGER,
+    ADD COLUMN IF NOT EXISTS has_transcript BOOLEAN NOT NULL DEFAULT false,
+    ADD COLUMN IF NOT EXISTS summary_hash TEXT;
+
+-- Rows the backfill still has to move; empty once move_call_texts has drained it
+CREATE INDEX IF NOT EXISTS idx_calls_texts_to_move
+    ON public.calls(id)
+    WHERE transcript_text IS NOT NULL OR summary_text IS NOT NULL;
+
+-- Text written to calls by older clients (edge functions, sync-service, the
+-- browser) goes to call_texts on the way in, so calls rows stay narrow
+CREATE OR REPLACE FUNCTION public.move_call_text_columns()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+BEGIN
+    IF NEW.transcript_text IS NOT NULL THEN
+        NEW.transcript_hash := encode(sha256(convert_to(NEW.transcript_text, 'UTF8')), 'hex');
+        NEW.transcript_length := length(NEW.transcript_text);
+        INSERT INTO public.call_texts (content_hash, body, length)
+        VALUES (NEW.transcript_hash, NEW.transcript_text, NEW.transcript_length)
+        ON CONFLICT (content_hash) DO NOTHING;
+        NEW.transcript_text := NULL;
+    END IF;
+    IF NEW.summary_text IS NOT NULL THEN
+        NEW.summary_hash := encode(sha256(convert_to(NEW.summary_text, 'UTF8')), 'hex');
+        INSERT INTO public.call_texts (content_hash, body, length)
+        VALUES (NEW.summary_hash, NEW.summary_text, length(NEW.summary_text))
+        ON CONFLICT (content_hash) DO NOTHING;
+        NEW.summary_text := NULL;
+    END IF;
+    NEW.has_transcript := NEW.transcript_hash IS NOT NULL;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS calls_move_text_columns ON public.calls;
+CREATE TRIGGER calls_move_text_columns
+    BEFORE INSERT OR UPDATE OF transcript_text, summary_text, transcript_hash ON public.calls
+    FOR EACH ROW
+    EXECUTE FUNCTION public.move_call_text_columns();
+
+-- Computed fields: select=id,transcript loads the body on demand, and only
+-- for callers that can see the calls row
+CREATE OR REPLACE FUNCTION public.transcript(call public.calls)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+    SELECT COALESCE(
+        call.transcript_text,
+        (SELECT t.body FROM public.call_texts t WHERE t.content_hash = call.transcript_hash)
+    );
+$$;
+
+CREATE OR REPLACE FUNCTION public.summary(call public.calls)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+    SELECT COALESCE(
+        call.summary_text,
+        (SELECT t.body FROM public.call_texts t WHERE t.content_hash = call.summary_hash)
+    );
+$$;
+
+-- Backfill: move up to batch_size existing rows through the trigger; returns how many were moved
+CREATE OR REPLACE FUNCTION public.move_call_texts(batch_size INTEGER)
+RETURNS INTEGER
+LANGUAGE sql
+SET search_path = ''
+AS $$
+    WITH batch AS (
+        SELECT id
+        FROM public.calls
+        WHERE transcript_text IS NOT NULL OR summary_text IS NOT NULL
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    moved AS (
+        UPDATE public.calls c
+        SET transcript_text = c.transcript_text,
+            summary_text = c.summary_text
+        FROM batch
+        WHERE c.id = batch.id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM moved;
+$$;
+
+REVOKE ALL ON FUNCTION public.move_call_text_columns() FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.transcript(public.calls) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.transcript(public.calls) TO authenticated, service_role;
+REVOKE ALL ON FUNCTION public.summary(public.calls) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.summary(public.calls) TO authenticated, service_role;
+REVOKE ALL ON FUNCTION public.move_call_texts(INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.move_call_texts(INTEGER) TO service_role;
@@ -0,0 +1,20 @@
+-- Search Call Transcripts
+-- Transcript search for the call library now that bodies live in call_texts; runs as the caller so calls and call_texts RLS apply
+
+CREATE OR REPLACE FUNCTION public.search_call_transcripts(query TEXT, max_results INTEGER DEFAULT 200)
+RETURNS TABLE (call_id UUID)
+LANGUAGE sql
+STABLE
+SET search_path = ''
+AS $$
+    SELECT c.id
+    FROM public.calls c
+    JOIN public.call_texts t ON t.content_hash = c.transcript_hash
+    -- The search term is matched literally, not as a LIKE pattern
+    WHERE t.body ILIKE '%' || replace(replace(replace(query, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+    ORDER BY c.call_start_time DESC NULLS LAST
+    LIMIT max_results;
+$$;
+
+REVOKE ALL ON FUNCTION public.search_call_transcripts(TEXT, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.search_call_transcripts(TEXT, INTEGER) TO authenticated, service_role;
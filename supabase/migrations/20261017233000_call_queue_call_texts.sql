@@ -0,0 +1,85 @@
+-- Call Queue Call Texts
+-- The process-call-queue helpers keyed off calls.transcript_text, which calls_move_text_columns now always clears; they check transcript_hash and read the body from call_texts instead
+
+CREATE OR REPLACE FUNCTION public.queue_pending_calls()
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+DECLARE
+    queued_count INTEGER;
+BEGIN
+    UPDATE public.calls
+    SET processing_status = 'queued'
+    WHERE processing_status = 'pending'
+      AND has_transcript;
+
+    GET DIAGNOSTICS queued_count = ROW_COUNT;
+
+    RETURN queued_count;
+END;
+$$;
+
+-- Same columns as before; transcript_text now comes from call_texts
+CREATE OR REPLACE FUNCTION public.get_calls_to_process(batch_size INTEGER DEFAULT 10)
+RETURNS TABLE (
+    call_id UUID,
+    user_id UUID,
+    transcript_text TEXT,
+    call_start_time TIMESTAMPTZ,
+    call_duration_seconds INTEGER,
+    campaign_name TEXT,
+    disposition TEXT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        c.id AS call_id,
+        c.user_id,
+        public.transcript(c) AS transcript_text,
+        c.call_start_time,
+        c.call_duration_seconds,
+        c.campaign_name,
+        c.disposition
+    FROM public.calls c
+    WHERE c.processing_status = 'queued'
+      -- Rows the call_texts backfill hasn't reached yet still hold the text inline
+      AND (c.transcript_hash IS NOT NULL OR c.transcript_text IS NOT NULL)
+    ORDER BY c.created_at ASC
+    LIMIT batch_size
+    FOR UPDATE OF c SKIP LOCKED;
+END;
+$$;
+
+-- trigger_auto_queue_call fires after calls_move_text_columns (triggers run in
+-- name order), so the text is already gone; a new transcript shows as a new hash
+CREATE OR REPLACE FUNCTION public.auto_queue_call_on_transcript()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+BEGIN
+    IF (NEW.transcript_hash IS NOT NULL OR COALESCE(NEW.transcript_text, '') != '')
+       AND (TG_OP = 'INSERT'
+            OR OLD.transcript_hash IS DISTINCT FROM NEW.transcript_hash
+            OR OLD.transcript_text IS DISTINCT FROM NEW.transcript_text)
+       AND (NEW.processing_status IS NULL OR NEW.processing_status = 'pending')
+    THEN
+        NEW.processing_status := 'queued';
+    END IF;
+
+    RETURN NEW;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.queue_pending_calls() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.queue_pending_calls() TO authenticated, service_role;
+REVOKE ALL ON FUNCTION public.get_calls_to_process(INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.get_calls_to_process(INTEGER) TO authenticated, service_role;
+REVOKE ALL ON FUNCTION public.auto_queue_call_on_transcript() FROM PUBLIC;
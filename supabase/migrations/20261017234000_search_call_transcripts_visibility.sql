@@ -0,0 +1,37 @@
+-- Search Call Transcripts Visibility
+-- search_call_transcripts ran as the caller, so call_texts RLS hid every transcript from agents; it now runs as definer and applies the calls SELECT policies itself. A trigram index keeps the ILIKE off a full call_texts scan
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+CREATE INDEX IF NOT EXISTS idx_call_texts_body_trgm
+    ON public.call_texts USING gin (body extensions.gin_trgm_ops);
+
+-- Same signature as 20261017230000; only the security context and the visibility filter change
+CREATE OR REPLACE FUNCTION public.search_call_transcripts(query TEXT, max_results INTEGER DEFAULT 200)
+RETURNS TABLE (call_id UUID)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+    SELECT c.id
+    FROM public.calls c
+    JOIN public.call_texts t ON t.content_hash = c.transcript_hash
+    -- The search term is matched literally, not as a LIKE pattern
+    WHERE t.body ILIKE '%' || replace(replace(replace(query, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+      -- Mirrors the calls SELECT policies: own calls, or every call for admins and managers
+      AND (
+          c.user_id = auth.uid()
+          OR EXISTS (
+              SELECT 1 FROM public.profiles p
+              WHERE p.id = auth.uid()
+              AND p.role IN ('admin', 'manager')
+          )
+          OR auth.role() = 'service_role'
+      )
+    ORDER BY c.call_start_time DESC NULLS LAST
+    LIMIT max_results;
+$$;
+
+REVOKE ALL ON FUNCTION public.search_call_transcripts(TEXT, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.search_call_transcripts(TEXT, INTEGER) TO authenticated, service_role;
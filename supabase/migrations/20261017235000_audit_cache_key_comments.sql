@@ -0,0 +1,15 @@
+-- Audit Cache Key Comments
+-- audit_cache.transcript_hash kept its name when it started holding a composite cache key; say so in the schema
+
+COMMENT ON COLUMN public.audit_cache.transcript_hash IS
+    'Cache key. Rows from the Airflow DAG hold sha256(model:criteria_hash:content_hash); '
+    'rows from the browser AIAuditService hold the plain transcript hash.';
+COMMENT ON COLUMN public.audit_cache.content_hash IS
+    'SHA-256 of the transcript body (the Airflow blob store hash) the cached audit is for.';
+COMMENT ON COLUMN public.audit_cache.criteria_hash IS
+    'Hash of the audit criteria the cached audit was scored against.';
+COMMENT ON COLUMN public.audit_cache.hit_count IS
+    'Times the cached audit was reused. The Airflow DAG leaves it out of its upserts, '
+    'so the default sets it on insert, and adds hits through increment_audit_cache_hits.';
+COMMENT ON COLUMN public.audit_cache_minhash.transcript_hash IS
+    'audit_cache.transcript_hash (the cache key) of the audit this signature points at.';
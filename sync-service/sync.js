@@ -261,9 +261,9 @@ app.post('/audit', async (req, res) => {
 app.get('/pending', async (req, res) => {
   const { data, error } = await supabase
     .from('calls')
-    .select('id, call_id, user_id, transcript_text, status, call_duration_seconds, campaign_name, created_at')
+    .select('id, call_id, user_id, has_transcript, transcript_length, status, call_duration_seconds, campaign_name, created_at')
     .in('status', ['pending', 'transcribed'])
-    .not('transcript_text', 'is', null)
+    .eq('has_transcript', true)
     .order('created_at', { ascending: false })
     .limit(50);
 
@@ -279,8 +279,8 @@ app.get('/pending', async (req, res) => {
       status: c.status,
       duration: c.call_duration_seconds,
       campaign: c.campaign_name,
-      hasTranscript: !!c.transcript_text,
-      transcriptLength: c.transcript_text?.length || 0,
+      hasTranscript: c.has_transcript,
+      transcriptLength: c.transcript_length || 0,
     }))
   });
 });
@@ -289,7 +289,7 @@ app.get('/pending', async (req, res) => {
 app.get('/debug/calls', async (req, res) => {
   const { data, error } = await supabase
     .from('calls')
-    .select('id, call_id, status, transcript_text, transcript_url, created_at')
+    .select('id, call_id, status, has_transcript, transcript_length, transcript_url, created_at')
     .order('created_at', { ascending: false })
     .limit(10);
 
@@ -303,8 +303,8 @@ app.get('/debug/calls', async (req, res) => {
       id: c.id,
       call_id: c.call_id,
       status: c.status,
-      hasTranscript: !!c.transcript_text,
-      transcriptLength: c.transcript_text?.length || 0,
+      hasTranscript: c.has_transcript,
+      transcriptLength: c.transcript_length || 0,
       transcript_url: c.transcript_url,
     }))
   });
@@ -621,9 +621,9 @@ async function processCallsWithAI(limit = 3) {
   // Get pending calls with transcripts
   const { data: calls, error } = await supabase
     .from('calls')
-    .select('id, call_id, user_id, transcript_text, campaign_name')
+    .select('id, call_id, user_id, transcript, campaign_name')
     .in('status', ['pending', 'transcribed'])
-    .not('transcript_text', 'is', null)
+    .eq('has_transcript', true)
     .order('created_at', { ascending: true })
     .limit(limit);
 
@@ -647,7 +647,7 @@ async function processCallsWithAI(limit = 3) {
       const startTime = Date.now();
 
       // Send to LM Studio
-      const auditResult = await auditWithLMStudio(call.transcript_text);
+      const auditResult = await auditWithLMStudio(call.transcript);
       const processingTime = Date.now() - startTime;
 
       // Save report card